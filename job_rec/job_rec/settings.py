@@ -150,4 +150,81 @@ MESSAGE_TAGS = {
     messages.ERROR: 'alert-danger',
 }
 
-
+# Model locations, resolved and loaded lazily by job_recommendation/model_registry.py
+MODEL_PATHS = {
+    'sentence_encoder': 'all-MiniLM-L6-v2',
+    'job_classifier': BASE_DIR / 'job_recommendation' / 'model',
+    'cross_encoder': BASE_DIR / 'job_recommendation' / 'model2_reccomender',
+    'label_encoder': BASE_DIR / 'job_recommendation' / 'model' / 'label_encoder.pkl',
+    'title_classifier': BASE_DIR / 'job_recommendation' / 'model' / 'title_classifier.joblib',
+    'embedding_classifier': BASE_DIR / 'job_recommendation' / 'model' / 'embedding_classifier.joblib',
+}
+# Inference backend per model: 'torch', or for the sentence encoder 'onnx' / 'onnx-int8'
+# (model2_reccomender/onnx_encoder.py, exported on first load into ONNX_EXPORT_DIR), and for the job
+# classifier 'torch-int8' / 'onnx' / 'onnx-int8' (model/classifier_backends.py, exported into CLASSIFIER_ONNX_EXPORT_DIR)
+MODEL_BACKENDS = {
+    'sentence_encoder': 'torch',
+    'job_classifier': 'torch',
+}
+ONNX_EXPORT_DIR = BASE_DIR / 'job_recommendation' / 'model2_reccomender' / 'onnx'
+CLASSIFIER_ONNX_EXPORT_DIR = BASE_DIR / 'job_recommendation' / 'model' / 'onnx'
+# ONNX Runtime intra-op threads; 0 uses every physical core, set to 1 per process when running several workers
+ONNX_INTRA_OP_THREADS = 0
+# Models loaded when wsgi.py is imported, so a pre-forking server (gunicorn --preload) shares them with its workers
+PRELOAD_MODELS = []
+
+# Jobs posted more than this many days ago are no longer matched (None keeps every job)
+JOB_EXPIRY_DAYS = 90
+
+# Approximate nearest-neighbour index over job embeddings (model2_reccomender/ann_index.py)
+JOB_ANN_INDEX_ENABLED = True
+JOB_ANN_INDEX_DIR = BASE_DIR / 'job_recommendation' / 'model2_reccomender'
+JOB_ANN_N_PROBE = 8
+
+# Precision of the in-memory job matrix used by brute-force matching: 'float32', 'float16' or 'int8'
+# (model2_reccomender/quantization.py). With EMBEDDING_RESCORE the shortlist is rescored in float32.
+EMBEDDING_STORAGE = 'float32'
+EMBEDDING_RESCORE = True
+
+# Processes used by a full re-match (eish.batch_save_all_matches) and BLAS/torch threads per process;
+# keep MATCH_WORKERS x MATCH_WORKER_THREADS at or below the number of cores
+MATCH_WORKERS = 1
+MATCH_WORKER_THREADS = 1
+
+# Cascaded matching for single-user re-matches (model2_reccomender/cascade.py): TF-IDF keeps
+# CASCADE_TFIDF_WIDTH jobs, MiniLM reranks them down to CASCADE_BI_ENCODER_WIDTH and the
+# cross-encoder picks the final top N from those
+MATCH_CASCADE_ENABLED = False
+# Fitted TF-IDF vectorizer and job matrix used as the cascade's first stage (model2_reccomender/koma.py),
+# refreshed by the pipeline after categorization
+JOB_TFIDF_INDEX_PATH = BASE_DIR / 'job_recommendation' / 'model2_reccomender' / 'job_tfidf.joblib'
+# 'vocabulary' (TfidfVectorizer, refitted as the corpus grows) or 'hashing' (HashingVectorizer with
+# online IDF; new jobs are streamed in chunk by chunk and never trigger a refit)
+JOB_TFIDF_MODE = 'vocabulary'
+CASCADE_TFIDF_WIDTH = 500
+CASCADE_BI_ENCODER_WIDTH = 50
+# Reuse cross-encoder scores of (user text, job text) pairs already scored by the same model version
+PAIR_SCORE_CACHE_ENABLED = True
+
+# Tiered categorization (model/categorizer.py): the linear title classifier (trained with
+# `manage.py train_title_classifier`) decides titles it is at least this confident about; BERT gets the rest
+CATEGORIZER_TIERED = False
+CATEGORIZER_CONFIDENCE_THRESHOLD = 0.9
+# Decide titles with a classifier over MiniLM title embeddings (model/embedding_classifier.py, trained with
+# `manage.py train_embedding_classifier`) instead of BERT, so categorization uses the matcher's sentence
+# encoder and bert-base is never loaded; with CATEGORIZER_TIERED it decides what the linear tier escalates
+CATEGORIZER_EMBEDDING = False
+# 'knn' (distance-weighted, EMBEDDING_CLASSIFIER_NEIGHBORS neighbours) or 'centroid' (nearest class centroid)
+EMBEDDING_CLASSIFIER_MODE = 'knn'
+EMBEDDING_CLASSIFIER_NEIGHBORS = 15
+# Reuse the category of a normalized title already categorized by the same categorizer version
+TITLE_CATEGORY_CACHE_ENABLED = True
+
+# Category recommender behind the recommend-job page (model/recommender.py): concurrent requests are
+# coalesced into one classifier call of up to RECOMMENDER_MAX_BATCH_SIZE texts, waiting at most
+# RECOMMENDER_MAX_WAIT_MS for the batch to fill; the last RECOMMENDER_CACHE_SIZE normalized inputs are cached.
+# A request not answered by the batcher within RECOMMENDER_TIMEOUT_MS runs its own prediction instead
+RECOMMENDER_MAX_BATCH_SIZE = 16
+RECOMMENDER_MAX_WAIT_MS = 5
+RECOMMENDER_CACHE_SIZE = 1024
+RECOMMENDER_TIMEOUT_MS = 2000
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_rec.settings')
 
 application = get_wsgi_application()
+
+# Load the models listed in settings.PRELOAD_MODELS before the server forks its workers
+from job_recommendation.model_registry import preload
+
+preload()
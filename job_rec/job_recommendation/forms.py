@@ -78,6 +78,15 @@ class JobCleanedForm(forms.ModelForm):
             'placeholder': 'Enter URL or contact'
         })
     )
+    # Left blank, the category is predicted from the title (see views.post_job)
+    category = forms.CharField(
+        max_length=100,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Leave blank to categorize automatically'
+        })
+    )
 
     class Meta:
         model = JobCleaned
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+# Benchmarks live next to the code they measure; they are imported lazily so that
+# running one suite does not load the models used by the others.
+BENCHMARKS = {
+    'ann_recall': 'job_recommendation.model2_reccomender.ann_index.benchmark_ann_recall',
+    'batch_matching': 'job_recommendation.model2_reccomender.batch_matching.benchmark_batch_matching',
+    'cascade': 'job_recommendation.model2_reccomender.cascade.benchmark_cascade',
+    'classifier_backends': 'job_recommendation.model.classifier_backends.benchmark_classifier_backends',
+    'cross_encoder_pairs': 'job_recommendation.model2_reccomender.eeeh.benchmark_pair_inference',
+    'embedding_categorizer': 'job_recommendation.model.embedding_classifier.benchmark_embedding_categorizer',
+    'koma_cleaning': 'job_recommendation.model2_reccomender.koma.benchmark_cleaning',
+    'match_writes': 'job_recommendation.model2_reccomender.match_writer.benchmark_match_writes',
+    'onnx_encoder': 'job_recommendation.model2_reccomender.onnx_encoder.benchmark_onnx_encoder',
+    'quantization': 'job_recommendation.model2_reccomender.quantization.benchmark_quantization',
+    'recommender': 'job_recommendation.model.recommender.benchmark_recommender',
+    'sharded_matching': 'job_recommendation.model2_reccomender.sharded_matching.benchmark_sharded_matching',
+    'tiered_categorizer': 'job_recommendation.model.title_classifier.benchmark_tiered_categorizer',
+}
+
+
+class Command(BaseCommand):
+    help = 'Runs a performance benchmark and prints one line per measurement.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(BENCHMARKS))
+
+    def handle(self, *args, **options):
+        suite = options['suite']
+        self.stdout.write(f'Running {suite} benchmark...')
+        results = import_string(BENCHMARKS[suite])()
+        if isinstance(results, dict):
+            results = [results]
+        for result in results:
+            self.stdout.write(', '.join(f'{key}={value}' for key, value in result.items()))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete!'))
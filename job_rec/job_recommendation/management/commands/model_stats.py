@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from job_recommendation.model_registry import preload
+
+
+class Command(BaseCommand):
+    help = 'Loads the given models (default: settings.PRELOAD_MODELS) and reports load time and resident memory per model.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*')
+
+    def handle(self, *args, **options):
+        stats = preload(options['models'] or None)
+        if not stats:
+            self.stdout.write('No models loaded.')
+        for name, stat in stats.items():
+            self.stdout.write(f"{name}: {stat['load_seconds']}s, +{stat['rss_delta_mb']} MB RSS ({stat['path']})")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from job_recommendation.model_registry import model_version
+from job_recommendation.models import PairScore
+from job_recommendation.model2_reccomender.pair_cache import evict_stale
+
+
+class Command(BaseCommand):
+    help = 'Reports cached cross-encoder pair scores per model version and optionally evicts stale versions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evict', action='store_true',
+                            help='Delete cached scores from every model version other than the current one.')
+
+    def handle(self, *args, **options):
+        current = model_version('cross_encoder')
+        for row in PairScore.objects.values('model_name').annotate(pairs=Count('id')).order_by('model_name'):
+            marker = ' (current)' if row['model_name'] == current else ''
+            self.stdout.write(f"{row['model_name']}{marker}: {row['pairs']} pairs")
+        if options['evict']:
+            self.stdout.write(self.style.SUCCESS(f'Evicted {evict_stale(current)} stale pair scores.'))
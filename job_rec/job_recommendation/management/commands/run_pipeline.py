@@ -1,14 +1,19 @@
 from django.core.management.base import BaseCommand
-import subprocess
-import sys
 import asyncio
-from pathlib import Path
 
 from job_recommendation.scraper.run_scrapers import main as run_scrapers_main
 
 class Command(BaseCommand):
     help = 'Runs the full job recommendation pipeline: scrape, categorize, match.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--full-match', action='store_true',
+                            help='Recompute every user x job similarity instead of matching only new jobs.')
+        parser.add_argument('--full-categorize', action='store_true',
+                            help='Re-categorize every job instead of only new or changed ones (e.g. after a model swap).')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes for --full-match (default settings.MATCH_WORKERS).')
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting pipeline...'))
 
@@ -20,15 +25,25 @@ class Command(BaseCommand):
         else:
             awaitable
 
-        # 2. Categorize jobs
+        # 2. Categorize new and changed jobs (every job with --full-categorize), reusing this process's classifier
         self.stdout.write('Categorizing jobs...')
-        BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent  # points to job_rec/
-        script_path = BASE_DIR / 'job_recommendation' / 'model' / 'test_BERT3.py'
-        subprocess.run([sys.executable, str(script_path)], check=True)
+        from job_recommendation.model.categorizer import categorize_jobs
+        stats = categorize_jobs(full=options['full_categorize'])
+        self.stdout.write(f"Categorized {stats['categorized']} of {stats['jobs']} jobs "
+                          f"({stats['cache_hits']} title cache hits, {stats['cache_misses']} misses)")
+
+        # 3. Bring the persisted TF-IDF index up to date (transform-only until enough jobs churned for a refit)
+        self.stdout.write('Updating TF-IDF index...')
+        from job_recommendation.model2_reccomender.koma import load_job_tfidf_index
+        load_job_tfidf_index(refresh=True)
 
-        # 3. Run matching for all users
+        # 4. Run matching for all users (only new jobs unless the model changed or --full-match)
         self.stdout.write('Matching users to jobs...')
-        from job_recommendation.model2_reccomender.eish import batch_save_all_matches
-        batch_save_all_matches(top_n=6)
+        if options['full_match']:
+            from job_recommendation.model2_reccomender.eish import batch_save_all_matches
+            batch_save_all_matches(top_n=6, workers=options['workers'])
+        else:
+            from job_recommendation.model2_reccomender.incremental import incremental_match
+            incremental_match(top_n=6)
 
         self.stdout.write(self.style.SUCCESS('Pipeline complete!'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from job_recommendation.tasks import requeue_stale, run_next
+
+
+class Command(BaseCommand):
+    help = 'Runs background jobs (e.g. rematching a user after a profile change) from the background_jobs queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs.')
+        self.stdout.write(self.style.SUCCESS('Worker started.'))
+        try:
+            while True:
+                if run_next():
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
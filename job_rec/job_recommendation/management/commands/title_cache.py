@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from job_recommendation.models import TitleCategory
+from job_recommendation.model.categorizer import categorizer_version
+from job_recommendation.model.title_cache import evict_stale
+
+
+class Command(BaseCommand):
+    help = 'Reports cached title categories per categorizer version and optionally evicts stale versions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evict', action='store_true',
+                            help='Delete cached categories from every categorizer version other than the current one.')
+
+    def handle(self, *args, **options):
+        current = categorizer_version()
+        for row in TitleCategory.objects.values('model_name').annotate(titles=Count('id')).order_by('model_name'):
+            marker = ' (current)' if row['model_name'] == current else ''
+            self.stdout.write(f"{row['model_name']}{marker}: {row['titles']} titles")
+        if options['evict']:
+            self.stdout.write(self.style.SUCCESS(f'Evicted {evict_stale(current)} stale title categories.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from job_recommendation.model.embedding_classifier import MODES, train_embedding_classifier
+
+
+class Command(BaseCommand):
+    help = 'Trains the kNN / centroid classifier over MiniLM title embeddings on the categorized jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, help='Defaults to settings.EMBEDDING_CLASSIFIER_MODE.')
+        parser.add_argument('--neighbors', type=int, help='Defaults to settings.EMBEDDING_CLASSIFIER_NEIGHBORS.')
+        parser.add_argument('--holdout', type=float, default=0.1,
+                            help='Share of titles held out to measure accuracy against the stored categories.')
+
+    def handle(self, *args, **options):
+        stats = train_embedding_classifier(mode=options['mode'], n_neighbors=options['neighbors'], holdout=options['holdout'])
+        self.stdout.write(', '.join(f'{key}={value}' for key, value in stats.items()))
+        self.stdout.write(self.style.SUCCESS('Embedding classifier trained!'))
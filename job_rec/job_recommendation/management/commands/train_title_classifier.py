@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from job_recommendation.model.title_classifier import train_title_classifier
+
+
+class Command(BaseCommand):
+    help = 'Trains the linear title classifier used as the first tier of the categorizer on the categorized jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--holdout', type=float, default=0.1,
+                            help='Share of titles held out to measure agreement with the stored categories.')
+
+    def handle(self, *args, **options):
+        stats = train_title_classifier(holdout=options['holdout'])
+        self.stdout.write(', '.join(f'{key}={value}' for key, value in stats.items()))
+        self.stdout.write(self.style.SUCCESS('Title classifier trained!'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_recommendation', '0003_jobalertpreference_jobcleaned_notification_recruiter_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.IntegerField(unique=True)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('model_name', models.CharField(max_length=100)),
+                ('vector', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'job_embeddings',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_recommendation', '0006_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PairScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_hash', models.CharField(max_length=64)),
+                ('job_hash', models.CharField(max_length=64)),
+                ('model_name', models.CharField(max_length=100)),
+                ('label', models.SmallIntegerField()),
+                ('score', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'pair_scores',
+                'indexes': [models.Index(fields=['model_name'], name='pair_scores_model_n_258b3b_idx')],
+                'unique_together': {('user_hash', 'job_hash', 'model_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_recommendation', '0008_jobcategorization'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcategorization',
+            name='confidence',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='jobcategorization',
+            name='tier',
+            field=models.CharField(default='bert', max_length=10),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.2 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_recommendation', '0009_jobcategorization_confidence_tier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('model_name', models.CharField(max_length=100)),
+                ('category', models.CharField(max_length=100)),
+                ('confidence', models.FloatField(null=True)),
+                ('tier', models.CharField(max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'title_categories',
+                'indexes': [models.Index(fields=['model_name'], name='title_categ_model_n_1c767e_idx')],
+                'unique_together': {('title', 'model_name')},
+            },
+        ),
+    ]
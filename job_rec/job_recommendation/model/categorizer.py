@@ -0,0 +1,327 @@
+import re
+import time
+import logging
+import resource
+import itertools
+import collections
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 32
+MAX_LENGTH = 512
+BUCKET_BATCHES = 16  # titles are sorted by token length within windows of BUCKET_BATCHES * batch_size
+
+INSERT_CLEANED_QUERY = """
+    INSERT INTO jobs_cleaned (id, title, company, location, job_type, date_posted, url, source, description, category)
+    VALUES %s
+    ON CONFLICT (id) DO UPDATE
+    SET title = EXCLUDED.title,
+        company = EXCLUDED.company,
+        location = EXCLUDED.location,
+        job_type = EXCLUDED.job_type,
+        date_posted = EXCLUDED.date_posted,
+        url = EXCLUDED.url,
+        source = EXCLUDED.source,
+        description = EXCLUDED.description,
+        category = EXCLUDED.category
+"""
+INSERT_CATEGORIZATION_QUERY = """
+    INSERT INTO job_categorizations (job_id, content_hash, model_name, category, confidence, tier, updated_at)
+    VALUES %s
+    ON CONFLICT (job_id) DO UPDATE
+    SET content_hash = EXCLUDED.content_hash,
+        model_name = EXCLUDED.model_name,
+        category = EXCLUDED.category,
+        confidence = EXCLUDED.confidence,
+        tier = EXCLUDED.tier,
+        updated_at = EXCLUDED.updated_at
+"""
+
+# English stop words, downloaded (if needed) and loaded once per process
+_stop_words = set()
+
+
+def stop_words():
+    if not _stop_words:
+        import nltk
+        from nltk.corpus import stopwords
+        nltk.download('punkt', quiet=True)
+        nltk.download('stopwords', quiet=True)
+        _stop_words.update(stopwords.words('english'))
+    return _stop_words
+
+
+# Text preprocessing function
+def preprocess_text(text):
+    from nltk.tokenize import word_tokenize
+    text = text.lower()
+    text = re.sub(r'[^a-zA-Z\s]', '', text)
+    tokens = word_tokenize(text)
+    tokens = [word for word in tokens if word not in stop_words()]
+    return ' '.join(tokens)
+
+
+# Function to truncate long fields
+def truncate_field(field, max_length, field_name):
+    if field and isinstance(field, str) and len(field) > max_length:
+        logger.warning(f"Truncating {field_name} from {len(field)} to {max_length} characters")
+        return field[:max_length]
+    return field
+
+
+def title_batches(tokenizer, rows, title=lambda row: row[1], batch_size=BATCH_SIZE, max_length=MAX_LENGTH,
+                  bucket_batches=BUCKET_BATCHES, preprocess=preprocess_text):
+    """
+    Turn a stream of rows into classifier batches without holding them all in memory.
+    Rows are read BUCKET_BATCHES batches at a time, their preprocessed titles tokenized, sorted by
+    token count and cut into batches padded only to their own longest title. Yields (rows, inputs).
+    Pass preprocess=None when title(row) is already preprocessed.
+    """
+    while True:
+        window = list(itertools.islice(rows, batch_size * bucket_batches))
+        if not window:
+            return
+        texts = [title(row) for row in window]
+        if preprocess is not None:
+            texts = [preprocess(text) for text in texts]
+        input_ids = tokenizer(texts, truncation=True, max_length=max_length)['input_ids']
+        order = sorted(range(len(window)), key=lambda i: len(input_ids[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = tokenizer.pad({'input_ids': [input_ids[i] for i in batch]}, return_tensors='pt')
+            yield [window[i] for i in batch], inputs
+
+
+def predict_batches(batches):
+    """
+    Yield (rows, categories, confidences) for each batch from title_batches, using the process-wide
+    classifier; confidence is the softmax probability of the predicted category.
+    """
+    import torch
+    from job_recommendation.model_registry import get_model
+
+    label_encoder = get_model('label_encoder')
+    _, model = get_model('job_classifier')
+    with torch.no_grad():
+        for rows, inputs in batches:
+            confidences, predictions = torch.softmax(model(**inputs).logits, dim=1).max(dim=1)
+            yield rows, label_encoder.inverse_transform(predictions.numpy()).astype(object), confidences.numpy()
+
+
+def predict_texts(texts, tiered, threshold, batch_size=BATCH_SIZE, embedding=False):
+    """
+    (categories, confidences, tiers) for preprocessed titles. Tiered, the linear title classifier
+    (title_classifier.py) decides first and only titles whose top-class probability is below `threshold`
+    are escalated; otherwise every title is. Escalated titles are decided by BERT, or with `embedding` by
+    the classifier over MiniLM title embeddings (embedding_classifier.py).
+    """
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model.title_classifier import TIER_BERT, TIER_LINEAR, predict_linear
+    from job_recommendation.model.embedding_classifier import TIER_EMBEDDING, predict_embedding
+
+    if tiered:
+        categories, confidences = predict_linear(get_model('title_classifier'), texts)
+        tiers = np.full(len(texts), TIER_LINEAR, dtype=object)
+        unsure = np.flatnonzero(confidences < threshold)
+    else:
+        categories = np.empty(len(texts), dtype=object)
+        confidences = np.zeros(len(texts))
+        tiers = np.empty(len(texts), dtype=object)
+        unsure = np.arange(len(texts))
+    if len(unsure) and embedding:
+        categories[unsure], confidences[unsure] = predict_embedding(
+            get_model('embedding_classifier'), [texts[i] for i in unsure], batch_size=batch_size)
+        tiers[unsure] = TIER_EMBEDDING
+    elif len(unsure):
+        tokenizer, _ = get_model('job_classifier')
+        escalated = title_batches(tokenizer, iter([(i, texts[i]) for i in unsure]), batch_size=batch_size, preprocess=None)
+        for batch, bert_categories, bert_confidences in predict_batches(escalated):
+            positions = [i for i, _ in batch]
+            categories[positions] = bert_categories
+            confidences[positions] = bert_confidences
+            tiers[positions] = TIER_BERT
+    return categories, confidences, tiers
+
+
+def categorize_stream(rows, title=lambda row: row[1], batch_size=BATCH_SIZE, tiered=None, threshold=None, use_cache=None,
+                      embedding=None):
+    """
+    Categorize a stream of rows by their titles. Yields (rows, categories, confidences, tiers) per window
+    of BUCKET_BATCHES * batch_size rows. Titles are preprocessed once; with `use_cache` (default
+    settings.TITLE_CATEGORY_CACHE_ENABLED) normalized titles already categorized by the current
+    categorizer_version come from the title cache (title_cache.py), and each remaining distinct title is
+    predicted once (predict_texts) and added to it. `tiered`, `threshold` and `embedding` default to
+    settings.CATEGORIZER_TIERED, settings.CATEGORIZER_CONFIDENCE_THRESHOLD and settings.CATEGORIZER_EMBEDDING.
+    """
+    from django.conf import settings
+    from job_recommendation.model import title_cache
+
+    tiered = settings.CATEGORIZER_TIERED if tiered is None else tiered
+    threshold = settings.CATEGORIZER_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    use_cache = settings.TITLE_CATEGORY_CACHE_ENABLED if use_cache is None else use_cache
+    embedding = settings.CATEGORIZER_EMBEDDING if embedding is None else embedding
+    version = categorizer_version(tiered, threshold, embedding)
+    while True:
+        window = list(itertools.islice(rows, batch_size * BUCKET_BATCHES))
+        if not window:
+            return
+        texts = [preprocess_text(title(row)) for row in window]
+        known = title_cache.lookup(set(texts), version) if use_cache else {}
+        missing = list(dict.fromkeys(text for text in texts if text not in known))
+        if missing:
+            predicted = zip(missing, *predict_texts(missing, tiered, threshold, batch_size=batch_size, embedding=embedding))
+            fresh = {text: (category, float(confidence), tier) for text, category, confidence, tier in predicted}
+            if use_cache:
+                title_cache.store(fresh, version)
+            known.update(fresh)
+        yield (
+            window,
+            np.array([known[text][0] for text in texts], dtype=object),
+            np.array([known[text][1] for text in texts], dtype=float),
+            np.array([known[text][2] for text in texts], dtype=object),
+        )
+
+
+def categorizer_version(tiered=None, threshold=None, embedding=None):
+    """
+    What a stored categorization was made with: the BERT classifier's model version (the embedding
+    classifier's with `embedding`), plus the linear model's version and the escalation threshold when
+    the tiered categorizer is on.
+    """
+    from django.conf import settings
+    from job_recommendation.model_registry import model_version
+
+    tiered = settings.CATEGORIZER_TIERED if tiered is None else tiered
+    threshold = settings.CATEGORIZER_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    embedding = settings.CATEGORIZER_EMBEDDING if embedding is None else embedding
+    version = f"embedding:{model_version('embedding_classifier')}" if embedding else model_version('job_classifier')
+    if tiered:
+        version += f"|{model_version('title_classifier')}<{threshold}"
+    return version
+
+
+def categorize_titles(titles, batch_size=BATCH_SIZE):
+    """Predicted category for each title, in order. Used for single jobs posted through the site."""
+    categories = [None] * len(titles)
+    for rows, predicted, _, _ in categorize_stream(iter(enumerate(titles)), batch_size=batch_size):
+        for (position, _), category in zip(rows, predicted):
+            categories[position] = category
+    return categories
+
+
+def pending_jobs(cursor, job_ids=None, full=False):
+    """
+    Hash each job's title and description in the database (only the hashes are transferred) and pick the
+    jobs, among `job_ids` (default all), that are missing from jobs_cleaned or whose text or classifier
+    changed since they were categorized; every one of them with `full`.
+    Returns ({job_id: content_hash}, pending job ids).
+    """
+    from job_recommendation.models import JobCleaned, JobCategorization
+
+    query = """
+        SELECT id, encode(sha256(convert_to(coalesce(title, '') || E'\\n' || coalesce(description, ''), 'UTF8')), 'hex')
+        FROM jobs
+    """
+    if job_ids is None:
+        cursor.execute(query)
+    else:
+        cursor.execute(query + " WHERE id = ANY(%s)", (list(job_ids),))
+    job_hashes = dict(cursor.fetchall())
+    if full:
+        return job_hashes, list(job_hashes)
+
+    version = categorizer_version()
+    categorizations, cleaned = JobCategorization.objects.all(), JobCleaned.objects.all()
+    if job_ids is not None:
+        categorizations, cleaned = categorizations.filter(job_id__in=job_hashes), cleaned.filter(id__in=job_hashes)
+    stored = {
+        job_id: (content_hash, model_name)
+        for job_id, content_hash, model_name in categorizations.values_list('job_id', 'content_hash', 'model_name').iterator(chunk_size=5000)
+    }
+    cleaned_ids = set(cleaned.values_list('id', flat=True).iterator(chunk_size=5000))
+    return job_hashes, [
+        job_id for job_id, content_hash in job_hashes.items()
+        if job_id not in cleaned_ids or stored.get(job_id) != (content_hash, version)
+    ]
+
+
+def categorize_jobs(job_ids=None, batch_size=BATCH_SIZE, full=False):
+    """
+    Categorize jobs from the jobs table into jobs_cleaned with categorize_stream (title cache, then BERT, the
+    embedding classifier or the tiered categorizer), models loaded once per process through the model
+    registry. Only jobs (among `job_ids`, default all) that are new or changed since they were last
+    categorized are processed, unless `full`. Pending rows are streamed through a server-side cursor; each
+    window is written and committed before the next, so an interrupted run resumes where it stopped.
+    Returns the number of jobs checked and categorized, how many of them each tier decided, title cache hits
+    and misses, titles/sec and peak RSS in MB.
+    """
+    from psycopg2.extras import execute_values
+    from django.conf import settings
+    from django.db import connection, transaction
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model import title_cache
+
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        job_hashes, pending_ids = pending_jobs(cursor, job_ids, full)
+    if job_ids is None and not job_hashes:
+        raise ValueError("No data found in jobs table")
+    logger.info(f"{len(pending_ids)} of {len(job_hashes)} jobs need categorizing")
+
+    version = categorizer_version()
+    if settings.TITLE_CATEGORY_CACHE_ENABLED:
+        title_cache.evict_stale(version)
+    cache_before = title_cache.cache_stats().get(version, {'hits': 0, 'misses': 0})
+    categorized = 0
+    tier_counts = collections.Counter()
+    seconds = 0.0
+    if pending_ids:
+        # Load the first-tier model before timing
+        if settings.CATEGORIZER_TIERED:
+            get_model('title_classifier')
+        elif settings.CATEGORIZER_EMBEDDING:
+            get_model('embedding_classifier')
+            get_model('sentence_encoder')
+        else:
+            get_model('job_classifier')
+        started = time.perf_counter()
+        # WITH HOLD keeps the server-side cursor open across the per-batch commits
+        rows = connection.connection.cursor(name='pending_jobs', withhold=True)
+        rows.itersize = batch_size * BUCKET_BATCHES
+        rows.execute(
+            "SELECT id, title, company, location, job_type, date_posted, url, source, description FROM jobs WHERE id = ANY(%s)",
+            (pending_ids,)
+        )
+        try:
+            for batch, categories, confidences, tiers in categorize_stream(rows, batch_size=batch_size):
+                # Write the batch to jobs_cleaned, and what it was categorized from, in one transaction
+                with transaction.atomic(), connection.connection.cursor() as cursor:
+                    execute_values(cursor, INSERT_CLEANED_QUERY, [
+                        (job_id, title, company, location, job_type, date_posted, truncate_field(url, 255, "url"), source,
+                         truncate_field(description, 1000, "description"), category)
+                        for (job_id, title, company, location, job_type, date_posted, url, source, description), category
+                        in zip(batch, categories)
+                    ], page_size=1000)
+                    execute_values(cursor, INSERT_CATEGORIZATION_QUERY, [
+                        (row[0], job_hashes[row[0]], version, category, float(confidence), tier)
+                        for row, category, confidence, tier in zip(batch, categories, confidences, tiers)
+                    ], template='(%s, %s, %s, %s, %s, %s, now())', page_size=1000)
+                categorized += len(batch)
+                tier_counts.update(tiers.tolist())
+        finally:
+            rows.close()
+        seconds = time.perf_counter() - started
+
+    cache_after = title_cache.cache_stats().get(version, {'hits': 0, 'misses': 0})
+    stats = {
+        'jobs': len(job_hashes),
+        'categorized': categorized,
+        'tiers': dict(tier_counts),
+        'cache_hits': cache_after['hits'] - cache_before['hits'],
+        'cache_misses': cache_after['misses'] - cache_before['misses'],
+        'titles_per_sec': round(categorized / seconds, 1) if seconds else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    logger.info(f"Categorized {categorized} jobs (by tier: {stats['tiers']}) at {stats['titles_per_sec']} titles/sec, peak RSS {stats['peak_rss_mb']} MB")
+    return stats
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Values of settings.MODEL_BACKENDS['job_classifier']
+BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+
+ONNX_FILE = 'model.onnx'
+ONNX_INT8_FILE = 'model-int8.onnx'
+CONFIG_FILE = 'classifier_config.json'
+
+
+def quantize_linear_layers(model):
+    """Dynamic int8 quantization of every nn.Linear: weights stored as int8, activations quantized per batch."""
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8).eval()
+
+
+def export_sequence_classifier(model_path, export_dir, quantize=True, source_version=None):
+    """
+    Export a BertForSequenceClassification to ONNX (logits output, dynamic batch and sequence axes),
+    plus an int8 dynamically quantized copy when `quantize` is set. `source_version` (the model_version
+    of the weights) is recorded so a later load can tell the export is stale.
+    """
+    import torch
+    from transformers import BertTokenizerFast, BertForSequenceClassification
+
+    os.makedirs(export_dir, exist_ok=True)
+    tokenizer = BertTokenizerFast.from_pretrained(str(model_path))
+    model = BertForSequenceClassification.from_pretrained(str(model_path)).eval()
+
+    sample = tokenizer(['export sample title'], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+    onnx_path = os.path.join(export_dir, ONNX_FILE)
+
+    # Call the model with keyword arguments only; its positional signature varies across versions
+    class Logits(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)), return_dict=True).logits
+
+    with torch.no_grad():
+        torch.onnx.export(
+            Logits(),
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(onnx_path, os.path.join(export_dir, ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+
+    with open(os.path.join(export_dir, CONFIG_FILE), 'w') as f:
+        json.dump({'source': str(model_path), 'source_version': source_version, 'num_labels': model.config.num_labels}, f)
+    logger.info(f"Exported {model_path} to {export_dir} (int8: {quantize})")
+
+
+def exported_version(export_dir):
+    """The source_version recorded by the last export into `export_dir`, or None."""
+    try:
+        with open(os.path.join(export_dir, CONFIG_FILE)) as f:
+            return json.load(f).get('source_version')
+    except (OSError, ValueError):
+        return None
+
+
+class OnnxSequenceClassifier:
+    """
+    Sequence classifier running on ONNX Runtime (CPU). Called like the PyTorch model
+    (model(input_ids=..., attention_mask=...).logits), so the categorizer uses either unchanged.
+    """
+
+    def __init__(self, export_dir, quantized=False, intra_op_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads  # 0 lets ONNX Runtime use every physical core
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = os.path.join(export_dir, ONNX_INT8_FILE if quantized else ONNX_FILE)
+        self.session = ort.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    @classmethod
+    def from_model(cls, model_path, export_dir, quantized=False, intra_op_threads=0, source_version=None):
+        """
+        Load the exported classifier, exporting `model_path` (fp32 and int8) first if it has not been
+        exported yet or was exported from weights other than `source_version`.
+        """
+        model_file = os.path.join(export_dir, ONNX_INT8_FILE if quantized else ONNX_FILE)
+        if not os.path.exists(model_file) or (source_version is not None and exported_version(export_dir) != source_version):
+            export_sequence_classifier(model_path, export_dir, quantize=True, source_version=source_version)
+        return cls(export_dir, quantized=quantized, intra_op_threads=intra_op_threads)
+
+    def __call__(self, input_ids, attention_mask=None, token_type_ids=None, **kwargs):
+        import torch
+        from transformers.modeling_outputs import SequenceClassifierOutput
+
+        input_ids = np.asarray(input_ids, dtype=np.int64)
+        inputs = {
+            'input_ids': input_ids,
+            'attention_mask': np.ones_like(input_ids) if attention_mask is None else np.asarray(attention_mask, dtype=np.int64),
+            'token_type_ids': np.zeros_like(input_ids) if token_type_ids is None else np.asarray(token_type_ids, dtype=np.int64),
+        }
+        logits = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+        return SequenceClassifierOutput(logits=torch.from_numpy(logits))
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        return self
+
+
+def load_classifier(model_path, backend, export_dir, intra_op_threads=0, source_version=None):
+    """(tokenizer, model) for `backend`, one of BACKENDS. ONNX exports not made from `source_version` are redone."""
+    from transformers import BertTokenizerFast, BertForSequenceClassification
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown classifier backend '{backend}', expected one of {BACKENDS}")
+    tokenizer = BertTokenizerFast.from_pretrained(str(model_path))
+    if backend in ('onnx', 'onnx-int8'):
+        return tokenizer, OnnxSequenceClassifier.from_model(model_path, export_dir, quantized=backend == 'onnx-int8',
+                                                            intra_op_threads=intra_op_threads, source_version=source_version)
+    model = BertForSequenceClassification.from_pretrained(str(model_path)).eval()
+    return tokenizer, quantize_linear_layers(model) if backend == 'torch-int8' else model
+
+
+SAMPLE_TITLES = [
+    'Accountant', 'Truck Driver', 'Registered Nurse', 'Secondary School Teacher', 'Senior Software Engineer',
+    'Sales Representative', 'Agricultural Extension Officer', 'Human Resources Officer', 'Hotel Receptionist',
+    'Legal Counsel', 'Monitoring and Evaluation Specialist', 'Procurement Assistant',
+]
+
+
+def benchmark_classifier_backends(n_titles=512, latency_samples=50, batch_size=64, min_agreement=0.99):
+    """
+    Label parity of every backend with the fp32 PyTorch classifier on titles from the jobs table, latency
+    at batch size 1 (p50/p95 over `latency_samples` titles) and titles/sec at `batch_size`, in the
+    categorizer's length-sorted batches. Raises AssertionError if fp32 ONNX agrees on fewer than
+    `min_agreement` of the titles.
+    """
+    import torch
+    from django.conf import settings
+    from job_recommendation.model_registry import model_path, model_version
+    from job_recommendation.model.categorizer import preprocess_text, title_batches
+
+    path = model_path('job_classifier')
+    titles = list(SAMPLE_TITLES)
+    try:
+        from job_recommendation.models import Job
+        titles += list(Job.objects.values_list('title', flat=True)[:n_titles])
+    except Exception as e:
+        logger.warning(f"Using sample titles only: {e}")
+    titles = (titles * (n_titles // len(titles) + 1))[:n_titles]
+
+    def predict(tokenizer, model, batch_titles, size):
+        labels = np.empty(len(batch_titles), dtype=np.int64)
+        with torch.no_grad():
+            for rows, inputs in title_batches(tokenizer, iter(enumerate(batch_titles)), batch_size=size):
+                labels[[position for position, _ in rows]] = torch.argmax(model(**inputs).logits, dim=1).numpy()
+        return labels
+
+    reference = None
+    results = []
+    for backend in BACKENDS:
+        tokenizer, model = load_classifier(path, backend, settings.CLASSIFIER_ONNX_EXPORT_DIR, settings.ONNX_INTRA_OP_THREADS,
+                                           source_version=model_version('job_classifier', backend='torch'))
+        predict(tokenizer, model, titles[:batch_size], batch_size)  # warm up
+
+        started = time.perf_counter()
+        labels = predict(tokenizer, model, titles, batch_size)
+        seconds = time.perf_counter() - started
+        if reference is None:
+            reference = labels
+        agreement = float(np.mean(labels == reference))
+        if backend == 'onnx':
+            assert agreement >= min_agreement, f"ONNX labels agree with PyTorch on only {agreement:.3f} of titles"
+
+        latencies = []
+        for title in titles[:latency_samples]:
+            inputs = tokenizer([preprocess_text(title)], return_tensors='pt')
+            started = time.perf_counter()
+            with torch.no_grad():
+                model(input_ids=inputs['input_ids'], attention_mask=inputs['attention_mask'])
+            latencies.append(time.perf_counter() - started)
+        results.append({
+            'backend': backend,
+            'titles': len(titles),
+            'label_agreement': round(agreement, 4),
+            'p50_ms@1': round(float(np.percentile(latencies, 50)) * 1000, 2),
+            'p95_ms@1': round(float(np.percentile(latencies, 95)) * 1000, 2),
+            f'titles_per_sec@{batch_size}': round(len(titles) / seconds, 1),
+        })
+    return results
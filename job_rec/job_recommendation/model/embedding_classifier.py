@@ -0,0 +1,141 @@
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIER_EMBEDDING = 'embedding'
+# Values of settings.EMBEDDING_CLASSIFIER_MODE
+MODES = ('knn', 'centroid')
+
+
+def encode_titles(texts, batch_size=32):
+    """Unit-length MiniLM embeddings of preprocessed titles, from the matcher's process-wide sentence encoder."""
+    from job_recommendation.model2_reccomender.eish import compute_embeddings
+    from job_recommendation.model2_reccomender.batch_matching import normalize_rows
+
+    if not len(texts):
+        return np.empty((0, 0), dtype=np.float32)
+    return normalize_rows(compute_embeddings(list(texts), batch_size=batch_size))
+
+
+def build_embedding_classifier(mode='knn', n_neighbors=15):
+    """
+    Distance-weighted k nearest neighbours ('knn') or nearest class centroid ('centroid') over unit-length
+    embeddings, where euclidean distance ranks like cosine similarity.
+    """
+    from sklearn.neighbors import KNeighborsClassifier, NearestCentroid
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown embedding classifier mode '{mode}', expected one of {MODES}")
+    if mode == 'centroid':
+        return NearestCentroid()
+    return KNeighborsClassifier(n_neighbors=n_neighbors, weights='distance', algorithm='brute')
+
+
+def train_embedding_classifier(path=None, mode=None, n_neighbors=None, holdout=0.1, seed=0):
+    """
+    Fit the embedding classifier on the same categorized titles as the linear title classifier
+    (title_classifier.training_data) and save it, with the sentence encoder version it was fitted on, to `path`
+    (default settings.MODEL_PATHS['embedding_classifier']). `mode` and `n_neighbors` default to
+    settings.EMBEDDING_CLASSIFIER_MODE and settings.EMBEDDING_CLASSIFIER_NEIGHBORS. Returns example/class
+    counts and the accuracy against the stored (BERT) categories on a held-out `holdout` share.
+    """
+    from django.conf import settings
+    from job_recommendation.model_registry import model_path
+    from job_recommendation.model2_reccomender.eish import encoder_version
+    from job_recommendation.model.title_classifier import training_data, save_model
+
+    path = str(path or model_path('embedding_classifier'))
+    mode = mode or settings.EMBEDDING_CLASSIFIER_MODE
+    n_neighbors = n_neighbors or settings.EMBEDDING_CLASSIFIER_NEIGHBORS
+    texts, labels = training_data()
+    if len(set(labels.tolist())) < 2:
+        raise ValueError("Need categorized jobs from at least two categories to train the embedding classifier")
+
+    started = time.perf_counter()
+    embeddings = encode_titles(texts)
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_holdout = int(len(texts) * holdout)
+    held, fit = order[:n_holdout], order[n_holdout:]
+    model = build_embedding_classifier(mode, n_neighbors).fit(embeddings[fit], labels[fit])
+    holdout_accuracy = float(np.mean(model.predict(embeddings[held]) == labels[held])) if n_holdout else None
+    if n_holdout:
+        # Refit on everything once the held-out accuracy is known
+        model = build_embedding_classifier(mode, n_neighbors).fit(embeddings, labels)
+    seconds = time.perf_counter() - started
+
+    save_model({'model': model, 'encoder': encoder_version()}, path)
+    stats = {
+        'examples': len(texts),
+        'classes': len(model.classes_),
+        'mode': mode,
+        'holdout_accuracy_vs_bert': round(holdout_accuracy, 4) if holdout_accuracy is not None else None,
+        'seconds': round(seconds, 2),
+    }
+    logger.info(f"Trained embedding classifier on {stats['examples']} titles: {stats}")
+    return stats
+
+
+def predict_embedding(classifier, texts, batch_size=32):
+    """(categories, confidences) for preprocessed titles; confidence is the classifier's top-class probability."""
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model2_reccomender.eish import encoder_version
+
+    if classifier['encoder'] != encoder_version():
+        raise ValueError(f"Embedding classifier was fitted on {classifier['encoder']} embeddings, not {encoder_version()}; "
+                         "retrain it with `manage.py train_embedding_classifier`")
+    label_encoder = get_model('label_encoder')
+    model = classifier['model']
+    probabilities = model.predict_proba(encode_titles(texts, batch_size=batch_size))
+    best = probabilities.argmax(axis=1)
+    categories = label_encoder.inverse_transform(model.classes_[best]).astype(object)
+    return categories, probabilities[np.arange(len(texts)), best]
+
+
+def benchmark_embedding_categorizer(holdout=0.2, seed=0, batch_size=32):
+    """
+    Hold out `holdout` of the categorized titles, fit both embedding classifier modes on the rest and report
+    their accuracy against the stored BERT categories, next to titles/sec (preprocessed titles, encoding
+    included) for BERT and for MiniLM plus each classifier.
+    """
+    from django.conf import settings
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model.categorizer import predict_texts
+    from job_recommendation.model.title_classifier import training_data
+
+    texts, labels = training_data()
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_holdout = max(int(len(texts) * holdout), 1)
+    held, fit = order[:n_holdout], order[n_holdout:]
+    held_texts = [texts[i] for i in held]
+    for name in ('job_classifier', 'label_encoder', 'sentence_encoder'):
+        get_model(name)
+
+    started = time.perf_counter()
+    bert_categories, _, _ = predict_texts(held_texts, tiered=False, threshold=None, batch_size=batch_size)
+    bert_seconds = time.perf_counter() - started
+    label_encoder = get_model('label_encoder')
+    results = [{
+        'mode': 'bert',
+        'titles': len(held_texts),
+        'accuracy_vs_stored': round(float(np.mean(label_encoder.transform(bert_categories) == labels[held])), 4),
+        'titles_per_sec': round(len(held_texts) / bert_seconds, 1),
+    }]
+
+    fit_embeddings = encode_titles([texts[i] for i in fit], batch_size=batch_size)
+    for mode in MODES:
+        model = build_embedding_classifier(mode, settings.EMBEDDING_CLASSIFIER_NEIGHBORS).fit(fit_embeddings, labels[fit])
+        started = time.perf_counter()
+        predicted = model.predict(encode_titles(held_texts, batch_size=batch_size))
+        seconds = time.perf_counter() - started
+        results.append({
+            'mode': mode,
+            'titles': len(held_texts),
+            'train_titles': len(fit),
+            'accuracy_vs_stored': round(float(np.mean(predicted == labels[held])), 4),
+            'agreement_with_bert': round(float(np.mean(label_encoder.inverse_transform(predicted) == bert_categories)), 4),
+            'titles_per_sec': round(len(held_texts) / seconds, 1),
+            'speedup': round(bert_seconds / seconds, 2),
+        })
+    return results
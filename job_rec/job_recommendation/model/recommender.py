@@ -0,0 +1,256 @@
+import os
+import time
+import queue
+import logging
+import threading
+import collections
+from concurrent.futures import Future, TimeoutError
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Most recent request latencies kept for the p50/p99 counters
+LATENCY_SAMPLES = 10_000
+
+
+class LRUCache:
+    """Thread-safe least-recently-used map of normalized input text to category; capacity 0 disables it."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def predict_categories(texts):
+    """Category for each preprocessed text, in order, from one forward pass of the process-wide job classifier."""
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model.categorizer import title_batches, predict_batches
+
+    tokenizer, _ = get_model('job_classifier')
+    categories = [None] * len(texts)
+    batches = title_batches(tokenizer, iter(enumerate(texts)), batch_size=max(len(texts), 1), preprocess=None)
+    for rows, predicted, _ in predict_batches(batches):
+        for (position, _), category in zip(rows, predicted):
+            categories[position] = category
+    return categories
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predictions into one forward pass. A daemon worker takes the first queued text,
+    waits at most `max_wait_ms` for more (up to `max_batch_size`) and predicts the distinct texts together.
+    """
+
+    def __init__(self, predict, max_batch_size, max_wait_ms):
+        self.predict = predict
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.batched_requests = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='recommender-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """Future resolving to the category of `text` (already preprocessed)."""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # stop once this batch is answered
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                categories = dict(zip(texts, self.predict(texts)))
+            except Exception as e:
+                logger.exception(f"Category prediction failed for a batch of {len(batch)} requests")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_requests += len(batch)
+            for text, future in batch:
+                future.set_result(categories[text])
+
+
+class RecommenderService:
+    """
+    In-process category recommender: input text is normalized like job titles (preprocess_text), answered
+    from an LRU cache when seen recently and otherwise queued on a MicroBatcher, so concurrent requests
+    share one classifier call. A request the batcher has not answered within `timeout_ms` (None waits
+    forever) is predicted directly on the calling thread, so a stalled or dead worker cannot hang it.
+    Keeps the latency of the last LATENCY_SAMPLES requests for stats().
+    """
+
+    def __init__(self, max_batch_size, max_wait_ms, cache_size, timeout_ms=None, predict=predict_categories):
+        self.cache = LRUCache(cache_size)
+        self.batcher = MicroBatcher(predict, max_batch_size, max_wait_ms)
+        self.predict = predict
+        self.timeout = timeout_ms / 1000 if timeout_ms is not None else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timeouts = 0
+        self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def recommend(self, text):
+        from job_recommendation.model.categorizer import preprocess_text
+
+        started = time.perf_counter()
+        normalized = preprocess_text(text or '')
+        category = self.cache.get(normalized)
+        hit = category is not None
+        timed_out = False
+        if not hit:
+            try:
+                category = self.batcher.submit(normalized).result(timeout=self.timeout)
+            except TimeoutError:
+                logger.warning(f"Category batcher did not answer within {self.timeout}s; predicting directly")
+                timed_out = True
+                category = self.predict([normalized])[0]
+            self.cache.put(normalized, category)
+        with self._lock:
+            self.cache_hits += hit
+            self.cache_misses += not hit
+            self.timeouts += timed_out
+            self._latencies.append(time.perf_counter() - started)
+        return category
+
+    def stats(self):
+        """Request count, p50/p99 latency over the recent requests, cache hit rate, batcher timeouts and mean batch size."""
+        with self._lock:
+            latencies = np.array(self._latencies)
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'requests': lookups,
+            'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2) if len(latencies) else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 2) if len(latencies) else None,
+            'cache_hit_rate': round(self.cache_hits / max(lookups, 1), 4),
+            'cache_entries': len(self.cache),
+            'timeouts': self.timeouts,
+            'batches': self.batcher.batches,
+            'mean_batch_size': round(self.batcher.batched_requests / max(self.batcher.batches, 1), 2),
+        }
+
+    def close(self):
+        self.batcher.close()
+
+
+# The process-wide service and the pid it was started in (its worker thread does not survive a fork)
+_service = None
+_service_pid = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """The process-wide RecommenderService, configured from settings.RECOMMENDER_* and started on first use."""
+    global _service, _service_pid
+    from django.conf import settings
+    from job_recommendation.model_registry import get_model
+
+    with _service_lock:
+        if _service is None or _service_pid != os.getpid():
+            # Load the classifier here rather than inside the first batch
+            get_model('job_classifier')
+            get_model('label_encoder')
+            _service = RecommenderService(
+                settings.RECOMMENDER_MAX_BATCH_SIZE, settings.RECOMMENDER_MAX_WAIT_MS, settings.RECOMMENDER_CACHE_SIZE,
+                timeout_ms=settings.RECOMMENDER_TIMEOUT_MS,
+            )
+            _service_pid = os.getpid()
+            logger.info(f"Started category recommender (batch {settings.RECOMMENDER_MAX_BATCH_SIZE}, "
+                        f"wait {settings.RECOMMENDER_MAX_WAIT_MS} ms, cache {settings.RECOMMENDER_CACHE_SIZE})")
+        return _service
+
+
+def recommend_category(text):
+    """Job category for free text (a profile or a list of skills)."""
+    return get_service().recommend(text)
+
+
+def recommender_stats():
+    """stats() of this process's recommender, or None if it has not served a request yet."""
+    return _service.stats() if _service is not None and _service_pid == os.getpid() else None
+
+
+def benchmark_recommender(n_requests=400, concurrency=16, distinct=100, max_wait_ms=None):
+    """
+    Fire `n_requests` recommend_category calls from `concurrency` threads, cycling through `distinct`
+    user profile texts, with one request per model call (the old behaviour), micro-batched, and
+    micro-batched behind the LRU cache. Reports requests/sec, p50/p99 latency and mean batch size.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from django.conf import settings
+    from job_recommendation.models import User
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model2_reccomender.eeeh import user_profile_text
+
+    max_wait_ms = settings.RECOMMENDER_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+    texts = [
+        user_profile_text(user.academic_qualification, user.experience, user.skills, user.about)
+        for user in User.objects.order_by('id')[:distinct]
+    ] or ['Accountant with experience in auditing and taxation']
+    requests = (texts * (n_requests // len(texts) + 1))[:n_requests]
+    get_model('job_classifier')
+    get_model('label_encoder')
+
+    modes = [
+        ('unbatched', 1, 0, 0),
+        ('micro-batched', settings.RECOMMENDER_MAX_BATCH_SIZE, max_wait_ms, 0),
+        ('micro-batched+cache', settings.RECOMMENDER_MAX_BATCH_SIZE, max_wait_ms, settings.RECOMMENDER_CACHE_SIZE),
+    ]
+    results = []
+    for mode, max_batch_size, wait_ms, cache_size in modes:
+        service = RecommenderService(max_batch_size, wait_ms, cache_size)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(service.recommend, requests))
+            seconds = time.perf_counter() - started
+        finally:
+            service.close()
+        results.append(dict({'mode': mode, 'requests_per_sec': round(len(requests) / seconds, 1)}, **service.stats()))
+    return results
@@ -0,0 +1,65 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Titles looked up per query
+LOOKUP_CHUNK = 5000
+
+# Hits and misses in this process, by categorizer version
+_counters = {}
+
+
+def cache_stats():
+    """Hits, misses and hit rate of the title cache in this process, per categorizer version."""
+    return {
+        model_name: dict(counts, hit_rate=round(counts['hits'] / max(counts['hits'] + counts['misses'], 1), 4))
+        for model_name, counts in _counters.items()
+    }
+
+
+def _record(model_name, hits, misses):
+    counts = _counters.setdefault(model_name, {'hits': 0, 'misses': 0})
+    counts['hits'] += hits
+    counts['misses'] += misses
+
+
+def lookup(titles, model_name):
+    """
+    Cached (category, confidence, tier) for each normalized title in `titles` that has one for `model_name`.
+    Hits and misses are counted per distinct title.
+    """
+    from job_recommendation.models import TitleCategory
+
+    titles = list(titles)
+    found = {}
+    for start in range(0, len(titles), LOOKUP_CHUNK):
+        rows = TitleCategory.objects.filter(
+            model_name=model_name, title__in=titles[start:start + LOOKUP_CHUNK]
+        ).values_list('title', 'category', 'confidence', 'tier')
+        found.update((title, (category, confidence, tier)) for title, category, confidence, tier in rows)
+    _record(model_name, len(found), len(titles) - len(found))
+    return found
+
+
+def store(entries, model_name):
+    """Save {title: (category, confidence, tier)}; titles another process cached meanwhile are left as they are."""
+    from job_recommendation.models import TitleCategory
+
+    TitleCategory.objects.bulk_create(
+        [
+            TitleCategory(title=title, model_name=model_name, category=category, confidence=confidence, tier=tier)
+            for title, (category, confidence, tier) in entries.items()
+        ],
+        batch_size=LOOKUP_CHUNK,
+        ignore_conflicts=True,
+    )
+
+
+def evict_stale(model_name):
+    """Delete cached categories from every categorizer version other than `model_name`. Returns the number of rows removed."""
+    from job_recommendation.models import TitleCategory
+
+    deleted, _ = TitleCategory.objects.exclude(model_name=model_name).delete()
+    if deleted:
+        logger.info(f"Evicted {deleted} cached title categories from stale categorizer versions")
+    return deleted
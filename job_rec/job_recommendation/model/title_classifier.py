@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import tempfile
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HASHING_FEATURES = 2 ** 18
+TIER_LINEAR = 'linear'
+TIER_BERT = 'bert'
+
+
+def build_title_classifier():
+    """Hashed word uni/bigram TF-IDF into a multinomial logistic regression; no vocabulary to fit or store."""
+    from sklearn.pipeline import make_pipeline
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+    return make_pipeline(
+        HashingVectorizer(n_features=HASHING_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm=None),
+        TfidfTransformer(sublinear_tf=True),
+        LogisticRegression(max_iter=1000, C=10.0),
+    )
+
+
+def training_data():
+    """
+    Preprocessed titles and label_encoder ids from jobs_cleaned. Jobs decided by the linear or embedding
+    tier are left out so neither model learns from its own output; categories the label encoder does not
+    know (e.g. typed in on post_job) are skipped.
+    """
+    from job_recommendation.models import JobCleaned, JobCategorization
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model.categorizer import preprocess_text
+
+    label_encoder = get_model('label_encoder')
+    tier_ids = JobCategorization.objects.exclude(tier=TIER_BERT).values_list('job_id', flat=True)
+    rows = JobCleaned.objects.exclude(id__in=tier_ids).values_list('title', 'category').iterator(chunk_size=5000)
+    known = set(label_encoder.classes_)
+    rows = [(title, category) for title, category in rows if title and category in known]
+    texts = [preprocess_text(title) for title, _ in rows]
+    labels = label_encoder.transform([category for _, category in rows]) if rows else np.empty(0, dtype=np.int64)
+    return texts, labels
+
+
+def save_model(model, path):
+    """joblib.dump `model` to `path` through a temporary file, so a running categorizer never loads half a file."""
+    import joblib
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    os.close(fd)
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train_title_classifier(path=None, holdout=0.1, seed=0):
+    """
+    Fit the linear title classifier on training_data() and save it (atomically) to `path`
+    (default settings.MODEL_PATHS['title_classifier']). Returns example/class counts and the
+    agreement with the stored (BERT) categories on a held-out `holdout` share.
+    """
+    from job_recommendation.model_registry import model_path
+
+    path = str(path or model_path('title_classifier'))
+    texts, labels = training_data()
+    if len(set(labels.tolist())) < 2:
+        raise ValueError("Need categorized jobs from at least two categories to train the title classifier")
+
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_holdout = int(len(texts) * holdout)
+    held, fit = order[:n_holdout], order[n_holdout:]
+    started = time.perf_counter()
+    model = build_title_classifier().fit([texts[i] for i in fit], labels[fit])
+    holdout_agreement = float(np.mean(model.predict([texts[i] for i in held]) == labels[held])) if n_holdout else None
+    if n_holdout:
+        # Refit on everything once the held-out agreement is known
+        model = build_title_classifier().fit(texts, labels)
+    seconds = time.perf_counter() - started
+
+    save_model(model, path)
+    stats = {
+        'examples': len(texts),
+        'classes': len(model.classes_),
+        'holdout_agreement': round(holdout_agreement, 4) if holdout_agreement is not None else None,
+        'seconds': round(seconds, 2),
+    }
+    logger.info(f"Trained title classifier on {stats['examples']} titles: {stats}")
+    return stats
+
+
+def predict_linear(model, texts):
+    """(categories, confidences) from the linear model for preprocessed titles; confidence is the top-class probability."""
+    from job_recommendation.model_registry import get_model
+
+    label_encoder = get_model('label_encoder')
+    probabilities = model.predict_proba(texts)
+    best = probabilities.argmax(axis=1)
+    categories = label_encoder.inverse_transform(model.classes_[best]).astype(object)
+    return categories, probabilities[np.arange(len(texts)), best]
+
+
+def benchmark_tiered_categorizer(n_titles=2000, threshold=None, batch_size=32):
+    """
+    Categorize titles from the jobs table BERT-only and tiered (linear model first, BERT below `threshold`,
+    default settings.CATEGORIZER_CONFIDENCE_THRESHOLD). Reports the escalation rate, titles/sec end to end
+    (preprocessing included) for both, and how often the tiered labels agree with BERT-only ones.
+    """
+    from django.conf import settings
+    from job_recommendation.models import Job
+    from job_recommendation.model_registry import get_model
+    from job_recommendation.model.categorizer import categorize_stream
+
+    threshold = settings.CATEGORIZER_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    titles = [title for title in Job.objects.values_list('title', flat=True)[:n_titles] if title]
+    for name in ('job_classifier', 'label_encoder', 'title_classifier'):
+        get_model(name)
+
+    results = {}
+    for tiered in (False, True):
+        categories = np.empty(len(titles), dtype=object)
+        tiers = np.empty(len(titles), dtype=object)
+        started = time.perf_counter()
+        for rows, batch_categories, _, batch_tiers in categorize_stream(
+                iter(enumerate(titles)), batch_size=batch_size, tiered=tiered, threshold=threshold, use_cache=False,
+                embedding=False):
+            positions = [position for position, _ in rows]
+            categories[positions] = batch_categories
+            tiers[positions] = batch_tiers
+        results[tiered] = (categories, tiers, time.perf_counter() - started)
+
+    bert_categories, _, bert_seconds = results[False]
+    tiered_categories, tiers, tiered_seconds = results[True]
+    return [
+        {'mode': 'bert-only', 'titles': len(titles), 'titles_per_sec': round(len(titles) / bert_seconds, 1)},
+        {
+            'mode': 'tiered',
+            'titles': len(titles),
+            'threshold': threshold,
+            'escalation_rate': round(float(np.mean(tiers == TIER_BERT)), 4) if len(titles) else None,
+            'titles_per_sec': round(len(titles) / tiered_seconds, 1),
+            'speedup': round(bert_seconds / tiered_seconds, 2),
+            'agreement_with_bert': round(float(np.mean(tiered_categories == bert_categories)), 4) if len(titles) else None,
+            'linear_agreement_with_bert': round(float(np.mean(
+                tiered_categories[tiers == TIER_LINEAR] == bert_categories[tiers == TIER_LINEAR])), 4)
+            if (tiers == TIER_LINEAR).any() else None,
+        },
+    ]
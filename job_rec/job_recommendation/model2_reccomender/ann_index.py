@@ -0,0 +1,268 @@
+import os
+import time
+import logging
+import tempfile
+import numpy as np
+
+from job_recommendation.model2_reccomender.batch_matching import normalize_rows, top_k_blocked
+
+logger = logging.getLogger(__name__)
+
+# Rebuild the coarse quantizer once the vectors added or removed since training exceed this share of the trained size
+REBUILD_CHURN = 0.5
+
+
+class IVFFlatIndex:
+    """
+    CPU-only inverted-file index over L2-normalized vectors (inner product == cosine).
+    Vectors are assigned to the nearest of `n_lists` k-means centroids; a query scores only the
+    members of its `n_probe` closest lists. Removal is a tombstone; `save` compacts the index.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty(0, dtype='U64')
+        self.vectors = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self.alive = np.empty(0, dtype=bool)
+        self.trained_size = 0
+        self.churn = 0
+        self._positions = {}
+        self._lists = None
+
+    def __len__(self):
+        return len(self._positions)
+
+    def build(self, ids, vectors, hashes=None):
+        """Train the centroids on `vectors` and index them, replacing any previous content."""
+        from sklearn.cluster import MiniBatchKMeans
+
+        vectors = normalize_rows(vectors)
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors)) or 1
+        if len(vectors) > n_lists:
+            kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.seed, n_init=1, batch_size=4096)
+            kmeans.fit(vectors)
+            self.centroids = normalize_rows(kmeans.cluster_centers_)
+        else:
+            self.centroids = vectors.copy() if len(vectors) else np.zeros((1, vectors.shape[1]), dtype=np.float32)
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty(0, dtype='U64')
+        self.vectors = np.empty((0, self.centroids.shape[1]), dtype=np.float32)
+        self.assignments = np.empty(0, dtype=np.int32)
+        self.alive = np.empty(0, dtype=bool)
+        self._positions = {}
+        self.add(ids, vectors, hashes)
+        self.trained_size = len(self)
+        self.churn = 0
+        return self
+
+    def add(self, ids, vectors, hashes=None):
+        """Index new vectors; ids that are already present are replaced."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        self.remove(ids)
+        vectors = normalize_rows(vectors)
+        hashes = np.asarray(hashes if hashes is not None else [''] * len(ids), dtype='U64')
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+        start = len(self.ids)
+        self.ids = np.concatenate([self.ids, ids])
+        self.hashes = np.concatenate([self.hashes, hashes])
+        self.vectors = np.vstack([self.vectors, vectors])
+        self.assignments = np.concatenate([self.assignments, assignments])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        self._positions.update(zip(ids.tolist(), range(start, start + len(ids))))
+        self._lists = None
+
+    def remove(self, ids):
+        """Drop vectors by id; unknown ids are ignored."""
+        for job_id in np.asarray(ids, dtype=np.int64).tolist():
+            position = self._positions.pop(job_id, None)
+            if position is not None:
+                self.alive[position] = False
+                self._lists = None
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            rows = np.flatnonzero(self.alive)
+            order = np.argsort(self.assignments[rows], kind='stable')
+            rows = rows[order]
+            bounds = np.searchsorted(self.assignments[rows], np.arange(len(self.centroids) + 1))
+            self._lists = [rows[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        return self._lists
+
+    def query(self, queries, k, n_probe=None):
+        """
+        Return (ids, scores) of the k nearest indexed vectors for each query row, both shaped
+        (n_queries, k) and sorted by descending score. Missing slots are id -1 and score -inf.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        result_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        result_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if not len(self):
+            return result_ids, result_scores
+
+        lists = self._inverted_lists()
+        centroid_scores = queries @ self.centroids.T
+        if n_probe < len(self.centroids):
+            probes = np.argpartition(centroid_scores, -n_probe, axis=1)[:, -n_probe:]
+        else:
+            probes = np.tile(np.arange(len(self.centroids)), (len(queries), 1))
+
+        for row, (query, probe) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([lists[i] for i in probe])
+            if not len(candidates):
+                continue
+            indices, scores = top_k_blocked(query[None, :], self.vectors[candidates], k)
+            found = indices.shape[1]
+            result_ids[row, :found] = self.ids[candidates[indices[0]]]
+            result_scores[row, :found] = scores[0]
+        return result_ids, result_scores
+
+    def save(self, path):
+        """Compact and write the index atomically to `path` (.npz)."""
+        keep = self.alive
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.npz', delete=False) as handle:
+            np.savez(
+                handle,
+                centroids=self.centroids,
+                ids=self.ids[keep],
+                hashes=self.hashes[keep],
+                vectors=self.vectors[keep],
+                assignments=self.assignments[keep],
+                params=np.array([self.n_lists or 0, self.n_probe, self.seed, self.trained_size, self.churn], dtype=np.int64),
+            )
+        os.replace(handle.name, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_lists, n_probe, seed, trained_size, churn = data['params'].tolist()
+            index = cls(n_lists=n_lists or None, n_probe=n_probe, seed=seed)
+            index.centroids = data['centroids']
+            index.ids = data['ids']
+            index.hashes = data['hashes']
+            index.vectors = data['vectors']
+            index.assignments = data['assignments']
+        index.alive = np.ones(len(index.ids), dtype=bool)
+        index.trained_size = trained_size
+        index.churn = churn
+        index._positions = dict(zip(index.ids.tolist(), range(len(index.ids))))
+        return index
+
+
+_loaded = {}
+
+
+def index_path(model_name):
+    from django.conf import settings
+    return os.path.join(settings.JOB_ANN_INDEX_DIR, f"job_index_{model_name.replace('/', '_')}.npz")
+
+
+def load_job_index(model_name):
+    """
+    Return the IVF index for the job embedding store, bringing it up to date first.
+    New or changed jobs are added, deleted jobs are removed, and the centroids are retrained only
+    when the index is missing or the jobs added, changed or removed since it was trained exceed
+    REBUILD_CHURN of the trained size (expired postings keep the size steady while the corpus turns over).
+    The index is kept in memory per process and re-read when the file on disk changes.
+    """
+    from django.conf import settings
+    from job_recommendation.models import JobEmbedding
+    from job_recommendation.model2_reccomender.embedding_store import EMBEDDING_DTYPE
+
+    path = index_path(model_name)
+    index = None
+    if os.path.exists(path):
+        mtime = os.path.getmtime(path)
+        cached = _loaded.get(path)
+        index = cached[1] if cached and cached[0] == mtime else IVFFlatIndex.load(path)
+        _loaded[path] = (mtime, index)
+
+    stored = dict(JobEmbedding.objects.filter(model_name=model_name).values_list('job_id', 'content_hash'))
+    indexed = {} if index is None else dict(zip(index.ids[index.alive].tolist(), index.hashes[index.alive].tolist()))
+    changed = [job_id for job_id, digest in stored.items() if indexed.get(job_id) != digest]
+    removed = [job_id for job_id in indexed if job_id not in stored]
+    rebuild = index is None or index.churn + len(changed) + len(removed) > index.trained_size * REBUILD_CHURN
+    if index is not None:
+        index.n_probe = settings.JOB_ANN_N_PROBE
+    if not changed and not removed and not rebuild:
+        return index
+
+    def fetch(job_ids):
+        rows = JobEmbedding.objects.filter(model_name=model_name, job_id__in=job_ids).values_list('job_id', 'content_hash', 'vector')
+        rows = list(rows.iterator(chunk_size=2000))
+        vectors = np.vstack([np.frombuffer(vector, dtype=EMBEDDING_DTYPE) for _, _, vector in rows]) if rows else None
+        return [job_id for job_id, _, _ in rows], [digest for _, digest, _ in rows], vectors
+
+    started = time.perf_counter()
+    if rebuild:
+        job_ids, hashes, vectors = fetch(list(stored))
+        if vectors is None:
+            return IVFFlatIndex()
+        index = IVFFlatIndex(n_probe=settings.JOB_ANN_N_PROBE).build(job_ids, vectors, hashes)
+    else:
+        index.remove(removed)
+        if changed:
+            job_ids, hashes, vectors = fetch(changed)
+            index.add(job_ids, vectors, hashes)
+        index.churn += len(changed) + len(removed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    index.save(path)
+    _loaded[path] = (os.path.getmtime(path), index)
+    logger.info(f"Updated job index {path}: rebuild={rebuild}, added={len(changed)}, removed={len(removed)}, "
+                f"size={len(index)} in {time.perf_counter() - started:.2f}s")
+    return index
+
+
+def benchmark_ann_recall(model_name=None, n_queries=500, k=6, n_probes=(1, 2, 4, 8, 16, 32), seed=0, synthetic=False):
+    """
+    Report recall@k and query latency of the IVF index against exact brute force for several
+    n_probe values. Uses the job embedding store's vectors for `model_name` (default: the current
+    encoder), or 10k synthetic clustered vectors with `synthetic`. Queries are jobs perturbed with
+    noise, standing in for profiles.
+    """
+    rng = np.random.default_rng(seed)
+    if synthetic:
+        centers = rng.standard_normal((200, 384), dtype=np.float32)
+        vectors = centers[rng.integers(0, 200, 10_000)] + 0.5 * rng.standard_normal((10_000, 384), dtype=np.float32)
+        job_ids = np.arange(len(vectors))
+    else:
+        from job_recommendation.model2_reccomender.eish import encoder_version
+        from job_recommendation.model2_reccomender.embedding_store import load_job_matrix
+        model_name = model_name or encoder_version()
+        job_ids, vectors = load_job_matrix(model_name)
+        if not len(job_ids):
+            raise ValueError(f"No job embeddings stored for {model_name}; run the matcher first or pass synthetic=True")
+    vectors = normalize_rows(vectors)
+    queries = normalize_rows(vectors[rng.integers(0, len(vectors), n_queries)]
+                             + 0.5 * rng.standard_normal((n_queries, vectors.shape[1]), dtype=np.float32) / np.sqrt(vectors.shape[1]))
+
+    started = time.perf_counter()
+    exact_indices, _ = top_k_blocked(queries, vectors, k)
+    exact_ms = (time.perf_counter() - started) * 1000 / n_queries
+    exact = [set(row) for row in np.asarray(job_ids)[exact_indices].tolist()]
+
+    started = time.perf_counter()
+    index = IVFFlatIndex(seed=seed).build(job_ids, vectors)
+    build_seconds = time.perf_counter() - started
+
+    results = [{'mode': 'exact', 'vectors': 'synthetic' if synthetic else 'stored', 'jobs': len(job_ids), 'n_probe': '-', f'recall@{k}': 1.0, 'ms_per_query': round(exact_ms, 3)}]
+    for n_probe in n_probes:
+        started = time.perf_counter()
+        found, _ = index.query(queries, k, n_probe=n_probe)
+        ms = (time.perf_counter() - started) * 1000 / n_queries
+        recall = np.mean([len(exact_row & set(row)) / k for exact_row, row in zip(exact, found.tolist())])
+        results.append({'mode': 'ivf', 'jobs': len(job_ids), 'n_lists': len(index.centroids), 'n_probe': n_probe,
+                        f'recall@{k}': round(float(recall), 4), 'ms_per_query': round(ms, 3),
+                        'build_seconds': round(build_seconds, 2)})
+    return results
@@ -0,0 +1,78 @@
+import time
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 1024
+
+
+# Function to L2-normalize each row so a dot product is a cosine similarity
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_blocked(user_matrix, job_matrix, k, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Score every user against every job and keep the k best jobs per user.
+    Both matrices must already be L2-normalized. Users are scored `block_size` rows at a time,
+    so peak memory for the score matrix is block_size x n_jobs regardless of the number of users.
+    Returns (indices, scores), both shaped (n_users, k) and sorted by descending score.
+    """
+    n_users, n_jobs = len(user_matrix), len(job_matrix)
+    k = min(k, n_jobs)
+    top_indices = np.empty((n_users, k), dtype=np.int64)
+    top_scores = np.empty((n_users, k), dtype=np.float32)
+    if k == 0:
+        return top_indices, top_scores
+
+    job_matrix_t = np.ascontiguousarray(job_matrix.T)
+    for start in range(0, n_users, block_size):
+        scores = user_matrix[start:start + block_size] @ job_matrix_t
+        if k < n_jobs:
+            candidates = np.argpartition(scores, n_jobs - k, axis=1)[:, n_jobs - k:]
+        else:
+            candidates = np.tile(np.arange(n_jobs), (len(scores), 1))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        top_indices[start:start + block_size] = np.take_along_axis(candidates, order, axis=1)
+        top_scores[start:start + block_size] = np.take_along_axis(candidate_scores, order, axis=1)
+    return top_indices, top_scores
+
+
+def benchmark_batch_matching(user_counts=(1_000, 10_000, 100_000), n_jobs=10_000, dim=384, top_n=6,
+                             block_size=DEFAULT_BLOCK_SIZE, legacy_sample=200, seed=0):
+    """
+    Time top_k_blocked on random unit vectors (MiniLM has 384 dimensions) against the old
+    per-user cosine_similarity + argsort loop. The legacy path is timed on `legacy_sample`
+    users and extrapolated. Returns a list of result dicts.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    rng = np.random.default_rng(seed)
+    job_matrix = normalize_rows(rng.standard_normal((n_jobs, dim), dtype=np.float32))
+
+    results = []
+    for n_users in user_counts:
+        user_matrix = normalize_rows(rng.standard_normal((n_users, dim), dtype=np.float32))
+
+        started = time.perf_counter()
+        top_k_blocked(user_matrix, job_matrix, top_n, block_size=block_size)
+        blocked_seconds = time.perf_counter() - started
+
+        sample = user_matrix[:legacy_sample]
+        started = time.perf_counter()
+        for row in sample:
+            similarities = cosine_similarity([row], job_matrix)[0]
+            similarities.argsort()[-top_n:][::-1]
+        legacy_seconds = (time.perf_counter() - started) * n_users / len(sample)
+
+        results.append({
+            'users': n_users,
+            'jobs': n_jobs,
+            'blocked_seconds': round(blocked_seconds, 3),
+            'blocked_users_per_sec': round(n_users / blocked_seconds),
+            'legacy_seconds_estimated': round(legacy_seconds, 3),
+            'speedup': round(legacy_seconds / blocked_seconds, 1),
+        })
+    return results
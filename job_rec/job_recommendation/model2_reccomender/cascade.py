@@ -0,0 +1,151 @@
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('tfidf', 'bi_encoder', 'cross_encoder')
+
+
+# Function to keep the `k` highest-scoring columns of each row (unordered); -inf columns are never kept over finite ones
+def top_k_columns(scores, k):
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        return np.argpartition(scores, scores.shape[1] - k, axis=1)[:, scores.shape[1] - k:]
+    return np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+
+
+def cascade_recommend(user_ids, top_n=6, tfidf_width=None, bi_encoder_width=None, user_block_size=64):
+    """
+    Rank jobs for `user_ids` in three stages, each scoring only the previous stage's survivors:
+    the persisted TF-IDF index (koma.load_job_tfidf_index) keeps `tfidf_width`
+    (settings.CASCADE_TFIDF_WIDTH), MiniLM cosine keeps `bi_encoder_width`
+    (settings.CASCADE_BI_ENCODER_WIDTH) and the cross-encoder's match probability picks the final
+    `top_n`. Users with fewer TF-IDF matches than `tfidf_width` are topped up from the bi-encoder.
+    Returns (ranked_by_user, timings): user_id -> [(job_id, probability)] best first, and per stage
+    the wall-clock seconds and the number of (user, job) pairs scored.
+    """
+    from django.conf import settings
+    from job_recommendation.models import User, JobCleaned
+    from job_recommendation.model2_reccomender import eeeh
+    from job_recommendation.model2_reccomender.koma import load_job_tfidf_index, user_tfidf_text
+    from job_recommendation.model2_reccomender.batch_matching import normalize_rows
+    from job_recommendation.model2_reccomender.eish import (
+        compute_embeddings, encoder_version, top_jobs_for_embeddings, user_profile_text,
+    )
+    from job_recommendation.model2_reccomender.embedding_store import load_job_matrix, sync_job_embeddings
+
+    tfidf_width = tfidf_width or settings.CASCADE_TFIDF_WIDTH
+    bi_encoder_width = bi_encoder_width or settings.CASCADE_BI_ENCODER_WIDTH
+    timings = {stage: {'seconds': 0.0, 'pairs': 0} for stage in STAGES}
+
+    started = time.perf_counter()
+    tfidf_index = load_job_tfidf_index()
+    timings['tfidf']['seconds'] += time.perf_counter() - started
+    sync_job_embeddings(compute_embeddings, encoder_version())
+
+    users = list(User.objects.filter(id__in=list(user_ids)).order_by('id'))
+    ranked_by_user = {}
+    for start in range(0, len(users), user_block_size):
+        block = users[start:start + user_block_size]
+
+        # Stage 1: sparse TF-IDF cosine against every indexed job
+        started = time.perf_counter()
+        rows, tfidf_ids, _ = tfidf_index.query([user_tfidf_text(user) for user in block], tfidf_width)
+        candidates = np.full((len(block), tfidf_width), -1, dtype=np.int64)
+        bounds = np.searchsorted(rows, np.arange(len(block) + 1))
+        for row in range(len(block)):
+            candidates[row, :bounds[row + 1] - bounds[row]] = tfidf_ids[bounds[row]:bounds[row + 1]]
+        timings['tfidf']['seconds'] += time.perf_counter() - started
+        timings['tfidf']['pairs'] += len(block) * len(tfidf_index)
+
+        # Stage 2: MiniLM cosine over the TF-IDF candidates, topped up from the bi-encoder where TF-IDF found too few
+        started = time.perf_counter()
+        user_matrix = normalize_rows(compute_embeddings([user_profile_text(user) for user in block]))
+        short = np.flatnonzero((candidates == -1).any(axis=1))
+        if len(short):
+            fallback_ids, _ = top_jobs_for_embeddings(user_matrix[short], tfidf_width)
+            for row, fallback in zip(short, fallback_ids):
+                found = candidates[row][candidates[row] != -1]
+                seen = set(found.tolist())
+                extra = [job_id for job_id in fallback.tolist() if job_id != -1 and job_id not in seen][:tfidf_width - len(found)]
+                candidates[row, len(found):len(found) + len(extra)] = extra
+        stored_ids, stored_matrix = load_job_matrix(encoder_version(), np.unique(candidates[candidates != -1]).tolist())
+        scores = np.full(candidates.shape, -np.inf, dtype=np.float32)
+        if len(stored_ids):
+            positions = np.searchsorted(stored_ids, candidates).clip(0, len(stored_ids) - 1)
+            found = stored_ids[positions] == candidates
+            scores[found] = np.einsum('ukd,ud->uk', normalize_rows(stored_matrix)[positions], user_matrix)[found]
+        keep = top_k_columns(scores, bi_encoder_width)
+        survivors = np.take_along_axis(candidates, keep, axis=1)
+        survivor_scores = np.take_along_axis(scores, keep, axis=1)
+        timings['bi_encoder']['seconds'] += time.perf_counter() - started
+        timings['bi_encoder']['pairs'] += int((candidates != -1).sum())
+
+        # Stage 3: cross-encoder over the bi-encoder survivors (each job once per user)
+        started = time.perf_counter()
+        survivors_by_row = [
+            list(dict.fromkeys(survivors[row][np.isfinite(survivor_scores[row])].tolist())) for row in range(len(block))
+        ]
+        jobs = {
+            job_id: (title, category)
+            for job_id, title, category in JobCleaned.objects.filter(
+                id__in={job_id for job_ids in survivors_by_row for job_id in job_ids}
+            ).values_list('id', 'title', 'category')
+        }
+        survivors_by_row = [[job_id for job_id in job_ids if job_id in jobs] for job_ids in survivors_by_row]
+        user_texts = [
+            eeeh.user_profile_text(user.academic_qualification, user.experience, user.skills, user.about) for user in block
+        ]
+        probabilities = eeeh.score_pairs(
+            [user_texts[row] for row, job_ids in enumerate(survivors_by_row) for _ in job_ids],
+            [eeeh.job_text(*jobs[job_id]) for job_ids in survivors_by_row for job_id in job_ids],
+        )
+        offset = 0
+        for user, job_ids in zip(block, survivors_by_row):
+            user_probabilities = probabilities[offset:offset + len(job_ids)]
+            offset += len(job_ids)
+            order = np.argsort(-user_probabilities, kind='stable')[:top_n]
+            ranked_by_user[user.id] = [(job_ids[i], float(user_probabilities[i])) for i in order]
+        timings['cross_encoder']['pairs'] += offset
+        timings['cross_encoder']['seconds'] += time.perf_counter() - started
+
+    logger.info('Cascade for %d users: %s', len(users), ', '.join(
+        f"{stage} {timing['seconds'] * 1000:.1f} ms / {timing['pairs']} pairs" for stage, timing in timings.items()
+    ))
+    return ranked_by_user, timings
+
+
+def benchmark_cascade(n_users=20, top_n=6, tfidf_width=None, bi_encoder_width=None):
+    """
+    Run cascade_recommend one user at a time (as profile re-matches do) for the first `n_users`
+    users and report per-stage latency percentiles, plus how many of the final jobs the plain
+    bi-encoder would also have picked.
+    """
+    from job_recommendation.models import User
+    from job_recommendation.model2_reccomender.eish import recommend_jobs_for_user
+
+    per_stage = {stage: [] for stage in STAGES + ('total',)}
+    overlap = []
+    for user_id in User.objects.order_by('id').values_list('id', flat=True)[:n_users]:
+        started = time.perf_counter()
+        ranked, timings = cascade_recommend([user_id], top_n, tfidf_width=tfidf_width, bi_encoder_width=bi_encoder_width)
+        per_stage['total'].append(time.perf_counter() - started)
+        for stage in STAGES:
+            per_stage[stage].append(timings[stage]['seconds'])
+        cascade_ids = {job_id for job_id, _ in ranked.get(user_id, [])}
+        bi_encoder_ids = {job.id for job, _ in recommend_jobs_for_user(user_id, top_n)}
+        if bi_encoder_ids:
+            overlap.append(len(cascade_ids & bi_encoder_ids) / len(bi_encoder_ids))
+
+    results = [
+        {
+            'stage': stage,
+            'users': len(seconds),
+            'p50_ms': round(float(np.percentile(seconds, 50)) * 1000, 1) if seconds else None,
+            'p95_ms': round(float(np.percentile(seconds, 95)) * 1000, 1) if seconds else None,
+        }
+        for stage, seconds in per_stage.items()
+    ]
+    results.append({'stage': 'overlap_with_bi_encoder', 'mean': round(float(np.mean(overlap)), 3) if overlap else None})
+    return results
@@ -1,25 +1,26 @@
 import torch
-from torch.utils.data import Dataset, DataLoader
 from transformers import BertTokenizer, BertForSequenceClassification
+import numpy as np
 import pandas as pd
 import os
+import csv
+import time
+import resource
 import itertools
+from pathlib import Path
 
 # --------------------------------------------
 # STEP 1: Configuration
 # --------------------------------------------
-MODEL_DIR = r"C:\Users\LENOVO\job_recommendation_system\job_rec\job_recommendation\model2_reccomender"
-USER_DATA_PATH = r"job_rec\job_recommendation\model2_reccomender\user_data.csv"
-JOB_LISTINGS_PATH = r"job_rec\job_recommendation\model2_reccomender\data.csv"
+MODEL_DIR = str(Path(__file__).resolve().parent)
+USER_DATA_PATH = os.path.join(MODEL_DIR, "user_data.csv")
+JOB_LISTINGS_PATH = os.path.join(MODEL_DIR, "data.csv")
 BATCH_SIZE = 16
 MAX_LENGTH = 256
+BUCKET_BATCHES = 64  # pairs are sorted by length within windows of BUCKET_BATCHES * BATCH_SIZE
+MATCH_LABEL = 1  # LABEL_1 is the "match" label
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-# Verify file paths
-print(f"Model directory exists: {os.path.exists(MODEL_DIR)}")
-print(f"User data file exists: {os.path.exists(USER_DATA_PATH)}")
-print(f"Job listings file exists: {os.path.exists(JOB_LISTINGS_PATH)}")
-
 # --------------------------------------------
 # STEP 2: Load Model and Tokenizer
 # --------------------------------------------
@@ -35,10 +36,54 @@ def load_model_and_tokenizer(model_dir):
     except Exception as e:
         raise ValueError(f"Failed to load model or tokenizer from {model_dir}: {str(e)}")
 
-if not os.path.exists(MODEL_DIR):
-    raise FileNotFoundError(f"Model directory {MODEL_DIR} does not exist")
+# Function to get the process-wide cross-encoder (settings.MODEL_PATHS['cross_encoder'])
+def get_cross_encoder():
+    from job_recommendation.model_registry import get_model
+    tokenizer, model = get_model('cross_encoder')
+    return tokenizer, model.to(DEVICE)
+
+# Function to build the user side of a pair, in the format the cross-encoder was trained on
+def user_profile_text(academic_qualification, experience, skills, about):
+    if isinstance(skills, (list, tuple)):
+        skills = ', '.join(skills)
+    return " | ".join([
+        academic_qualification or 'No qualification',
+        f"{experience if experience is not None else 0} years experience",
+        (skills or '').rstrip(',') or 'No skills provided',
+        about or 'No description',
+    ])
+
+# Function to build the job side of a pair
+def job_text(title, category):
+    return f"{title or 'No title'} | {category or 'No category'}"
+
+# Function to score (user_text, job_text) pairs with the cross-encoder
+def score_pairs(user_texts, job_texts, batch_size=BATCH_SIZE, max_length=MAX_LENGTH, use_cache=None):
+    """
+    Return the match probability (softmax of LABEL_1) for each pair as a float32 array.
+    Each distinct text is tokenized once; pairs are length-bucketed and padded per batch. With
+    `use_cache` (default settings.PAIR_SCORE_CACHE_ENABLED) pairs scored before by the same model
+    version are read from the pair_scores table instead.
+    """
+    from django.conf import settings
+    from job_recommendation.model_registry import model_version
+    from job_recommendation.model2_reccomender.embedding_store import content_hash
 
-tokenizer, model = load_model_and_tokenizer(MODEL_DIR)
+    tokenizer, model = get_cross_encoder()
+    unique_users = {text: i for i, text in enumerate(dict.fromkeys(user_texts))}
+    unique_jobs = {text: i for i, text in enumerate(dict.fromkeys(job_texts))}
+    pairs = ((unique_users[user_text], unique_jobs[job_text]) for user_text, job_text in zip(user_texts, job_texts))
+    if use_cache is None:
+        use_cache = settings.PAIR_SCORE_CACHE_ENABLED
+    probabilities = np.empty(len(user_texts), dtype=np.float32)
+    for positions, _, _, _, probs in stream_predictions(
+            tokenizer, model, tokenize_texts(tokenizer, list(unique_users)), tokenize_texts(tokenizer, list(unique_jobs)),
+            enumerate_pairs(pairs), batch_size=batch_size, max_length=max_length,
+            user_hashes=[content_hash(text) for text in unique_users] if use_cache else None,
+            job_hashes=[content_hash(text) for text in unique_jobs] if use_cache else None,
+            model_name=model_version('cross_encoder') if use_cache else None):
+        probabilities[positions] = probs
+    return probabilities
 
 # --------------------------------------------
 # STEP 3: Load and Prepare Data
@@ -95,110 +140,210 @@ def load_data(user_file_path, job_file_path):
     print(df_users[['email', 'user_profile']].head())
     print("\nSample job listings:")
     print(df_jobs[['id', 'job_text']].head())
-    
-    pairs = list(itertools.product(df_users.index, df_jobs.index))
-    df_pairs = pd.DataFrame(pairs, columns=['user_idx', 'job_idx'])
-    df_pairs['user_profile'] = df_users.loc[df_pairs['user_idx'], 'user_profile'].values
-    df_pairs['job_text'] = df_jobs.loc[df_pairs['job_idx'], 'job_text'].values
-    
-    return df_users, df_jobs, df_pairs
 
-df_users, df_jobs, df_pairs = load_data(USER_DATA_PATH, JOB_LISTINGS_PATH)
+    return df_users, df_jobs
 
 # --------------------------------------------
-# STEP 4: Define Dataset
+# STEP 4: Stream Tokenized Pairs
 # --------------------------------------------
-class JobMatchingDataset(Dataset):
-    def __init__(self, df, tokenizer, max_length=MAX_LENGTH):
-        self.df = df
-        self.tokenizer = tokenizer
-        self.max_length = max_length
-
-    def __len__(self):
-        return len(self.df)
-
-    def __getitem__(self, idx):
-        user_text = self.df.iloc[idx]['user_profile']
-        job_text = self.df.iloc[idx]['job_text']
-
-        encoded = self.tokenizer(
-            user_text,
-            job_text,
-            padding='max_length',
-            truncation=True,
-            max_length=self.max_length,
-            return_tensors='pt'
-        )
-
-        if idx < 5:
-            print(f"Sample {idx}:")
-            print(f"User text: {user_text}")
-            print(f"Job text: {job_text}")
-            print(f"Tokenized input IDs: {encoded['input_ids'].squeeze()[:10]}")
-            print(f"Attention mask: {encoded['attention_mask'].squeeze()[:10]}")
-
-        return {
-            'input_ids': encoded['input_ids'].squeeze(),
-            'attention_mask': encoded['attention_mask'].squeeze(),
-            'user_idx': self.df.iloc[idx]['user_idx'],
-            'job_idx': self.df.iloc[idx]['job_idx']
-        }
-
-dataset = JobMatchingDataset(df_pairs, tokenizer)
-loader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=False)
+# Function to tokenize each text once, without special tokens; pairs are assembled from these ids
+def tokenize_texts(tokenizer, texts):
+    return tokenizer(list(texts), add_special_tokens=False)['input_ids']
+
+# Function to number pairs in the order they are produced, so out-of-order results can be put back
+def enumerate_pairs(pairs):
+    for position, (user_idx, job_idx) in enumerate(pairs):
+        yield position, user_idx, job_idx
+
+def truncated_lengths(user_length, job_length, budget):
+    """Token counts kept from each side, matching the tokenizer's 'longest_first' truncation."""
+    if user_length + job_length <= budget:
+        return user_length, job_length
+    # Tokens come off the longer side first (the job side on ties), so the odd token stays on the longer one
+    half = (budget + 1) // 2 if user_length > job_length else budget // 2
+    kept_user = min(user_length, max(half, budget - job_length))
+    return kept_user, budget - kept_user
+
+def pair_batches(tokenizer, user_tokens, job_tokens, pairs, batch_size=BATCH_SIZE, max_length=MAX_LENGTH,
+                 bucket_batches=BUCKET_BATCHES):
+    """
+    Turn a stream of (position, user_idx, job_idx) into model batches without materializing all pairs.
+    Pairs are read BUCKET_BATCHES batches at a time, sorted by length and cut into batches padded only to
+    their own longest pair. Yields (positions, user_idx, job_idx, input_ids, attention_mask).
+    """
+    cls_id, sep_id, pad_id = tokenizer.cls_token_id, tokenizer.sep_token_id, tokenizer.pad_token_id
+    budget = max_length - 3  # [CLS] user [SEP] job [SEP]
+    while True:
+        window = list(itertools.islice(pairs, batch_size * bucket_batches))
+        if not window:
+            return
+        lengths = [truncated_lengths(len(user_tokens[u]), len(job_tokens[j]), budget) for _, u, j in window]
+        order = sorted(range(len(window)), key=lambda i: sum(lengths[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            width = max(sum(lengths[i]) for i in batch) + 3
+            input_ids = np.full((len(batch), width), pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                _, u, j = window[i]
+                user_length, job_length = lengths[i]
+                ids = [cls_id] + user_tokens[u][:user_length] + [sep_id] + job_tokens[j][:job_length] + [sep_id]
+                input_ids[row, :len(ids)] = ids
+                attention_mask[row, :len(ids)] = 1
+            yield (
+                np.array([window[i][0] for i in batch]),
+                np.array([window[i][1] for i in batch]),
+                np.array([window[i][2] for i in batch]),
+                torch.from_numpy(input_ids),
+                torch.from_numpy(attention_mask),
+            )
 
 # --------------------------------------------
 # STEP 5: Predict Matches
 # --------------------------------------------
-def predict_matches(model, data_loader, df_users, df_jobs):
-    results = []
-    pred_counts = {i: 0 for i in range(15)}  # Support 15 labels
-    
+def predict_pairs(model, batches):
+    """Yield (positions, user_idx, job_idx, predicted labels, LABEL_1 probabilities) for each batch from pair_batches."""
     with torch.no_grad():
-        for batch in data_loader:
-            input_ids = batch['input_ids'].to(DEVICE)
-            attention_mask = batch['attention_mask'].to(DEVICE)
-            user_indices = batch['user_idx'].tolist()
-            job_indices = batch['job_idx'].tolist()
-
-            outputs = model(input_ids=input_ids, attention_mask=attention_mask)
-            logits = outputs.logits
+        for positions, user_idx, job_idx, input_ids, attention_mask in batches:
+            logits = model(input_ids=input_ids.to(DEVICE), attention_mask=attention_mask.to(DEVICE)).logits
             probs = torch.softmax(logits, dim=1)
-            preds = torch.argmax(logits, dim=1)
-
-            for pred in preds.tolist():
-                pred_counts[pred] += 1
-            print(f"Batch prediction counts: {pred_counts}")
-            print(f"Sample probabilities for LABEL_1: {probs[:, 1][:5].tolist()}")
-
-            for user_idx, job_idx, pred, prob in zip(user_indices, job_indices, preds.tolist(), probs[:, 1].tolist()):
-                results.append({
-                    'user_email': df_users.iloc[user_idx]['email'],
-                    'user_name': df_users.iloc[user_idx]['name'],
-                    'job_id': df_jobs.iloc[job_idx]['id'],
-                    'job_title': df_jobs.iloc[job_idx]['title'],
-                    'job_category': df_jobs.iloc[job_idx]['category'],
-                    'user_profile': df_users.iloc[user_idx]['user_profile'],
-                    'job_text': df_jobs.iloc[job_idx]['job_text'],
-                    'prediction': pred,
-                    'match_probability': prob
-                })
-
-    print(f"Final prediction counts: {pred_counts}")
-    return pd.DataFrame(results)
-
-df_results = predict_matches(model, loader, df_users, df_jobs)
+            yield positions, user_idx, job_idx, torch.argmax(logits, dim=1).cpu().numpy(), probs[:, MATCH_LABEL].cpu().numpy()
+
+# Function to run the cross-encoder over a pair stream, serving cached pairs when `model_name` is given
+def stream_predictions(tokenizer, model, user_tokens, job_tokens, pairs, batch_size=BATCH_SIZE, max_length=MAX_LENGTH,
+                       user_hashes=None, job_hashes=None, model_name=None):
+    def predict(pair_list):
+        return predict_pairs(model, pair_batches(tokenizer, user_tokens, job_tokens, iter(pair_list),
+                                                 batch_size=batch_size, max_length=max_length))
+    if model_name is None:
+        return predict(pairs)
+    from job_recommendation.model2_reccomender.pair_cache import cached_stream
+    return cached_stream(pairs, user_hashes, job_hashes, model_name, predict)
+
+def predict_matches(tokenizer, model, df_users, df_jobs, output_path, batch_size=BATCH_SIZE, max_length=MAX_LENGTH,
+                    model_name=None):
+    """
+    Score every user x job pair and append each predicted match (LABEL_1 wins) to `output_path` as it is
+    produced, so memory stays flat in the number of pairs. With `model_name` (the cross-encoder's model
+    version) pairs whose user and job texts were scored before come from the pair-score cache.
+    Returns pairs scored, matches written, pairs/sec, peak RSS in MB and cache hits/misses.
+    """
+    from job_recommendation.model2_reccomender.embedding_store import content_hash
+    from job_recommendation.model2_reccomender.pair_cache import cache_stats
+
+    user_texts = df_users['user_profile'].tolist()
+    job_texts = df_jobs['job_text'].tolist()
+    users = df_users[['email', 'name']].to_numpy()
+    jobs = df_jobs[['id', 'title', 'category']].to_numpy()
+    pairs = enumerate_pairs(itertools.product(range(len(df_users)), range(len(df_jobs))))
+    stream = stream_predictions(
+        tokenizer, model, tokenize_texts(tokenizer, user_texts), tokenize_texts(tokenizer, job_texts), pairs,
+        batch_size=batch_size, max_length=max_length,
+        user_hashes=[content_hash(text) for text in user_texts] if model_name else None,
+        job_hashes=[content_hash(text) for text in job_texts] if model_name else None,
+        model_name=model_name,
+    )
+
+    scored = matched = 0
+    started = time.perf_counter()
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['user_email', 'user_name', 'job_id', 'job_title', 'job_category', 'match_probability'])
+        for _, user_idx, job_idx, preds, probs in stream:
+            scored += len(probs)
+            for u, j, prob in zip(user_idx[preds == MATCH_LABEL], job_idx[preds == MATCH_LABEL], probs[preds == MATCH_LABEL]):
+                writer.writerow([*users[u], *jobs[j], float(prob)])
+                matched += 1
+            f.flush()
+    seconds = time.perf_counter() - started
+    return {
+        'pairs': scored,
+        'matches': matched,
+        'pairs_per_sec': round(scored / seconds, 1) if seconds else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        **(cache_stats().get(model_name, {}) if model_name else {}),
+    }
+
+def benchmark_pair_inference(n_users=50, n_jobs=200, batch_size=BATCH_SIZE, legacy_sample=256):
+    """
+    Stream every pair of the first `n_users` users and `n_jobs` jobs through the cross-encoder and
+    report pairs/sec and peak RSS, against the old per-pair tokenization padded to MAX_LENGTH
+    (timed on `legacy_sample` pairs). Checks both give the same LABEL_1 probabilities.
+    """
+    from job_recommendation.models import User, JobCleaned
+
+    tokenizer, model = get_cross_encoder()
+    user_texts = [
+        user_profile_text(qualification, experience, skills, about)
+        for qualification, experience, skills, about in User.objects.order_by('id').values_list(
+            'academic_qualification', 'experience', 'skills', 'about')[:n_users]
+    ]
+    job_texts = [job_text(title, category) for title, category in JobCleaned.objects.order_by('id').values_list('title', 'category')[:n_jobs]]
+    pairs = list(itertools.islice(itertools.product(range(len(user_texts)), range(len(job_texts))), legacy_sample))
+
+    started = time.perf_counter()
+    streamed = np.empty(len(user_texts) * len(job_texts), dtype=np.float32)
+    for positions, _, _, _, probs in predict_pairs(model, pair_batches(
+            tokenizer, tokenize_texts(tokenizer, user_texts), tokenize_texts(tokenizer, job_texts),
+            enumerate_pairs(itertools.product(range(len(user_texts)), range(len(job_texts)))), batch_size=batch_size)):
+        streamed[positions] = probs
+    streamed_seconds = time.perf_counter() - started
+    peak_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    started = time.perf_counter()
+    legacy = []
+    with torch.no_grad():
+        for start in range(0, len(pairs), batch_size):
+            encoded = [tokenizer(user_texts[u], job_texts[j], padding='max_length', truncation=True, max_length=MAX_LENGTH,
+                                 return_tensors='pt') for u, j in pairs[start:start + batch_size]]
+            logits = model(input_ids=torch.cat([e['input_ids'] for e in encoded]).to(DEVICE),
+                           attention_mask=torch.cat([e['attention_mask'] for e in encoded]).to(DEVICE)).logits
+            legacy.extend(torch.softmax(logits, dim=1)[:, MATCH_LABEL].tolist())
+    legacy_seconds = time.perf_counter() - started
+
+    return [
+        {'path': 'streaming', 'pairs': len(streamed), 'pairs_per_sec': round(len(streamed) / streamed_seconds, 1),
+         'peak_rss_mb': peak_rss_mb},
+        {'path': 'legacy_padded', 'pairs': len(legacy), 'pairs_per_sec': round(len(legacy) / legacy_seconds, 1),
+         'max_probability_diff': round(float(np.abs(streamed[:len(legacy)] - np.array(legacy)).max()), 6) if legacy else None},
+    ]
 
 # --------------------------------------------
-# STEP 6: Output Results
+# Run over the CSV files: every user x every job
 # --------------------------------------------
-# Filter for predicted matches (assuming LABEL_1 is the "match" label)
-df_matches = df_results[df_results['prediction'] == 1][[
-    'user_email', 'user_name', 'job_id', 'job_title', 'job_category', 'match_probability'
-]].sort_values(by='match_probability', ascending=False)
-print("Predicted Matches (LABEL_1):")
-print(df_matches)
-
-# Save results to CSV
-df_matches.to_csv("predicted_matches.csv", index=False)
-print("Results saved to 'predicted_matches.csv'")
\ No newline at end of file
+def main():
+    # Verify file paths
+    print(f"Model directory exists: {os.path.exists(MODEL_DIR)}")
+    print(f"User data file exists: {os.path.exists(USER_DATA_PATH)}")
+    print(f"Job listings file exists: {os.path.exists(JOB_LISTINGS_PATH)}")
+    if not os.path.exists(MODEL_DIR):
+        raise FileNotFoundError(f"Model directory {MODEL_DIR} does not exist")
+
+    tokenizer, model = load_model_and_tokenizer(MODEL_DIR)
+    df_users, df_jobs = load_data(USER_DATA_PATH, JOB_LISTINGS_PATH)
+
+    # Reuse scores of unchanged (user, job) pairs from the pair_scores table
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_rec.settings')
+    django.setup()
+    from django.conf import settings
+    from job_recommendation.model_registry import model_version
+    from job_recommendation.model2_reccomender.pair_cache import evict_stale
+    model_name = None
+    if settings.PAIR_SCORE_CACHE_ENABLED:
+        model_name = model_version('cross_encoder')
+        evict_stale(model_name)
+
+    # --------------------------------------------
+    # STEP 6: Output Results
+    # --------------------------------------------
+    # Predicted matches (LABEL_1) are written to the CSV as they are scored
+    stats = predict_matches(tokenizer, model, df_users, df_jobs, "predicted_matches.csv", model_name=model_name)
+    print(f"Scored {stats['pairs']} pairs at {stats['pairs_per_sec']} pairs/sec, peak RSS {stats['peak_rss_mb']} MB")
+    if model_name:
+        print(f"Pair-score cache: {stats['hits']} hits, {stats['misses']} misses (hit rate {stats['hit_rate']})")
+    print(f"Results saved to 'predicted_matches.csv' ({stats['matches']} predicted matches)")
+
+
+if __name__ == "__main__":
+    main()
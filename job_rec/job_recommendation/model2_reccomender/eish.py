@@ -1,12 +1,30 @@
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import asyncio
 import platform
+import logging
 
-# Load the BERT model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+logger = logging.getLogger(__name__)
+
+# The BERT model is loaded lazily, once per process, through the model registry
+def get_encoder():
+    from job_recommendation.model_registry import get_model
+    return get_model('sentence_encoder')
+
+# Identifier of the current encoder, stored next to every cached job embedding
+def encoder_version():
+    from job_recommendation.model_registry import model_version
+    return model_version('sentence_encoder')
+
+# Identifier of what ranked the stored matches, kept on each MatchRun: cosine scores and cross-encoder
+# probabilities are not comparable, so switching MATCH_CASCADE_ENABLED starts over with a full run
+def match_version():
+    from django.conf import settings
+    from job_recommendation.model_registry import model_version
+    if settings.MATCH_CASCADE_ENABLED:
+        return f"cascade:{encoder_version()}|{model_version('cross_encoder')}"
+    return encoder_version()
 
 # USER_DATA_PATH = r"job_rec\job_recommendation\model2_reccomender\user_data.csv"
 # JOB_LISTINGS_PATH = r"job_rec\job_recommendation\model2_reccomender\data.csv"
@@ -50,8 +68,18 @@ def combine_job_fields(row):
     return ' '.join(job_parts)
 
 # Function to compute embeddings
-def compute_embeddings(texts):
-    return model.encode(texts, convert_to_tensor=False)
+def compute_embeddings(texts, batch_size=32):
+    return get_encoder().encode(texts, batch_size=batch_size, convert_to_tensor=False)
+
+# Function to combine a User model instance into the text that gets embedded
+def user_profile_text(user):
+    return ' '.join([
+        user.name or '',
+        user.academic_qualification or '',
+        user.experience or '',
+        ', '.join(user.skills) if hasattr(user, 'skills') and user.skills else '',
+        user.about or ''
+    ])
 
 # Function to match users to jobs
 def match_users_to_jobs(user_data, job_data, top_n=5):
@@ -86,6 +114,37 @@ def match_users_to_jobs(user_data, job_data, top_n=5):
     
     return pd.DataFrame(matches)
 
+# Function to find the top N jobs for each user embedding
+def top_jobs_for_embeddings(user_embeddings, top_n, block_size=1024):
+    """
+    Return (job_ids, scores), both shaped (n_users, top_n), ranked by cosine similarity.
+    Uses the on-disk ANN job index when JOB_ANN_INDEX_ENABLED is set, otherwise scans every stored job
+    held in EMBEDDING_STORAGE precision, rescoring the shortlist in float32 when EMBEDDING_RESCORE is set.
+    Missing slots (fewer jobs than top_n) have job id -1.
+    """
+    from django.conf import settings
+    from job_recommendation.model2_reccomender.batch_matching import normalize_rows
+
+    user_matrix = normalize_rows(user_embeddings)
+    if settings.JOB_ANN_INDEX_ENABLED:
+        from job_recommendation.model2_reccomender.ann_index import load_job_index
+        return load_job_index(encoder_version()).query(user_matrix, top_n)
+
+    # Brute force over the per-process (optionally int8/float16) job matrix
+    from job_recommendation.model2_reccomender.embedding_store import load_job_matrix
+    from job_recommendation.model2_reccomender.quantization import cached_job_matrix
+    job_ids, job_matrix = cached_job_matrix(encoder_version(), settings.EMBEDDING_STORAGE)
+    top_ids = np.full((len(user_matrix), top_n), -1, dtype=np.int64)
+    top_scores = np.full((len(user_matrix), top_n), -np.inf, dtype=np.float32)
+    if len(job_ids):
+        rescore = None
+        if settings.EMBEDDING_RESCORE and job_matrix.kind != 'float32':
+            rescore = lambda rows: load_job_matrix(encoder_version(), job_ids[rows].tolist())[1]
+        indices, scores = job_matrix.top_k(user_matrix, top_n, block_size=block_size, rescore=rescore)
+        top_ids[:, :indices.shape[1]] = job_ids[indices]
+        top_scores[:, :indices.shape[1]] = scores
+    return top_ids, top_scores
+
 # Django ORM-based recommendation function
 
 def recommend_jobs_for_user(user_id, top_n=5):
@@ -107,101 +166,182 @@ def recommend_jobs_for_user(user_id, top_n=5):
         return []
 
     # Combine user profile fields
-    user_profile = ' '.join([
-        user.name or '',
-        user.academic_qualification or '',
-        user.experience or '',
-        ', '.join(user.skills) if hasattr(user, 'skills') and user.skills else '',
-        user.about or ''
-    ])
+    user_profile = user_profile_text(user)
 
-    # Fetch all jobs from jobs_cleaned
-    jobs = list(JobCleaned.objects.all())
-    if not jobs:
-        return []
-
-    # Combine job fields
-    job_profiles = [
-        ' '.join([job.title or '', job.category or '']) for job in jobs
-    ]
+    # Encode only new or changed jobs so the embedding store is current
+    from job_recommendation.model2_reccomender.embedding_store import sync_job_embeddings
+    sync_job_embeddings(compute_embeddings, encoder_version())
 
     # Compute embeddings
     user_embedding = compute_embeddings([user_profile])[0]
-    job_embeddings = compute_embeddings(job_profiles)
 
-    # Compute cosine similarity
-    similarities = cosine_similarity([user_embedding], job_embeddings)[0]
-
-    # Get top N job indices
-    top_indices = similarities.argsort()[-top_n:][::-1]
+    # Get top N job ids and their cosine similarity
+    top_ids, top_scores = top_jobs_for_embeddings([user_embedding], top_n)
+    ranked = [(job_id, score) for job_id, score in zip(top_ids[0].tolist(), top_scores[0].tolist()) if job_id != -1]
 
     # Return list of (job_instance, similarity_score)
-    return [(jobs[i], similarities[i]) for i in top_indices]
+    jobs = JobCleaned.objects.in_bulk([job_id for job_id, _ in ranked])
+    return [(jobs[job_id], score) for job_id, score in ranked if job_id in jobs]
 
 def save_matches_to_db(user_id, top_n=5):
     """
-    For a given user_id, compute top N job matches and save them to the MatchedJob table.
+    For a given user_id, compute top N job matches and atomically replace the user's rows in the MatchedJob table.
+    With settings.MATCH_CASCADE_ENABLED the matches come from the TF-IDF -> MiniLM -> cross-encoder cascade.
     """
     import os
     import django
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_rec.settings')
     django.setup()
-    from job_recommendation.models import MatchedJob, User, JobCleaned
+    from django.conf import settings
+    from job_recommendation.model2_reccomender.match_writer import replace_matches
 
-    print(f"[DEBUG] Running save_matches_to_db for user_id={user_id}")
-    try:
-        user = User.objects.get(id=user_id)
-        print(f"[DEBUG] Found user: {user.name} ({user.email})")
-    except User.DoesNotExist:
-        print(f"[DEBUG] User with id {user_id} does not exist.")
+    if settings.MATCH_CASCADE_ENABLED:
+        from job_recommendation.model2_reccomender.cascade import cascade_recommend
+        ranked_by_user, _ = cascade_recommend([user_id], top_n=top_n)
+        ranked = ranked_by_user.get(user_id, [])
+    else:
+        ranked = [(job.id, score) for job, score in recommend_jobs_for_user(user_id, top_n=top_n)]
+    if not ranked:
+        logger.info(f"No matches to save for user_id={user_id}")
         return 0
 
-    jobs = list(JobCleaned.objects.all())
-    print(f"[DEBUG] Found {len(jobs)} jobs in JobCleaned table.")
+    rows = build_match_rows({user_id: ranked})
+    replace_matches(rows, user_ids=[user_id])
+    logger.debug(f"Saved {len(rows)} matches for user_id={user_id}")
+    return len(rows)
 
-    matches = recommend_jobs_for_user(user_id, top_n=top_n)
-    print(f"[DEBUG] Computed {len(matches)} matches.")
-    if not matches:
-        print("[DEBUG] No matches to save.")
-        return 0
+# Function to turn ranked (job_id, score) lists into MatchedJob rows
+def build_match_rows(ranked_by_user):
+    """
+    `ranked_by_user` maps user_id to a list of (job_id, score). Returns unsaved MatchedJob
+    instances carrying the denormalized user and job fields; ids of missing jobs are skipped.
+    """
+    from job_recommendation.models import MatchedJob, User, JobCleaned
+
+    job_ids = {job_id for ranked in ranked_by_user.values() for job_id, _ in ranked if job_id != -1}
+    jobs = {
+        job_id: (title, category)
+        for job_id, title, category in JobCleaned.objects.filter(id__in=list(job_ids)).values_list('id', 'title', 'category')
+    }
+    users = {
+        user_id: (name, email)
+        for user_id, name, email in User.objects.filter(id__in=list(ranked_by_user)).values_list('id', 'name', 'email')
+    }
+    rows = []
+    for user_id, ranked in ranked_by_user.items():
+        if user_id not in users:
+            continue
+        name, email = users[user_id]
+        for job_id, score in ranked:
+            if job_id not in jobs:
+                continue
+            title, category = jobs[job_id]
+            rows.append(MatchedJob(
+                user_id=user_id,
+                user_name=name,
+                user_email=email,
+                job_id=job_id,
+                job_title=title,
+                job_category=category,
+                similarity_score=score
+            ))
+    return rows
+
+# Function to encode new or changed user profiles and read every user vector from the store
+def sync_and_load_users(encode_batch_size=256):
+    from job_recommendation.models import User
+    from job_recommendation.model2_reccomender.embedding_store import sync_user_embeddings, load_user_matrix
 
-    # Clear old matches for this user
-    MatchedJob.objects.filter(user_id=user_id).delete()
-    print("[DEBUG] Cleared old matches for user.")
-
-    # Save new matches
-    for job, score in matches:
-        MatchedJob.objects.create(
-            user_id=user.id,
-            user_name=user.name,
-            user_email=user.email,
-            job_id=job.id,
-            job_title=job.title,
-            job_category=job.category,
-            similarity_score=score
-        )
-        print(f"[DEBUG] Saved match: job_id={job.id}, score={score}")
-    print(f"[DEBUG] Done saving {len(matches)} matches for user_id={user_id}.")
-    return len(matches)
+    users = User.objects.only('id', 'name', 'academic_qualification', 'experience', 'skills', 'about')
+    encoded = sync_user_embeddings(
+        ((user.id, user_profile_text(user)) for user in users.iterator(chunk_size=2000)),
+        lambda texts: compute_embeddings(texts, batch_size=encode_batch_size),
+        encoder_version()
+    )
+    user_ids, user_embeddings = load_user_matrix(encoder_version())
+    return encoded, user_ids, user_embeddings
 
 # Batch process: For all users, compute and save top N job matches to the database
 
-def batch_save_all_matches(top_n=5):
+def batch_save_all_matches(top_n=5, block_size=1024, encode_batch_size=256, workers=None, threads_per_worker=None):
+    """
+    Match every user against every job in one pass and replace the whole matched_jobs table.
+    Only new or changed user profiles and jobs are encoded (in batches); user and job matrices are
+    normalized once, scores are computed in blocks of `block_size` users (or looked up in the ANN
+    job index) and the top N per user are selected with argpartition.
+    With more than one worker (default settings.MATCH_WORKERS) users are sharded across processes that
+    scan the float32 job matrix exactly; this process builds the rows as shards finish.
+    With settings.MATCH_CASCADE_ENABLED every block of users is ranked by the cascade instead, so all
+    stored scores are cross-encoder probabilities, as written by save_matches_to_db.
+    Rows are written in blocks of `block_size` users as they are built, all in a single transaction.
+    Returns the number of matches saved.
+    """
     import os
     import django
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_rec.settings')
     django.setup()
-    from job_recommendation.models import User
+    from django.conf import settings
+    from django.db import transaction
+    from django.utils import timezone
+    from job_recommendation.models import MatchRun, JobEmbedding
+    from job_recommendation.model2_reccomender.embedding_store import sync_job_embeddings
+    from job_recommendation.model2_reccomender.match_writer import write_match_blocks
+
+    run = MatchRun.objects.create(model_name=match_version(), mode='full', started_at=timezone.now())
+
+    encoded_jobs = sync_job_embeddings(compute_embeddings, encoder_version())
+    encoded_users, user_ids, user_embeddings = sync_and_load_users(encode_batch_size)
+    logger.info(f"Encoded {len(encoded_jobs)} new or changed jobs and {len(encoded_users)} users; "
+                f"{len(user_ids)} users in store")
+    if not len(user_ids):
+        run.finished_at = timezone.now()
+        run.save()
+        return 0
+
+    workers = workers or settings.MATCH_WORKERS
+
+    # Function to yield (user_ids, rows) for consecutive blocks of at most `block_size` users
+    def row_blocks(block_user_ids, job_ids, scores):
+        for start in range(0, len(block_user_ids), block_size):
+            block = block_user_ids[start:start + block_size]
+            yield block, build_match_rows({
+                user_id: list(zip(user_job_ids, user_scores))
+                for user_id, user_job_ids, user_scores in zip(block, job_ids[start:start + block_size],
+                                                              scores[start:start + block_size])
+            })
+
+    # Function to yield the row blocks of every user, from the cascade, the sharded or the in-process scan
+    def match_blocks():
+        if settings.MATCH_CASCADE_ENABLED:
+            from job_recommendation.model2_reccomender.cascade import cascade_recommend
+
+            all_user_ids = user_ids.tolist()
+            for start in range(0, len(all_user_ids), block_size):
+                block = all_user_ids[start:start + block_size]
+                ranked, _ = cascade_recommend(block, top_n=top_n)
+                yield block, build_match_rows(ranked)
+        elif workers > 1:
+            from job_recommendation.model2_reccomender.batch_matching import normalize_rows
+            from job_recommendation.model2_reccomender.embedding_store import load_job_matrix
+            from job_recommendation.model2_reccomender.sharded_matching import sharded_top_k
+
+            job_ids, job_matrix = load_job_matrix(encoder_version())
+            for start, stop, indices, scores in sharded_top_k(
+                    normalize_rows(user_embeddings), normalize_rows(job_matrix), top_n, workers,
+                    threads_per_worker=threads_per_worker or settings.MATCH_WORKER_THREADS, block_size=block_size):
+                yield from row_blocks(user_ids[start:stop].tolist(), job_ids[indices].tolist(), scores.tolist())
+        else:
+            top_ids, top_scores = top_jobs_for_embeddings(user_embeddings, top_n, block_size=block_size)
+            yield from row_blocks(user_ids.tolist(), top_ids.tolist(), top_scores.tolist())
 
-    users = User.objects.all()
-    print(f"[DEBUG] Found {users.count()} users.")
-    for user in users:
-        print(f"[DEBUG] Processing user: {user.id} - {user.name}")
-        try:
-            save_matches_to_db(user.id, top_n=top_n)
-        except Exception as e:
-            print(f"[ERROR] Failed for user {user.id}: {e}")
-    print("[DEBUG] Batch matching complete.")
+    with transaction.atomic():
+        saved = write_match_blocks(match_blocks())
+        run.finished_at = timezone.now()
+        run.jobs_scored = JobEmbedding.objects.filter(model_name=encoder_version()).count()
+        run.users_rescored = len(user_ids)
+        run.save()
+    logger.info(f"Batch matching complete: saved {saved} matches for {len(user_ids)} users")
+    return saved
 
 # Remove or comment out all CSV reading/writing and main async logic
 
@@ -0,0 +1,120 @@
+import hashlib
+from datetime import timedelta
+import numpy as np
+
+EMBEDDING_DTYPE = np.float32
+
+
+# Function to build the text that gets embedded for a job
+def job_text(title, category):
+    return ' '.join([title or '', category or ''])
+
+
+# Function to hash embedded text so changed jobs can be detected
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def live_jobs():
+    """jobs_cleaned rows that can still be matched: those posted within settings.JOB_EXPIRY_DAYS."""
+    from django.conf import settings
+    from django.utils import timezone
+    from job_recommendation.models import JobCleaned
+
+    jobs = JobCleaned.objects.all()
+    if settings.JOB_EXPIRY_DAYS:
+        jobs = jobs.filter(date_posted__gte=timezone.now().date() - timedelta(days=settings.JOB_EXPIRY_DAYS))
+    return jobs
+
+
+def sync_embeddings(embedding_model, key_field, items, encode, model_name, batch_size=1000, prune=True):
+    """
+    Bring an embedding table in line with `items`, an iterable of (key, text).
+    Only items that are new, whose text changed, or that were encoded with a different model are
+    passed to `encode`. With `prune`, stored vectors whose key is not in `items` are removed.
+    Each batch is encoded first and then upserted in its own short transaction.
+    Returns the list of keys that were (re-)encoded.
+    """
+    from django.db import transaction
+
+    stored = {
+        key: (digest, stored_model)
+        for key, digest, stored_model in embedding_model.objects.values_list(key_field, 'content_hash', 'model_name')
+    }
+
+    pending = []
+    for key, text in items:
+        digest = content_hash(text)
+        if stored.pop(key, None) != (digest, model_name):
+            pending.append((key, text, digest))
+
+    # Whatever is left in `stored` is no longer in `items`
+    if prune and stored:
+        embedding_model.objects.filter(**{f'{key_field}__in': list(stored)}).delete()
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        vectors = np.asarray(encode([text for _, text, _ in chunk]), dtype=EMBEDDING_DTYPE)
+        with transaction.atomic():
+            embedding_model.objects.bulk_create(
+                [
+                    embedding_model(**{key_field: key}, content_hash=digest, model_name=model_name, vector=vector.tobytes())
+                    for (key, _, digest), vector in zip(chunk, vectors)
+                ],
+                update_conflicts=True,
+                unique_fields=[key_field],
+                update_fields=['content_hash', 'model_name', 'vector', 'updated_at'],
+            )
+    return [key for key, _, _ in pending]
+
+
+def sync_job_embeddings(encode, model_name, batch_size=1000):
+    """
+    Bring the job_embeddings table in line with the live jobs_cleaned rows.
+    Vectors of deleted or expired jobs are removed. Returns the ids of (re-)encoded jobs.
+    """
+    from job_recommendation.models import JobEmbedding
+
+    items = (
+        (job_id, job_text(title, category))
+        for job_id, title, category in live_jobs().values_list('id', 'title', 'category').iterator(chunk_size=2000)
+    )
+    return sync_embeddings(JobEmbedding, 'job_id', items, encode, model_name, batch_size=batch_size)
+
+
+def sync_user_embeddings(items, encode, model_name, batch_size=1000, prune=True):
+    """
+    Bring the user_embeddings table in line with `items`, an iterable of (user_id, profile_text).
+    Pass prune=False when `items` covers only some users. Returns the ids of (re-)encoded users.
+    """
+    from job_recommendation.models import UserEmbedding
+
+    return sync_embeddings(UserEmbedding, 'user_id', items, encode, model_name, batch_size=batch_size, prune=prune)
+
+
+def load_matrix(embedding_model, key_field, model_name, keys=None):
+    """
+    Read stored vectors for `model_name`, optionally restricted to `keys`.
+    Returns (keys, matrix) where keys is an int64 array and matrix[i] is the vector of keys[i].
+    """
+    rows = embedding_model.objects.filter(model_name=model_name)
+    if keys is not None:
+        rows = rows.filter(**{f'{key_field}__in': list(keys)})
+    rows = rows.order_by(key_field).values_list(key_field, 'vector')
+    found = []
+    vectors = []
+    for key, vector in rows.iterator(chunk_size=2000):
+        found.append(key)
+        vectors.append(np.frombuffer(vector, dtype=EMBEDDING_DTYPE))
+    if not vectors:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+    return np.asarray(found, dtype=np.int64), np.vstack(vectors)
+
+
+def load_job_matrix(model_name, job_ids=None):
+    from job_recommendation.models import JobEmbedding
+    return load_matrix(JobEmbedding, 'job_id', model_name, job_ids)
+
+
+def load_user_matrix(model_name, user_ids=None):
+    from job_recommendation.models import UserEmbedding
+    return load_matrix(UserEmbedding, 'user_id', model_name, user_ids)
@@ -0,0 +1,126 @@
+import logging
+from collections import defaultdict
+import numpy as np
+
+from job_recommendation.model2_reccomender.eish import (
+    compute_embeddings, encoder_version, match_version, sync_and_load_users, top_jobs_for_embeddings, build_match_rows,
+    batch_save_all_matches,
+)
+from job_recommendation.model2_reccomender.batch_matching import normalize_rows, top_k_blocked
+
+logger = logging.getLogger(__name__)
+
+
+def merge_top_n(existing, new, top_n):
+    """
+    Best `top_n` of a user's `existing` (job_id, score) matches and `new` ones, by descending score.
+    A job in both keeps its new score (its text changed, or it was rescored).
+    """
+    candidates = dict(existing)
+    candidates.update(new)
+    return sorted(candidates.items(), key=lambda item: item[1], reverse=True)[:top_n]
+
+
+def incremental_match(top_n=6, block_size=1024, encode_batch_size=256):
+    """
+    Update matched_jobs for jobs that arrived since the last completed match run.
+
+    - jobs whose embedding was written since the last run (new or changed) are scored against the
+      stored user embeddings and merged into each user's existing top N
+    - matches for jobs that were deleted or expired are evicted
+    - users who are new, whose profile changed, or who lost a match (evicted job, or a job whose
+      text changed) are rescored against all jobs, since their top N may now come from anywhere
+
+    With settings.MATCH_CASCADE_ENABLED nothing is merged, since the stored scores are cross-encoder
+    probabilities: invalidated users, and every user once new jobs arrived, are ranked again by the cascade.
+
+    Falls back to a full batch_save_all_matches when the last completed run was not for the current
+    match_version, i.e. on first use, whenever the model changes and when the cascade is switched on
+    or off. Returns the number of rows written.
+    """
+    import os
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'job_rec.settings')
+    django.setup()
+    from django.conf import settings
+    from django.db import transaction
+    from django.utils import timezone
+    from job_recommendation.models import MatchedJob, MatchRun, JobEmbedding
+    from job_recommendation.model2_reccomender.embedding_store import sync_job_embeddings, load_job_matrix
+    from job_recommendation.model2_reccomender.match_writer import replace_matches
+
+    model_name = encoder_version()
+    version = match_version()
+    last_run = MatchRun.objects.filter(finished_at__isnull=False).order_by('-started_at').first()
+    if last_run is None or last_run.model_name != version:
+        logger.info(f"Last completed match run is not for {version}; running a full recompute")
+        return batch_save_all_matches(top_n=top_n, block_size=block_size, encode_batch_size=encode_batch_size)
+
+    run = MatchRun.objects.create(model_name=version, mode='incremental', started_at=timezone.now())
+
+    # Encode new/changed jobs (and drop deleted or expired ones), then pick up everything written
+    # since the last run, including jobs synced in between by the per-user matching path
+    sync_job_embeddings(compute_embeddings, model_name)
+    new_job_ids = list(JobEmbedding.objects.filter(model_name=model_name, updated_at__gte=last_run.started_at)
+                       .values_list('job_id', flat=True))
+    live_job_ids = set(JobEmbedding.objects.filter(model_name=model_name).values_list('job_id', flat=True))
+
+    encoded_users, user_ids, user_embeddings = sync_and_load_users(encode_batch_size)
+    if not len(user_ids):
+        run.finished_at = timezone.now()
+        run.save()
+        return 0
+
+    # Existing matches; anything pointing at a dead or changed job invalidates that user's top N
+    new_job_set = set(new_job_ids)
+    existing = defaultdict(list)
+    invalidated = set(encoded_users)
+    for user_id, job_id, score in MatchedJob.objects.values_list('user_id', 'job_id', 'similarity_score').iterator(chunk_size=5000):
+        if job_id not in live_job_ids or job_id in new_job_set:
+            invalidated.add(user_id)
+        existing[user_id].append((job_id, score))
+    user_id_list = user_ids.tolist()
+    invalidated.update(user_id for user_id in user_id_list if user_id not in existing)
+    deleted_users = set(existing) - set(user_id_list)
+
+    ranked = {}
+    if settings.MATCH_CASCADE_ENABLED:
+        # Probabilities cannot be merged with cosine scores of the new jobs, and new jobs can enter any
+        # user's TF-IDF candidates: once jobs arrived, everyone is ranked again by the cascade
+        from job_recommendation.model2_reccomender.cascade import cascade_recommend
+        rescore = np.array([bool(new_job_ids) or user_id in invalidated for user_id in user_id_list], dtype=bool)
+        rescore_ids = user_ids[rescore].tolist()
+        for start in range(0, len(rescore_ids), block_size):
+            block_ranked, _ = cascade_recommend(rescore_ids[start:start + block_size], top_n=top_n)
+            ranked.update(block_ranked)
+    else:
+        rescore = np.array([user_id in invalidated for user_id in user_id_list], dtype=bool)
+
+        # Users that need a full rescore
+        if rescore.any():
+            top_ids, top_scores = top_jobs_for_embeddings(user_embeddings[rescore], top_n, block_size=block_size)
+            for user_id, job_ids, scores in zip(user_ids[rescore].tolist(), top_ids.tolist(), top_scores.tolist()):
+                ranked[user_id] = [(job_id, score) for job_id, score in zip(job_ids, scores) if job_id != -1]
+
+        # Everyone else: score only the new jobs and merge them into the existing top N
+        keep = ~rescore
+        if new_job_ids and keep.any():
+            new_ids, new_embeddings = load_job_matrix(model_name, new_job_ids)
+            indices, scores = top_k_blocked(normalize_rows(user_embeddings[keep]), normalize_rows(new_embeddings),
+                                            top_n, block_size=block_size)
+            for user_id, user_indices, user_scores in zip(user_ids[keep].tolist(), indices, scores.tolist()):
+                merged = merge_top_n(existing[user_id], zip(new_ids[user_indices].tolist(), user_scores), top_n)
+                if merged != sorted(existing[user_id], key=lambda item: item[1], reverse=True):
+                    ranked[user_id] = merged
+
+    rows = build_match_rows(ranked)
+    with transaction.atomic():
+        # Users that no longer exist are replaced with nothing
+        replace_matches(rows, user_ids=list(ranked) + list(deleted_users))
+        run.finished_at = timezone.now()
+        run.jobs_scored = len(new_job_ids)
+        run.users_rescored = int(rescore.sum())
+        run.save()
+    logger.info(f"Incremental match: {len(new_job_ids)} new jobs, {int(rescore.sum())} users rescored, "
+                f"{len(ranked)} users updated, {len(rows)} rows written")
+    return len(rows)
@@ -1,28 +1,93 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+import os
 import re
-import chrono
 import json
+import hashlib
+import itertools
+import tempfile
+import joblib
+
+TFIDF_MAX_FEATURES = 5000
+# Hashed feature columns in streaming mode (HashingTfidfJobIndex)
+HASHING_FEATURES = 2 ** 18
+# Jobs read from the database per chunk when streaming them into the index
+INGEST_CHUNK_SIZE = 5000
+# Refit the vectorizer once the jobs added or removed since the last fit exceed this fraction of the fitted corpus
+REFIT_CHURN = 0.5
+
+USER_TEXT_COLUMNS = ['email', 'name', 'address', 'academic qualification', 'experience', 'skills', 'about']
+JOB_TEXT_COLUMNS = ['title', 'category', 'description', 'company', 'location', 'job_type']
+USER_MATCH_FIELDS = ['name', 'academic qualification', 'experience', 'skills', 'about']
+JOB_MATCH_FIELDS = ['title', 'category', 'description']  # Include description
+
+PUNCTUATION = re.compile(r'[^\w\s]')
+WHITESPACE = re.compile(r'\s+')
+# Formats tried in order by parse_dates; the scrapers store ISO dates
+DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y', '%d-%m-%Y', '%d %B %Y', '%d %b %Y', '%B %d, %Y', '%b %d, %Y']
+RELATIVE_DATE = re.compile(r'^\s*(\d+)\s+(day|week|month)s?\s+ago\s*$', re.IGNORECASE)
+RELATIVE_DAYS = {'day': 1, 'week': 7, 'month': 30}
 
 # Defining helper functions for data cleaning and preprocessing
 def clean_text(text):
     if not isinstance(text, str) or text is None:
         return ''
     text = text.lower()
-    text = re.sub(r'[^\w\s]', '', text)  # Remove punctuation
-    text = re.sub(r'\s+', ' ', text).strip()  # Remove extra spaces
+    text = PUNCTUATION.sub('', text)  # Remove punctuation
+    text = WHITESPACE.sub(' ', text).strip()  # Remove extra spaces
     return text
 
+# Vectorized clean_text over a Series; non-string values become ''
+def clean_text_series(series):
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return pd.Series('', index=series.index, dtype=object)
+    # .str methods give NaN for anything that is not a string
+    cleaned = series.str.lower().str.replace(PUNCTUATION, '', regex=True).str.replace(WHITESPACE, ' ', regex=True).str.strip()
+    return cleaned.fillna('').astype(object)
+
+def parse_dates(series, today=None):
+    """
+    Vectorized date parsing: 'today' / 'yesterday' / 'N days|weeks|months ago' first, then each explicit
+    format in DATE_FORMATS on the values still unparsed, then pandas' mixed-format parser.
+    Returns a datetime64 Series with NaT where nothing matched.
+    """
+    series = series.astype(object)
+    text = series.map(lambda value: value.strip() if isinstance(value, str) else None)
+    # Values that are already dates or timestamps (e.g. read from the database) are converted directly
+    parsed = pd.Series(pd.to_datetime(series.where(text.isna()), errors='coerce'), index=series.index).astype('datetime64[ns]')
+
+    # Relative dates first: pandas reads 'today' as the current time under any format
+    pending = parsed.isna() & text.notna()
+    if pending.any():
+        today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+        lowered = text[pending].str.lower()
+        parsed.loc[lowered.index[lowered == 'today']] = today
+        parsed.loc[lowered.index[lowered == 'yesterday']] = today - pd.Timedelta(days=1)
+        relative = lowered.str.extract(RELATIVE_DATE).dropna()
+        if len(relative):
+            days = relative[0].astype(int) * relative[1].str.lower().map(RELATIVE_DAYS)
+            parsed.loc[relative.index] = today - pd.to_timedelta(days, unit='D')
+
+    for date_format in DATE_FORMATS:
+        pending = parsed.isna() & text.notna()
+        if not pending.any():
+            return parsed
+        parsed[pending] = pd.to_datetime(text[pending], format=date_format, errors='coerce')
+
+    pending = parsed.isna() & text.notna()
+    if pending.any():
+        parsed[pending] = pd.to_datetime(text[pending], format='mixed', errors='coerce')
+    return parsed
+
 def parse_date(date_str):
     if not isinstance(date_str, str) or date_str is None:
         return None
-    try:
-        return chrono.parseDate(date_str)
-    except:
-        return None
+    parsed = parse_dates(pd.Series([date_str], dtype=object))[0]
+    return None if pd.isna(parsed) else parsed.to_pydatetime()
 
 def clean_boolean(value):
     if isinstance(value, str):
@@ -33,55 +98,323 @@ def clean_boolean(value):
             return False
     return value
 
-# Loading and processing user and job data
-def load_and_clean_data(user_file, job_file):
-    # Loading CSV files
-    user_data = pd.read_csv(user_file)
-    job_data = pd.read_csv(job_file)
-
-    # Cleaning user data
-    for col in ['email', 'name', 'address', 'academic qualification', 'experience', 'skills', 'about']:
+# Cleaning a chunk of user rows in place, column by column
+def clean_user_frame(user_data):
+    for col in USER_TEXT_COLUMNS:
         if col in user_data.columns:
-            user_data[col] = user_data[col].apply(clean_text)
+            user_data[col] = clean_text_series(user_data[col])
+    return user_data
 
-    # Cleaning job data
-    for col in ['title', 'category', 'description', 'company', 'location', 'job_type']:
+# Cleaning a chunk of job rows in place, column by column
+def clean_job_frame(job_data):
+    for col in JOB_TEXT_COLUMNS:
         if col in job_data.columns:
-            job_data[col] = job_data[col].apply(clean_text)
-
-    # Cleaning date_posted
+            job_data[col] = clean_text_series(job_data[col])
     if 'date_posted' in job_data.columns:
-        job_data['date_posted'] = job_data['date_posted'].apply(parse_date)
+        job_data['date_posted'] = parse_dates(job_data['date_posted'])
+    return job_data
+
+# Reading a CSV in chunks of `chunksize` rows, each cleaned by `clean`
+def iter_csv_chunks(path, clean, chunksize=INGEST_CHUNK_SIZE):
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        yield clean(chunk)
+
+# Reading a queryset in chunks of `chunksize` rows as DataFrames with `fields` as columns, each cleaned by `clean`
+def iter_queryset_chunks(queryset, fields, clean, chunksize=INGEST_CHUNK_SIZE):
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunksize)
+    for chunk in iter(lambda: list(itertools.islice(rows, chunksize)), []):
+        yield clean(pd.DataFrame.from_records(chunk, columns=fields))
 
+# Loading and processing user and job data
+def load_and_clean_data(user_file, job_file, chunksize=INGEST_CHUNK_SIZE):
+    # Loading and cleaning the CSV files chunk by chunk
+    user_data = pd.concat(iter_csv_chunks(user_file, clean_user_frame, chunksize), ignore_index=True)
+    job_data = pd.concat(iter_csv_chunks(job_file, clean_job_frame, chunksize), ignore_index=True)
     return user_data, job_data
 
 # Combining user fields for matching
 def combine_user_fields(row):
-    fields = [row.get(col, '') for col in ['name', 'academic qualification', 'experience', 'skills', 'about']]
+    fields = [row.get(col, '') for col in USER_MATCH_FIELDS]
     return ' '.join([str(f) for f in fields if f])
 
 # Combining job fields for matching
 def combine_job_fields(row):
-    fields = [row.get(col, '') for col in ['title', 'category', 'description']]  # Include description
+    fields = [row.get(col, '') for col in JOB_MATCH_FIELDS]
     return ' '.join([str(f) for f in fields if f])
 
-# Generating TF-IDF vectors for matching
-def generate_tfidf_vectors(user_data, job_data):
-    user_profiles = user_data.apply(combine_user_fields, axis=1)
-    job_profiles = job_data.apply(combine_job_fields, axis=1)
+# Vectorized combine_*_fields over a cleaned DataFrame: present, non-empty columns joined by single spaces
+def combine_columns(df, columns):
+    combined = pd.Series('', index=df.index, dtype=object)
+    for col in columns:
+        if col in df.columns:
+            combined = combined + ' ' + df[col].where(df[col].notna(), '').astype(str)
+    return combined.str.replace(WHITESPACE, ' ', regex=True).str.strip()
+
+# Cleaned TF-IDF text for a jobs_cleaned row
+def job_tfidf_text(title, category, description):
+    return combine_job_fields({'title': clean_text(title), 'category': clean_text(category), 'description': clean_text(description)})
+
+# Cleaned TF-IDF text for a User model instance
+def user_tfidf_text(user):
+    return combine_user_fields({
+        'name': clean_text(user.name),
+        'academic qualification': clean_text(user.academic_qualification),
+        'experience': clean_text(user.experience),
+        'skills': clean_text(', '.join(user.skills or [])),
+        'about': clean_text(user.about),
+    })
+
+def top_k_sparse(scores, k):
+    """
+    Keep the k largest positive entries of every row of a sparse score matrix, working on its CSR
+    arrays only (one lexsort, no per-row Python loop). Returns (rows, columns, values) as arrays,
+    ordered by row and then by descending value.
+    """
+    scores = sparse.csr_matrix(scores)
+    counts = np.diff(scores.indptr)
+    rows = np.repeat(np.arange(scores.shape[0]), counts)
+    order = np.lexsort((-scores.data, rows))
+    rank = np.arange(len(order)) - np.repeat(scores.indptr[:-1], counts)
+    keep = order[(rank < k) & (scores.data[order] > 0)]
+    return rows[keep], scores.indices[keep], scores.data[keep]
+
+# Function to hash indexed texts so changed jobs can be detected
+def text_hashes(texts):
+    return [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in texts]
+
+class TfidfJobIndex:
+    """
+    L2-normalized TF-IDF vectors of job texts. The vectorizer is fitted once on the jobs; jobs added
+    later are only transformed with the fitted vocabulary and IDF, and `sync` refits only when the jobs
+    added, changed or removed since the last fit exceed REFIT_CHURN of the fitted corpus, so a corpus that
+    turns over at a steady size (postings expire) still picks up new terms.
+    """
+
+    def __init__(self, max_features=TFIDF_MAX_FEATURES):
+        self.max_features = max_features
+        self.vectorizer = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty(0, dtype=object)
+        self.matrix = sparse.csr_matrix((0, 0))
+        self.fitted_size = 0
+        self.churn = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, ids, texts, hashes=None):
+        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=self.max_features)
+        self.matrix = self.vectorizer.fit_transform(texts).tocsr()
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.hashes = np.asarray(hashes if hashes is not None else text_hashes(texts), dtype=object)
+        self.fitted_size = len(self.ids)
+        self.churn = 0
+        return self
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, np.asarray(list(ids), dtype=np.int64))
+        self.ids, self.hashes, self.matrix = self.ids[keep], self.hashes[keep], self.matrix[keep]
+
+    def add(self, ids, texts, hashes=None):
+        """Transform `texts` with the fitted vectorizer and add them, replacing rows with the same ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        self.remove(ids)
+        self.matrix = sparse.vstack([self.matrix, self.vectorizer.transform(texts)], format='csr')
+        self.ids = np.concatenate([self.ids, ids])
+        self.hashes = np.concatenate([self.hashes, np.asarray(hashes if hashes is not None else text_hashes(texts), dtype=object)])
+
+    def sync(self, ids, texts):
+        """
+        Bring the index in line with (ids, texts): new or changed texts are transformed, missing ids
+        dropped, and the vectorizer refitted when there is none yet or the corpus churned past REFIT_CHURN.
+        Returns True when anything changed.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        hashes = text_hashes(texts)
+        indexed = dict(zip(self.ids.tolist(), self.hashes.tolist()))
+        changed = [i for i, (job_id, digest) in enumerate(zip(ids.tolist(), hashes)) if indexed.get(job_id) != digest]
+        removed = set(indexed) - set(ids.tolist())
+        if not len(ids):
+            self.__init__(self.max_features)
+            return bool(indexed)
+        if self.vectorizer is None or self.churn + len(changed) + len(removed) > self.fitted_size * REFIT_CHURN:
+            self.build(ids, texts, hashes)
+            return True
+        if not changed and not removed:
+            return False
+        self.remove(removed)
+        if changed:
+            self.add(ids[changed], [texts[i] for i in changed], [hashes[i] for i in changed])
+        self.churn += len(changed) + len(removed)
+        return True
+
+    def transform(self, texts):
+        """L2-normalized TF-IDF vectors of `texts` in the index's feature space."""
+        return self.vectorizer.transform(texts)
 
-    # Combining user and job profiles for TF-IDF
-    all_profiles = pd.concat([user_profiles, job_profiles], ignore_index=True)
+    def job_matrix(self):
+        return self.matrix
 
-    # Creating TF-IDF vectors
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-    tfidf_matrix = vectorizer.fit_transform(all_profiles)
+    def query(self, texts, k, block_size=2048):
+        """
+        Top k jobs by cosine similarity for each text, as columns (query_rows, job_ids, scores) ordered by
+        query row and descending score. Only positive similarities are returned, so a row may have fewer than k.
+        One sparse product per block of `block_size` queries scores them against every job.
+        """
+        if self.vectorizer is None or not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        query_matrix = self.transform(texts)
+        job_matrix_t = self.job_matrix().T
+        rows, columns, values = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.float64)]
+        for start in range(0, query_matrix.shape[0], block_size):
+            block_rows, block_columns, block_values = top_k_sparse(query_matrix[start:start + block_size] @ job_matrix_t, k)
+            rows.append(block_rows + start)
+            columns.append(block_columns)
+            values.append(block_values)
+        return np.concatenate(rows), self.ids[np.concatenate(columns)], np.concatenate(values)
 
-    # Splitting back into user and job matrices
-    user_tfidf = tfidf_matrix[:len(user_data)]
-    job_tfidf = tfidf_matrix[len(user_data):]
+    def save(self, path):
+        """Write the index atomically to `path` with joblib."""
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.joblib', delete=False) as handle:
+            joblib.dump(dict(self.__dict__, index_class=type(self).__name__), handle)
+        os.replace(handle.name, path)
 
-    return user_tfidf, job_tfidf, vectorizer
+    @staticmethod
+    def load(path):
+        """Read an index written by `save`, as the class it was saved from."""
+        state = joblib.load(path)
+        index_class = HashingTfidfJobIndex if state.pop('index_class', None) == 'HashingTfidfJobIndex' else TfidfJobIndex
+        index = index_class()
+        index.__dict__.update(state)
+        return index
+
+class HashingTfidfJobIndex(TfidfJobIndex):
+    """
+    Streaming variant of TfidfJobIndex: terms are hashed into `n_features` columns, so there is no
+    vocabulary to fit and jobs can be appended chunk by chunk without seeing the whole corpus.
+    Raw term counts are stored and document frequencies are updated online as jobs are added or
+    removed; IDF weighting (sklearn's smoothed formula) and normalization are applied when querying.
+    """
+
+    def __init__(self, n_features=HASHING_FEATURES):
+        super().__init__()
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, stop_words='english')
+        self.matrix = sparse.csr_matrix((0, n_features))
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self._weighted = None
+
+    def build(self, ids, texts, hashes=None):
+        self.__init__(self.n_features)
+        self.add(ids, texts, hashes)
+        return self
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, np.asarray(list(ids), dtype=np.int64))
+        if keep.all():
+            return
+        self.document_frequency -= np.bincount(self.matrix[~keep].indices, minlength=self.n_features)
+        self.ids, self.hashes, self.matrix = self.ids[keep], self.hashes[keep], self.matrix[keep]
+        self._weighted = None
+
+    def add(self, ids, texts, hashes=None):
+        """Hash `texts` and append them, replacing rows with the same ids; no refit is ever needed."""
+        ids = np.asarray(ids, dtype=np.int64)
+        self.remove(ids)
+        counts = self.vectorizer.transform(texts).tocsr()
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        self.matrix = sparse.vstack([self.matrix, counts], format='csr')
+        self.ids = np.concatenate([self.ids, ids])
+        self.hashes = np.concatenate([self.hashes, np.asarray(hashes if hashes is not None else text_hashes(texts), dtype=object)])
+        self._weighted = None
+
+    def sync(self, ids, texts):
+        return self.sync_stream([(ids, texts)])
+
+    def sync_stream(self, chunks):
+        """
+        Bring the index in line with a stream of (ids, texts) chunks, holding one chunk at a time:
+        new or changed jobs are appended per chunk and ids absent from the stream are removed at the end.
+        Returns True when anything changed.
+        """
+        indexed = dict(zip(self.ids.tolist(), self.hashes.tolist()))
+        seen = set()
+        updated = False
+        for ids, texts in chunks:
+            ids = np.asarray(ids, dtype=np.int64)
+            hashes = text_hashes(texts)
+            changed = [i for i, (job_id, digest) in enumerate(zip(ids.tolist(), hashes)) if indexed.get(job_id) != digest]
+            seen.update(ids.tolist())
+            if changed:
+                self.add(ids[changed], [texts[i] for i in changed], [hashes[i] for i in changed])
+                updated = True
+        removed = set(indexed) - seen
+        if removed:
+            self.remove(removed)
+        return updated or bool(removed)
+
+    def idf(self):
+        return np.log((1 + len(self)) / (1 + self.document_frequency)) + 1
+
+    def _weight(self, counts):
+        return normalize(sparse.csr_matrix(counts.multiply(self.idf())))
+
+    def transform(self, texts):
+        return self._weight(self.vectorizer.transform(texts))
+
+    def job_matrix(self):
+        if self._weighted is None:
+            self._weighted = self._weight(self.matrix)
+        return self._weighted
+
+    def save(self, path):
+        self._weighted = None
+        super().save(path)
+
+# TF-IDF job indexes read from disk in this process: path -> (mtime, index)
+_loaded = {}
+
+def load_job_tfidf_index(refresh=False):
+    """
+    The persisted TF-IDF index over the live jobs (settings.JOB_TFIDF_INDEX_PATH), cached per process
+    until the file changes. It is synced with jobs_cleaned only when `refresh` is set (the pipeline does
+    this after categorizing) or when no index has been saved yet.
+    """
+    from django.conf import settings
+    from job_recommendation.model2_reccomender.embedding_store import live_jobs
+
+    path = str(settings.JOB_TFIDF_INDEX_PATH)
+    index_class = HashingTfidfJobIndex if settings.JOB_TFIDF_MODE == 'hashing' else TfidfJobIndex
+    index = None
+    if os.path.exists(path):
+        mtime = os.path.getmtime(path)
+        cached = _loaded.get(path)
+        index = cached[1] if cached and cached[0] == mtime else TfidfJobIndex.load(path)
+        _loaded[path] = (mtime, index)
+        if not refresh and type(index) is index_class:
+            return index
+
+    if type(index) is not index_class:
+        index = index_class()
+    chunks = (
+        (chunk['id'].tolist(), combine_columns(chunk, JOB_MATCH_FIELDS).tolist())
+        for chunk in iter_queryset_chunks(live_jobs().order_by('id'), ['id'] + JOB_MATCH_FIELDS, clean_job_frame)
+    )
+    if index_class is HashingTfidfJobIndex:
+        # Stream the jobs in chunks; only new or changed ones are hashed and appended
+        updated = index.sync_stream(chunks)
+    else:
+        job_ids, texts = [], []
+        for chunk_ids, chunk_texts in chunks:
+            job_ids.extend(chunk_ids)
+            texts.extend(chunk_texts)
+        updated = index.sync(job_ids, texts)
+    if updated or not os.path.exists(path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        index.save(path)
+        _loaded[path] = (os.path.getmtime(path), index)
+    return index
 
 # Converting NumPy types to Python native types for JSON serialization
 def convert_to_serializable(obj):
@@ -93,40 +426,45 @@ def convert_to_serializable(obj):
         return obj.tolist()
     return obj
 
-# Recommending jobs for a user
-def recommend_jobs(user_data, job_data, top_n=5):
-    user_tfidf, job_tfidf, vectorizer = generate_tfidf_vectors(user_data, job_data)
-    recommendations = []
-
-    for user_idx in range(len(user_data)):
-        user_id = user_data.iloc[user_idx].get('user_id', user_idx)
-        user_email = user_data.iloc[user_idx].get('email', 'unknown')
-        user_name = user_data.iloc[user_idx].get('name', 'unknown')
-
-        # Calculating cosine similarity
-        similarities = cosine_similarity(user_tfidf[user_idx], job_tfidf)[0]
-        top_indices = np.argsort(similarities)[-top_n:][::-1]
-
-        user_recommendations = []
-        for job_idx in top_indices:
-            if similarities[job_idx] > 0:  # Only include matches with positive similarity
-                job = job_data.iloc[job_idx]
-                user_recommendations.append({
-                    'job_id': convert_to_serializable(job.get('id', job_idx)),
-                    'title': job.get('title', 'unknown'),
-                    'company': job.get('company', 'unknown'),
-                    'location': job.get('location', 'unknown'),
-                    'similarity_score': round(float(similarities[job_idx]), 4)
-                })
-
-        recommendations.append({
-            'user_id': convert_to_serializable(user_id),
-            'name': user_name,
-            'email': user_email,
-            'recommended_jobs': user_recommendations
-        })
-
-    return recommendations
+# Column of a DataFrame as an array, or `default` repeated when the column is missing
+def _column(df, name, default):
+    return df[name].to_numpy() if name in df.columns else np.full(len(df), default, dtype=object)
+
+# Recommending jobs for every user
+def recommend_jobs(user_data, job_data, top_n=5, index=None):
+    """
+    Top N jobs by TF-IDF cosine similarity for every user. `index` is a TfidfJobIndex over job_data
+    (keyed by its 'id' column, or by row position without one); it is built from job_data when not given.
+    All users are scored with one sparse product per block and results are assembled column-wise.
+    """
+    job_keys = job_data['id'].to_numpy() if 'id' in job_data.columns else np.arange(len(job_data))
+    if index is None:
+        index = TfidfJobIndex().build(job_keys, combine_columns(job_data, JOB_MATCH_FIELDS).tolist())
+    rows, job_ids, scores = index.query(combine_columns(user_data, USER_MATCH_FIELDS).tolist(), top_n)
+
+    positions = pd.Index(job_keys).get_indexer(job_ids)
+    rows, positions, scores = rows[positions >= 0], positions[positions >= 0], scores[positions >= 0]
+    matches = pd.DataFrame({
+        'job_id': job_keys[positions],
+        'title': _column(job_data, 'title', 'unknown')[positions],
+        'company': _column(job_data, 'company', 'unknown')[positions],
+        'location': _column(job_data, 'location', 'unknown')[positions],
+        'similarity_score': np.round(scores, 4),
+    }).to_dict('records')
+    bounds = np.searchsorted(rows, np.arange(len(user_data) + 1))
+
+    user_ids = user_data['user_id'].to_numpy() if 'user_id' in user_data.columns else np.arange(len(user_data))
+    names = _column(user_data, 'name', 'unknown')
+    emails = _column(user_data, 'email', 'unknown')
+    return [
+        {
+            'user_id': convert_to_serializable(user_ids[user_idx]),
+            'name': names[user_idx],
+            'email': emails[user_idx],
+            'recommended_jobs': matches[bounds[user_idx]:bounds[user_idx + 1]],
+        }
+        for user_idx in range(len(user_data))
+    ]
 
 # Saving recommendations to JSON
 def save_recommendations(recommendations, output_file):
@@ -147,11 +485,78 @@ def save_recommendations(recommendations, output_file):
     with open(output_file, 'w') as f:
         json.dump(serializable_recommendations, f, indent=2)
 
+def benchmark_cleaning(n_rows=100_000, seed=0):
+    """
+    Clean `n_rows` synthetic scraped job rows (messy text, mixed date formats) the old row-wise way --
+    clean_text per cell, a per-row date parse and combine_job_fields with apply(axis=1) -- and with
+    clean_job_frame + combine_columns, and check both produce the same text.
+    """
+    import time
+    from datetime import datetime
+
+    rng = np.random.default_rng(seed)
+    words = np.array(['Senior', 'data', 'ENGINEER', 'sales,', 'manager!', 'Lilongwe', 'remote', '(contract)',
+                      'python/django', 'accountant', 'nurse', 'teacher', 'Blantyre', '  driver  ', 'co-ordinator'])
+    dates = np.array(['2025-07-01', '01/07/2025', '1 July 2025', 'Jul 1, 2025', '3 days ago', 'today', 'n/a'])
+
+    def messy(n_words):
+        return [' '.join(row) for row in rng.choice(words, size=(n_rows, n_words))]
+
+    job_data = pd.DataFrame({
+        'title': messy(3),
+        'category': messy(2),
+        'description': messy(20),
+        'company': messy(2),
+        'location': messy(1),
+        'job_type': messy(1),
+        'date_posted': rng.choice(dates, size=n_rows),
+    })
+    job_data.loc[rng.random(n_rows) < 0.05, 'description'] = None
+
+    def parse_date_rowwise(value):
+        # The per-row parse the loader used: a strptime per format, in a try/except
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, date_format)
+            except (TypeError, ValueError):
+                continue
+        return None
+
+    started = time.perf_counter()
+    rowwise = job_data.copy()
+    for col in JOB_TEXT_COLUMNS:
+        rowwise[col] = rowwise[col].apply(clean_text)
+    rowwise['date_posted'] = rowwise['date_posted'].apply(parse_date_rowwise)
+    rowwise_combined = rowwise.apply(combine_job_fields, axis=1)
+    rowwise_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = clean_job_frame(job_data.copy())
+    vectorized_combined = combine_columns(vectorized, JOB_MATCH_FIELDS)
+    vectorized_seconds = time.perf_counter() - started
+
+    return [
+        {'path': 'row-wise', 'rows': n_rows, 'seconds': round(rowwise_seconds, 3), 'rows_per_sec': round(n_rows / rowwise_seconds),
+         'dates_parsed': round(float(rowwise['date_posted'].notna().mean()), 3)},
+        {'path': 'vectorized', 'rows': n_rows, 'seconds': round(vectorized_seconds, 3),
+         'rows_per_sec': round(n_rows / vectorized_seconds), 'speedup': round(rowwise_seconds / vectorized_seconds, 2),
+         'dates_parsed': round(float(vectorized['date_posted'].notna().mean()), 3),
+         'same_text': bool(rowwise[JOB_TEXT_COLUMNS].astype(object).equals(vectorized[JOB_TEXT_COLUMNS].astype(object))
+                           and rowwise_combined.astype(object).equals(vectorized_combined.astype(object)))},
+    ]
+
 # Main function to run the recommendation system
-def main(user_file, job_file, output_file):
+def main(user_file, job_file, output_file, index_file=None):
     try:
         user_data, job_data = load_and_clean_data(user_file, job_file)
-        recommendations = recommend_jobs(user_data, job_data)
+        # Reuse the vectorizer saved by the previous run; only new or changed jobs are transformed
+        index = None
+        if index_file:
+            index = TfidfJobIndex.load(index_file) if os.path.exists(index_file) else TfidfJobIndex()
+            job_keys = job_data['id'].to_numpy() if 'id' in job_data.columns else np.arange(len(job_data))
+            if index.sync(job_keys, combine_columns(job_data, JOB_MATCH_FIELDS).tolist()):
+                index.save(index_file)
+        recommendations = recommend_jobs(user_data, job_data, index=index)
         save_recommendations(recommendations, output_file)
         print(f"Recommendations saved to {output_file}")
     except FileNotFoundError as e:
@@ -164,4 +569,5 @@ if __name__ == "__main__":
     USER_FILE = r"job_rec\job_recommendation\model2_reccomender\user_data.csv"
     JOB_FILE = r"job_rec\job_recommendation\model2_reccomender\data.csv"
     OUTPUT_FILE = "recommendations.json"
-    main(USER_FILE, JOB_FILE, OUTPUT_FILE)
+    INDEX_FILE = "job_tfidf.joblib"
+    main(USER_FILE, JOB_FILE, OUTPUT_FILE, INDEX_FILE)
@@ -0,0 +1,110 @@
+import time
+import random
+
+UPDATE_FIELDS = ['user_name', 'user_email', 'job_title', 'job_category', 'similarity_score']
+
+STALE_MATCHES_SQL = """
+    DELETE FROM matched_jobs m
+    WHERE {user_filter}
+    NOT EXISTS (
+        SELECT 1 FROM unnest(%s::int[], %s::int[]) AS k(user_id, job_id)
+        WHERE k.user_id = m.user_id AND k.job_id = m.job_id
+    )
+"""
+
+OTHER_USERS_SQL = """
+    DELETE FROM matched_jobs m
+    WHERE NOT EXISTS (SELECT 1 FROM unnest(%s::int[]) AS k(user_id) WHERE k.user_id = m.user_id)
+"""
+
+
+def replace_matches(rows, user_ids=None, batch_size=5000):
+    """
+    Atomically replace the matches of `user_ids` (every user when None) with `rows`, a list of
+    unsaved MatchedJob instances. Rows are upserted on (user_id, job_id) with bulk_create and any
+    other rows of those users are deleted, all in one transaction, so readers see either the old
+    or the new recommendations and never an empty list. Returns the number of rows written.
+    """
+    from django.db import connection, transaction
+    from job_recommendation.models import MatchedJob
+
+    with transaction.atomic():
+        MatchedJob.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user_id', 'job_id'],
+            update_fields=UPDATE_FIELDS,
+        )
+        keys = ([row.user_id for row in rows], [row.job_id for row in rows])
+        with connection.cursor() as cursor:
+            if user_ids is None:
+                cursor.execute(STALE_MATCHES_SQL.format(user_filter=''), keys)
+            elif user_ids:
+                cursor.execute(STALE_MATCHES_SQL.format(user_filter='m.user_id = ANY(%s::int[]) AND'),
+                               [list(user_ids), *keys])
+    return len(rows)
+
+
+def write_match_blocks(blocks, batch_size=5000):
+    """
+    Replace the whole matched_jobs table from `blocks`, an iterable of (user_ids, rows) produced while
+    matching. Each block goes through replace_matches as it arrives, so only one block of rows is held
+    at a time, and rows of users that were in no block are deleted at the end. Everything runs in one
+    transaction, so readers see either the old or the new table. Returns the number of rows written.
+    """
+    from django.db import connection, transaction
+
+    written = 0
+    user_ids = []
+    with transaction.atomic():
+        for block_user_ids, rows in blocks:
+            written += replace_matches(rows, user_ids=block_user_ids, batch_size=batch_size)
+            user_ids.extend(block_user_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(OTHER_USERS_SQL, [user_ids])
+    return written
+
+
+def benchmark_match_writes(n_users=2000, top_n=6, legacy_users=200, seed=0):
+    """
+    Compare rows/sec of replace_matches against the old per-row path (delete, then one
+    MatchedJob.objects.create per match). Uses negative user ids and rolls everything back, so
+    real matches are never touched.
+    """
+    from django.db import transaction
+    from job_recommendation.models import MatchedJob
+
+    rnd = random.Random(seed)
+
+    def make_rows(user_ids):
+        return [
+            MatchedJob(user_id=user_id, user_name=f'bench {user_id}', user_email=f'bench{-user_id}@example.com',
+                       job_id=job_id, job_title='Benchmark job', job_category='IT', similarity_score=rnd.random())
+            for user_id in user_ids
+            for job_id in rnd.sample(range(1, 10_000), top_n)
+        ]
+
+    results = []
+    with transaction.atomic():
+        user_ids = list(range(-1, -legacy_users - 1, -1))
+        rows = make_rows(user_ids)
+        started = time.perf_counter()
+        for user_id in user_ids:
+            MatchedJob.objects.filter(user_id=user_id).delete()
+        for row in rows:
+            row.save()
+        seconds = time.perf_counter() - started
+        results.append({'path': 'per-row create', 'rows': len(rows), 'seconds': round(seconds, 3),
+                        'rows_per_sec': round(len(rows) / seconds)})
+
+        user_ids = list(range(-1, -n_users - 1, -1))
+        for attempt in ('insert', 'replace'):
+            rows = make_rows(user_ids)
+            started = time.perf_counter()
+            replace_matches(rows, user_ids=user_ids)
+            seconds = time.perf_counter() - started
+            results.append({'path': f'bulk upsert ({attempt})', 'rows': len(rows), 'seconds': round(seconds, 3),
+                            'rows_per_sec': round(len(rows) / seconds)})
+        transaction.set_rollback(True)
+    return results
@@ -0,0 +1,185 @@
+import json
+import os
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_FILE = 'model.onnx'
+ONNX_INT8_FILE = 'model-int8.onnx'
+CONFIG_FILE = 'encoder_config.json'
+
+
+def export_sentence_encoder(model_path, export_dir, quantize=True, source_version=None):
+    """
+    Export the transformer of a SentenceTransformer (e.g. all-MiniLM-L6-v2) to ONNX with dynamic
+    batch and sequence axes, plus an int8 dynamically quantized copy when `quantize` is set.
+    Mean pooling and normalization stay in numpy (OnnxSentenceEncoder), as in the original pipeline.
+    `source_version` (the model_version of the weights) is recorded so a later load can tell the export is stale.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(export_dir, exist_ok=True)
+    sentence_model = SentenceTransformer(str(model_path), device='cpu')
+    transformer = sentence_model[0].auto_model.eval()
+    tokenizer = sentence_model.tokenizer
+    tokenizer.save_pretrained(export_dir)
+
+    sample = tokenizer(['export sample sentence'], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    onnx_path = os.path.join(export_dir, ONNX_FILE)
+
+    # Call the transformer with keyword arguments only; its positional signature varies across versions
+    class HiddenStates(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs)), return_dict=True).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(),
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(onnx_path, os.path.join(export_dir, ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+
+    with open(os.path.join(export_dir, CONFIG_FILE), 'w') as f:
+        json.dump({'source': str(model_path), 'source_version': source_version, 'max_seq_length': sentence_model.max_seq_length}, f)
+    logger.info(f"Exported {model_path} to {export_dir} (int8: {quantize})")
+
+
+def exported_version(export_dir):
+    """The source_version recorded by the last export into `export_dir`, or None."""
+    try:
+        with open(os.path.join(export_dir, CONFIG_FILE)) as f:
+            return json.load(f).get('source_version')
+    except (OSError, ValueError):
+        return None
+
+
+def cosine_score_error(embeddings, reference):
+    """Largest absolute difference between the pairwise cosine scores of two sets of unit-length embeddings."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    reference = np.asarray(reference, dtype=np.float32)
+    return float(np.abs(embeddings @ embeddings.T - reference @ reference.T).max())
+
+
+class OnnxSentenceEncoder:
+    """
+    Sentence encoder running on ONNX Runtime (CPU) with the same output as
+    SentenceTransformer('all-MiniLM-L6-v2').encode: mean-pooled, L2-normalized float32 vectors.
+    """
+
+    def __init__(self, export_dir, quantized=False, intra_op_threads=0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(export_dir, CONFIG_FILE)) as f:
+            self.max_seq_length = json.load(f)['max_seq_length']
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads  # 0 lets ONNX Runtime use every physical core
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = os.path.join(export_dir, ONNX_INT8_FILE if quantized else ONNX_FILE)
+        self.session = ort.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir, use_fast=True)
+
+    @classmethod
+    def from_model(cls, model_path, export_dir, quantized=False, intra_op_threads=0, source_version=None):
+        """
+        Load the exported encoder, exporting `model_path` (fp32 and int8) first if it has not been
+        exported yet or was exported from weights other than `source_version`.
+        """
+        model_file = os.path.join(export_dir, ONNX_INT8_FILE if quantized else ONNX_FILE)
+        if not os.path.exists(model_file) or (source_version is not None and exported_version(export_dir) != source_version):
+            export_sentence_encoder(model_path, export_dir, quantize=True, source_version=source_version)
+        return cls(export_dir, quantized=quantized, intra_op_threads=intra_op_threads)
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        # Batch sentences of similar length together so padding stays small
+        order = np.argsort([-len(sentence) for sentence in sentences], kind='stable')
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            encoded = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors='np')
+            hidden = self.session.run(None, {name: encoded[name].astype(np.int64) for name in self.input_names})[0]
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        embeddings = np.empty((len(sentences), batches[0].shape[1] if batches else 0), dtype=np.float32)
+        if batches:
+            embeddings[order] = np.vstack(batches)
+        return embeddings[0] if single else embeddings
+
+
+SAMPLE_SENTENCES = [
+    'Accountant', 'Truck Driver', 'Registered Nurse Healthcare', 'Secondary School Teacher Education',
+    'Senior Software Engineer IT', 'Sales Representative Sales', 'Agricultural Extension Officer Agriculture',
+    'Human Resources Officer Human Resources', 'Hotel Receptionist Hospitality', 'Legal Counsel Legal',
+    'BSc Computer Science, 3 years experience, Python, Django, SQL. I build web applications.',
+    'Diploma in Nursing, 5 years experience in a district hospital, patient care and record keeping.',
+]
+
+
+def benchmark_onnx_encoder(batch_sizes=(1, 32, 256), n_sentences=1024, tolerance=0.01):
+    """
+    Parity of the ONNX (fp32 and int8) encoders with PyTorch on cosine scores, and sentences/sec at
+    each batch size. Raises AssertionError if fp32 ONNX scores drift from PyTorch by more than
+    `tolerance`. Sentences come from jobs_cleaned when available.
+    """
+    from django.conf import settings
+    from sentence_transformers import SentenceTransformer
+    from job_recommendation.model_registry import model_path, model_version
+
+    path = model_path('sentence_encoder')
+    sentences = list(SAMPLE_SENTENCES)
+    try:
+        from job_recommendation.models import JobCleaned
+        from job_recommendation.model2_reccomender.embedding_store import job_text
+        sentences += [job_text(title, category) for title, category in
+                      JobCleaned.objects.values_list('title', 'category')[:n_sentences]]
+    except Exception as e:
+        logger.warning(f"Using sample sentences only: {e}")
+    sentences = (sentences * (n_sentences // len(sentences) + 1))[:n_sentences]
+
+    backends = {'torch': SentenceTransformer(str(path), device='cpu')}
+    for quantized in (False, True):
+        backends['onnx-int8' if quantized else 'onnx'] = OnnxSentenceEncoder.from_model(
+            path, settings.ONNX_EXPORT_DIR, quantized=quantized, intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+            source_version=model_version('sentence_encoder', backend='torch'))
+
+    reference = np.asarray(backends['torch'].encode(SAMPLE_SENTENCES, convert_to_tensor=False), dtype=np.float32)
+    results = []
+    for name, encoder in backends.items():
+        embeddings = np.asarray(encoder.encode(SAMPLE_SENTENCES, convert_to_tensor=False), dtype=np.float32)
+        score_error = cosine_score_error(embeddings, reference)
+        vector_cosine = float(np.min(np.sum(embeddings * reference, axis=1)))
+        if name == 'onnx':
+            assert score_error <= tolerance, f"ONNX cosine scores differ from PyTorch by {score_error:.4f}"
+        result = {'backend': name, 'max_score_error': round(score_error, 5), 'min_vector_cosine': round(vector_cosine, 5)}
+        for batch_size in batch_sizes:
+            count = min(len(sentences), max(batch_size * 4, 64))
+            started = time.perf_counter()
+            encoder.encode(sentences[:count], batch_size=batch_size, convert_to_tensor=False)
+            result[f'sentences_per_sec@{batch_size}'] = round(count / (time.perf_counter() - started), 1)
+        results.append(result)
+    return results
@@ -0,0 +1,104 @@
+import logging
+import itertools
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pairs looked up (and written back) per query
+CACHE_WINDOW = 5000
+
+# Hits and misses in this process, by model version
+_counters = {}
+
+# Cached scores of exactly the requested pairs, joined on the (user_hash, job_hash, model_name) unique index
+LOOKUP_SQL = """
+    SELECT p.user_hash, p.job_hash, p.label, p.score
+    FROM unnest(%s::varchar[], %s::varchar[]) AS k(user_hash, job_hash)
+    JOIN pair_scores p ON p.user_hash = k.user_hash AND p.job_hash = k.job_hash AND p.model_name = %s
+"""
+
+
+def cache_stats():
+    """Hits, misses and hit rate of the pair-score cache in this process, per model version."""
+    return {
+        model_name: dict(counts, hit_rate=round(counts['hits'] / max(counts['hits'] + counts['misses'], 1), 4))
+        for model_name, counts in _counters.items()
+    }
+
+
+def _record(model_name, hits, misses):
+    counts = _counters.setdefault(model_name, {'hits': 0, 'misses': 0})
+    counts['hits'] += hits
+    counts['misses'] += misses
+
+
+def lookup(keys, model_name):
+    """Cached (label, score) for each (user_hash, job_hash) in `keys` that has one."""
+    from django.db import connection
+
+    if not keys:
+        return {}
+    keys = list(keys)
+    with connection.cursor() as cursor:
+        cursor.execute(LOOKUP_SQL, [[user_hash for user_hash, _ in keys], [job_hash for _, job_hash in keys], model_name])
+        rows = cursor.fetchall()
+    return {(user_hash, job_hash): (label, score) for user_hash, job_hash, label, score in rows}
+
+
+def store(entries, model_name):
+    """Save {(user_hash, job_hash): (label, score)}; pairs another process cached meanwhile are left as they are."""
+    from job_recommendation.models import PairScore
+
+    PairScore.objects.bulk_create(
+        [
+            PairScore(user_hash=user_hash, job_hash=job_hash, model_name=model_name, label=int(label), score=float(score))
+            for (user_hash, job_hash), (label, score) in entries.items()
+        ],
+        batch_size=CACHE_WINDOW,
+        ignore_conflicts=True,
+    )
+
+
+def evict_stale(model_name):
+    """Delete cached scores from every model version other than `model_name`. Returns the number of rows removed."""
+    from job_recommendation.models import PairScore
+
+    deleted, _ = PairScore.objects.exclude(model_name=model_name).delete()
+    if deleted:
+        logger.info(f"Evicted {deleted} cached pair scores from stale model versions")
+    return deleted
+
+
+def cached_stream(pairs, user_hashes, job_hashes, model_name, predict, window=CACHE_WINDOW):
+    """
+    Serve a stream of (position, user_idx, job_idx) from the cache, running the model only on misses.
+    `predict(misses)` takes a list of such tuples and yields batches of
+    (positions, user_idx, job_idx, labels, probabilities), like eeeh.predict_pairs; batches in the same
+    format are yielded here, cached pairs first within each window. New scores are written back per window.
+    """
+    while True:
+        chunk = list(itertools.islice(pairs, window))
+        if not chunk:
+            return
+        keys = {(user_hashes[u], job_hashes[j]) for _, u, j in chunk}
+        cached = lookup(keys, model_name)
+        hits = [pair for pair in chunk if (user_hashes[pair[1]], job_hashes[pair[2]]) in cached]
+        misses = [pair for pair in chunk if (user_hashes[pair[1]], job_hashes[pair[2]]) not in cached]
+        _record(model_name, len(hits), len(misses))
+
+        if hits:
+            scores = [cached[user_hashes[u], job_hashes[j]] for _, u, j in hits]
+            yield (
+                np.array([position for position, _, _ in hits]),
+                np.array([u for _, u, _ in hits]),
+                np.array([j for _, _, j in hits]),
+                np.array([label for label, _ in scores]),
+                np.array([score for _, score in scores], dtype=np.float32),
+            )
+        if misses:
+            fresh = {}
+            for positions, user_idx, job_idx, labels, probs in predict(misses):
+                for u, j, label, prob in zip(user_idx, job_idx, labels, probs):
+                    fresh[user_hashes[u], job_hashes[j]] = (label, prob)
+                yield positions, user_idx, job_idx, labels, probs
+            store(fresh, model_name)
@@ -0,0 +1,156 @@
+import time
+import numpy as np
+
+from job_recommendation.model2_reccomender.batch_matching import normalize_rows, top_k_blocked
+
+STORAGE_KINDS = ('float32', 'float16', 'int8')
+
+# Rows of the compact matrix widened to float32 at a time while scoring
+JOB_BLOCK = 16384
+
+
+class QuantizedMatrix:
+    """
+    L2-normalized embeddings kept in a compact dtype.
+    - float16: half precision, 2 bytes per value
+    - int8: symmetric scalar quantization with one scale per dimension, 1 byte per value
+    Scores are computed against the compact rows: for int8 the per-dimension scale is folded into
+    the query ((q * scale) . codes == q . dequantized), and rows are widened to float32 one block at
+    a time for the BLAS matmul, so the full float32 matrix never exists.
+    """
+
+    def __init__(self, data, scale, kind):
+        self.data = data
+        self.scale = scale
+        self.kind = kind
+
+    @classmethod
+    def from_float32(cls, matrix, kind='int8'):
+        if kind not in STORAGE_KINDS:
+            raise ValueError(f"Unknown embedding storage '{kind}', expected one of {STORAGE_KINDS}")
+        matrix = normalize_rows(matrix)
+        if kind == 'float32':
+            return cls(matrix, None, kind)
+        if kind == 'float16':
+            return cls(matrix.astype(np.float16), None, kind)
+        scale = np.abs(matrix).max(axis=0) / 127.0 if len(matrix) else np.ones(matrix.shape[1], dtype=np.float32)
+        scale[scale == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+        return cls(codes, scale.astype(np.float32), kind)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def scores(self, queries):
+        """Approximate cosine scores of each (normalized) query row against every stored row."""
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.scale is not None:
+            queries = queries * self.scale
+        out = np.empty((len(queries), len(self.data)), dtype=np.float32)
+        for start in range(0, len(self.data), JOB_BLOCK):
+            block = self.data[start:start + JOB_BLOCK].astype(np.float32)
+            out[:, start:start + JOB_BLOCK] = queries @ block.T
+        return out
+
+    def top_k(self, queries, k, block_size=1024, rescore=None, shortlist_factor=4):
+        """
+        Return (indices, scores) of the k best rows per query, shaped (n_queries, k).
+        With `rescore`, a callable mapping sorted row indices to their float32 vectors, the best
+        k * shortlist_factor rows by quantized score are rescored exactly before the final cut.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        n = len(self.data)
+        k = min(k, n)
+        shortlist = min(n, k * shortlist_factor) if rescore is not None else k
+        top_indices = np.empty((len(queries), k), dtype=np.int64)
+        top_scores = np.empty((len(queries), k), dtype=np.float32)
+        if k == 0:
+            return top_indices, top_scores
+
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            scores = self.scores(block)
+            if shortlist < n:
+                candidates = np.argpartition(scores, n - shortlist, axis=1)[:, n - shortlist:]
+            else:
+                candidates = np.tile(np.arange(n), (len(block), 1))
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            if rescore is not None:
+                rows = np.unique(candidates)
+                vectors = normalize_rows(rescore(rows))
+                positions = np.searchsorted(rows, candidates)
+                candidate_scores = np.einsum('qd,qcd->qc', block, vectors[positions])
+            order = np.argsort(-candidate_scores, axis=1)[:, :k]
+            top_indices[start:start + block_size] = np.take_along_axis(candidates, order, axis=1)
+            top_scores[start:start + block_size] = np.take_along_axis(candidate_scores, order, axis=1)
+        return top_indices, top_scores
+
+
+_cached = {}
+
+
+def cached_job_matrix(model_name, kind):
+    """
+    Job ids and the QuantizedMatrix of their stored embeddings, kept per process and rebuilt only
+    when the job embedding store changes (row count or latest update).
+    """
+    from django.db.models import Count, Max
+    from job_recommendation.models import JobEmbedding
+    from job_recommendation.model2_reccomender.embedding_store import load_job_matrix
+
+    state = JobEmbedding.objects.filter(model_name=model_name).aggregate(count=Count('id'), latest=Max('updated_at'))
+    key = (model_name, kind)
+    cached = _cached.get(key)
+    if cached is None or cached[0] != state:
+        job_ids, matrix = load_job_matrix(model_name)
+        cached = (state, job_ids, QuantizedMatrix.from_float32(matrix, kind) if len(job_ids) else None)
+        _cached[key] = cached
+    return cached[1], cached[2]
+
+
+def benchmark_quantization(model_name=None, k=6, n_queries=1000, seed=0):
+    """
+    Memory, scoring throughput and top-k overlap with float32 for each storage kind, with and
+    without float32 rescoring of the shortlist. Jobs come from the job embedding store for
+    `model_name` (default: the current encoder); queries are the stored user embeddings, or noisy
+    copies of job vectors when there are no users yet.
+    """
+    from job_recommendation.model2_reccomender.eish import encoder_version
+    from job_recommendation.model2_reccomender.embedding_store import load_job_matrix, load_user_matrix
+
+    model_name = model_name or encoder_version()
+    rng = np.random.default_rng(seed)
+    job_ids, jobs = load_job_matrix(model_name)
+    if not len(job_ids):
+        raise ValueError(f"No job embeddings stored for {model_name}; run the matcher first")
+    jobs = normalize_rows(jobs)
+    _, queries = load_user_matrix(model_name)
+    if not len(queries):
+        picks = rng.integers(0, len(jobs), n_queries)
+        queries = jobs[picks] + 0.05 * rng.standard_normal((n_queries, jobs.shape[1]), dtype=np.float32)
+    queries = normalize_rows(queries[:n_queries])
+
+    exact, _ = top_k_blocked(queries, jobs, k)
+    exact = [set(row) for row in exact.tolist()]
+
+    results = []
+    for kind in STORAGE_KINDS:
+        matrix = QuantizedMatrix.from_float32(jobs, kind)
+        for rescore in ([None] if kind == 'float32' else [None, lambda rows: jobs[rows]]):
+            started = time.perf_counter()
+            found, _ = matrix.top_k(queries, k, rescore=rescore)
+            seconds = time.perf_counter() - started
+            overlap = np.mean([len(a & set(b)) / k for a, b in zip(exact, found.tolist())])
+            results.append({
+                'storage': kind,
+                'rescore': rescore is not None,
+                'jobs': len(jobs),
+                'memory_mb': round(matrix.nbytes / 2 ** 20, 2),
+                'pairs_per_sec': round(len(queries) * len(jobs) / seconds),
+                f'top{k}_overlap': round(float(overlap), 4),
+            })
+    return results
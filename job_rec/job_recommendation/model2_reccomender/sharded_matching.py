@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+
+from job_recommendation.model2_reccomender.batch_matching import DEFAULT_BLOCK_SIZE, normalize_rows, top_k_blocked
+
+# Matrices shared with the worker processes, memory-mapped read-only from the files
+# written by sharded_top_k (set once per worker by _init_worker)
+_worker_state = {}
+
+
+# Function to split n_rows into n_shards contiguous (start, stop) ranges
+def shard_ranges(n_rows, n_shards):
+    bounds = np.linspace(0, n_rows, max(1, min(n_shards, n_rows)) + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def _init_worker(job_path, user_path, threads):
+    # Cap BLAS/OpenMP (and torch, if loaded) threads so workers x threads does not oversubscribe the cores
+    from threadpoolctl import threadpool_limits
+    _worker_state['limits'] = threadpool_limits(limits=threads)
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(threads)
+    _worker_state['jobs'] = np.load(job_path, mmap_mode='r')
+    _worker_state['users'] = np.load(user_path, mmap_mode='r')
+
+
+def _score_shard(task):
+    start, stop, k, block_size = task
+    indices, scores = top_k_blocked(_worker_state['users'][start:stop], _worker_state['jobs'], k, block_size=block_size)
+    return start, stop, indices, scores
+
+
+def sharded_top_k(user_matrix, job_matrix, k, workers, threads_per_worker=1, block_size=DEFAULT_BLOCK_SIZE,
+                  shards_per_worker=4):
+    """
+    top_k_blocked split across `workers` processes. Both matrices (L2-normalized) are written once to
+    .npy files and memory-mapped read-only by every worker, so the page cache holds a single copy.
+    Users are cut into workers * shards_per_worker shards; yields (start, stop, indices, scores) for each
+    shard as it finishes, in completion order, so the caller can build rows while other shards are scored.
+    """
+    scratch_dir = tempfile.mkdtemp(prefix='sharded_matching_')
+    try:
+        job_path = os.path.join(scratch_dir, 'jobs.npy')
+        user_path = os.path.join(scratch_dir, 'users.npy')
+        np.save(job_path, np.ascontiguousarray(job_matrix, dtype=np.float32))
+        np.save(user_path, np.ascontiguousarray(user_matrix, dtype=np.float32))
+        tasks = [(start, stop, k, block_size) for start, stop in shard_ranges(len(user_matrix), workers * shards_per_worker)]
+
+        # spawn rather than fork: the parent holds database connections and possibly a loaded encoder
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers, initializer=_init_worker, initargs=(job_path, user_path, threads_per_worker)) as pool:
+            yield from pool.imap_unordered(_score_shard, tasks)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def benchmark_sharded_matching(n_users=100_000, n_jobs=10_000, dim=384, top_n=6, worker_counts=None,
+                               threads_per_worker=1, block_size=DEFAULT_BLOCK_SIZE, seed=0):
+    """
+    Time sharded_top_k on random unit vectors for each worker count (default 1, 2, 4, ... up to the
+    number of cores) against single-process top_k_blocked, and check both pick the same jobs.
+    """
+    rng = np.random.default_rng(seed)
+    job_matrix = normalize_rows(rng.standard_normal((n_jobs, dim), dtype=np.float32))
+    user_matrix = normalize_rows(rng.standard_normal((n_users, dim), dtype=np.float32))
+    if worker_counts is None:
+        cores = os.cpu_count() or 1
+        worker_counts = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+
+    started = time.perf_counter()
+    reference, _ = top_k_blocked(user_matrix, job_matrix, top_n, block_size=block_size)
+    single_seconds = time.perf_counter() - started
+
+    results = [{'workers': 'in-process', 'users': n_users, 'jobs': n_jobs, 'seconds': round(single_seconds, 3),
+                'users_per_sec': round(n_users / single_seconds)}]
+    for workers in worker_counts:
+        indices = np.empty_like(reference)
+        started = time.perf_counter()
+        for start, stop, shard_indices, _ in sharded_top_k(user_matrix, job_matrix, top_n, workers,
+                                                           threads_per_worker=threads_per_worker, block_size=block_size):
+            indices[start:stop] = shard_indices
+        seconds = time.perf_counter() - started
+        results.append({
+            'workers': workers,
+            'threads_per_worker': threads_per_worker,
+            'users': n_users,
+            'jobs': n_jobs,
+            'seconds': round(seconds, 3),
+            'users_per_sec': round(n_users / seconds),
+            'speedup': round(single_seconds / seconds, 2),
+            'same_top_jobs': bool(np.array_equal(np.sort(indices, axis=1), np.sort(reference, axis=1))),
+        })
+    return results
@@ -0,0 +1,206 @@
+import gc
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Files that make up a model on disk; source files, indexes and exports living in the same
+# directory must not change the model version
+MODEL_FILE_SUFFIXES = {'.json', '.txt', '.bin', '.safetensors', '.pkl', '.pt'}
+
+# Each model is loaded at most once per process, on first use. Loaders import their heavy
+# dependencies (torch, transformers, ...) themselves so importing this module stays cheap.
+_loaders = {}
+_models = {}
+_stats = {}
+_lock = threading.RLock()
+# sha1 of each model file's contents, keyed by (path, size, mtime) so a file is only re-read when it changes
+_file_digests = {}
+
+
+def register(name, loader):
+    """Register `loader(path)` as the way to build model `name`."""
+    _loaders[name] = loader
+    return loader
+
+
+def model_path(name):
+    from django.conf import settings
+    return settings.MODEL_PATHS[name]
+
+
+def model_backend(name):
+    """Inference backend configured for model `name` in settings.MODEL_BACKENDS (default 'torch')."""
+    from django.conf import settings
+    return getattr(settings, 'MODEL_BACKENDS', {}).get(name, 'torch')
+
+
+def model_version(name, backend=None):
+    """
+    Identifier stored next to anything derived from model `name` (embeddings, scores, labels).
+    Taken from settings.MODEL_VERSIONS when set, otherwise derived from the contents of the model
+    files, so swapping the weights on disk changes it but a fresh checkout or copy of the same files
+    does not. Non-default backends are appended since their outputs differ slightly from the PyTorch model;
+    pass backend='torch' for the version of the weights alone (e.g. to check an ONNX export is current).
+    """
+    from django.conf import settings
+    versions = getattr(settings, 'MODEL_VERSIONS', {})
+    if name in versions:
+        return versions[name]
+    backend = backend or model_backend(name)
+    suffix = '' if backend == 'torch' else f'+{backend}'
+    path = Path(model_path(name))
+    if not path.exists():
+        # Hub model id such as 'all-MiniLM-L6-v2'
+        return str(model_path(name)) + suffix
+    files = [path] if path.is_file() else sorted(
+        p for p in path.iterdir() if p.is_file() and p.suffix in MODEL_FILE_SUFFIXES
+    )
+    digest = hashlib.sha1()
+    for file in files:
+        digest.update(f"{file.name}:{file_digest(file)}".encode())
+    return f"{path.name}@{digest.hexdigest()[:12]}{suffix}"
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it can't be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS on platforms without /proc; kilobytes on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+def get_model(name):
+    """Return model `name`, loading it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        if name not in _models:
+            if name not in _loaders:
+                raise KeyError(f"No loader registered for model '{name}'")
+            path = model_path(name)
+            rss_before = current_rss()
+            started = time.perf_counter()
+            _models[name] = _loaders[name](path)
+            rss_after = current_rss()
+            _stats[name] = {
+                'path': str(path),
+                'load_seconds': round(time.perf_counter() - started, 3),
+                'rss_delta_mb': round((rss_after - rss_before) / 2 ** 20, 1) if rss_before is not None and rss_after is not None else None,
+                'pid': os.getpid(),
+            }
+            logger.info(f"Loaded model {name} from {path} in {_stats[name]['load_seconds']}s "
+                        f"(+{_stats[name]['rss_delta_mb']} MB RSS)")
+    return _models[name]
+
+
+def is_loaded(name):
+    return name in _models
+
+
+def preload(names=None):
+    """
+    Load `names` (default settings.PRELOAD_MODELS) now. Call this in a pre-fork parent such as
+    gunicorn with --preload: the weights are then shared copy-on-write by all workers, and
+    gc.freeze() keeps the collector from touching (and so copying) those pages after the fork.
+    """
+    from django.conf import settings
+    names = settings.PRELOAD_MODELS if names is None else names
+    for name in names:
+        get_model(name)
+    if names:
+        gc.freeze()
+    return model_stats()
+
+
+def file_digest(file):
+    """sha1 of `file`'s contents, computed once per process for each size and mtime of the file."""
+    stat = file.stat()
+    key = (str(file), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.sha1()
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+
+def model_stats():
+    """Load time and resident memory growth for each model loaded in this process."""
+    return {name: dict(stats) for name, stats in _stats.items()}
+
+
+# --------------------------------------------
+# Loaders
+# --------------------------------------------
+def load_sentence_encoder(path):
+    backend = model_backend('sentence_encoder')
+    if backend in ('onnx', 'onnx-int8'):
+        from django.conf import settings
+        from job_recommendation.model2_reccomender.onnx_encoder import OnnxSentenceEncoder
+        return OnnxSentenceEncoder.from_model(path, settings.ONNX_EXPORT_DIR, quantized=backend == 'onnx-int8',
+                                              intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+                                              source_version=model_version('sentence_encoder', backend='torch'))
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(str(path))
+
+
+def load_sequence_classifier(path):
+    # The Rust-backed tokenizer; same ids as BertTokenizer, much faster on large batches
+    from transformers import BertTokenizerFast, BertForSequenceClassification
+    tokenizer = BertTokenizerFast.from_pretrained(str(path))
+    model = BertForSequenceClassification.from_pretrained(str(path))
+    model.eval()
+    return tokenizer, model
+
+
+def load_job_classifier(path):
+    backend = model_backend('job_classifier')
+    if backend == 'torch':
+        return load_sequence_classifier(path)
+    from django.conf import settings
+    from job_recommendation.model.classifier_backends import load_classifier
+    return load_classifier(path, backend, settings.CLASSIFIER_ONNX_EXPORT_DIR, intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+                           source_version=model_version('job_classifier', backend='torch'))
+
+
+def load_label_encoder(path):
+    import joblib
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"LabelEncoder file not found at {path}")
+    return joblib.load(path)
+
+
+def load_title_classifier(path):
+    import joblib
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Title classifier not found at {path}; train it with `manage.py train_title_classifier`")
+    return joblib.load(path)
+
+
+def load_embedding_classifier(path):
+    import joblib
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Embedding classifier not found at {path}; train it with `manage.py train_embedding_classifier`")
+    return joblib.load(path)
+
+
+register('sentence_encoder', load_sentence_encoder)
+register('job_classifier', load_job_classifier)
+register('cross_encoder', load_sequence_classifier)
+register('label_encoder', load_label_encoder)
+register('title_classifier', load_title_classifier)
+register('embedding_classifier', load_embedding_classifier)
@@ -161,3 +161,98 @@ class MatchedJob(models.Model):
         db_table = 'matched_jobs'
         unique_together = ('user_id', 'job_id')
 
+class JobEmbedding(models.Model):
+    job_id = models.IntegerField(unique=True)
+    content_hash = models.CharField(max_length=64)  # sha256 of the embedded job text
+    model_name = models.CharField(max_length=100)
+    vector = models.BinaryField()  # raw float32 bytes
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'job_embeddings'
+
+class UserEmbedding(models.Model):
+    user_id = models.IntegerField(unique=True)
+    content_hash = models.CharField(max_length=64)  # sha256 of the embedded profile text
+    model_name = models.CharField(max_length=100)
+    vector = models.BinaryField()  # raw float32 bytes
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_embeddings'
+
+class MatchRun(models.Model):
+    model_name = models.CharField(max_length=100)
+    mode = models.CharField(max_length=20)  # 'full' or 'incremental'
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    jobs_scored = models.IntegerField(default=0)
+    users_rescored = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'match_runs'
+
+class BackgroundJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    kind = models.CharField(max_length=50)  # e.g. 'rematch_user'
+    key = models.CharField(max_length=100)  # what the job applies to, e.g. a user id
+    status = models.CharField(max_length=20, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'background_jobs'
+        constraints = [
+            # At most one pending job per (kind, key): repeated requests coalesce into it
+            models.UniqueConstraint(fields=['kind', 'key'], condition=models.Q(status='pending'),
+                                    name='unique_pending_background_job'),
+            # ...and at most one running, so two workers never run the same key concurrently
+            models.UniqueConstraint(fields=['kind', 'key'], condition=models.Q(status='running'),
+                                    name='unique_running_background_job'),
+        ]
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+class PairScore(models.Model):
+    user_hash = models.CharField(max_length=64)  # sha256 of the cross-encoder's user text
+    job_hash = models.CharField(max_length=64)  # sha256 of the cross-encoder's job text
+    model_name = models.CharField(max_length=100)
+    label = models.SmallIntegerField()  # predicted label
+    score = models.FloatField()  # probability of the match label
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pair_scores'
+        unique_together = ('user_hash', 'job_hash', 'model_name')
+        indexes = [models.Index(fields=['model_name'])]
+
+class JobCategorization(models.Model):
+    job_id = models.IntegerField(unique=True)
+    content_hash = models.CharField(max_length=64)  # sha256 of the job's title and description when it was categorized
+    model_name = models.CharField(max_length=100)
+    category = models.CharField(max_length=100)
+    confidence = models.FloatField(null=True)  # probability of the predicted category
+    tier = models.CharField(max_length=10, default='bert')  # 'linear', 'embedding' or 'bert': the model that decided
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'job_categorizations'
+
+class TitleCategory(models.Model):
+    title = models.CharField(max_length=255)  # normalized title (categorizer.preprocess_text)
+    model_name = models.CharField(max_length=100)  # categorizer_version() the category came from
+    category = models.CharField(max_length=100)
+    confidence = models.FloatField(null=True)
+    tier = models.CharField(max_length=10)  # 'linear', 'embedding' or 'bert'
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'title_categories'
+        unique_together = ('title', 'model_name')
+        indexes = [models.Index(fields=['model_name'])]
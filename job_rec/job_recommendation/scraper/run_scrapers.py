@@ -2,12 +2,15 @@ import psycopg2
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import logging
 import asyncio
+import threading
+import time
 # from scrape_jobsearchmalawi import scrape_jobsearchmalawi
 # from scrape_ntchito import scrape_ntchito
 # from scrape_careers import scrape_careersmw
 from job_recommendation.scraper.scrape_jobsearchmalawi import scrape_jobsearchmalawi
 from job_recommendation.scraper.scrape_ntchito import scrape_ntchito
 from job_recommendation.scraper.scrape_careers import scrape_careersmw
+from job_recommendation.scraper.throttle import new_report, site_context
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -21,6 +24,17 @@ DB_CONFIG = {
     "host": "localhost",
     "port": "5432"
 }
+
+# Scrapers run by run_all_scrapers, each in its own thread with its own browser
+SCRAPERS = {
+    "jobsearchmalawi.com": scrape_jobsearchmalawi,
+    "ntchito.com": scrape_ntchito,
+    "careersmw.com": scrape_careersmw,
+}
+# Wall-clock budget of one run: scrapers stop before their next page once it has passed
+SCRAPE_DEADLINE_SECONDS = 30 * 60
+# Time scrapers get after the deadline to save what they scraped and close their browsers
+DEADLINE_GRACE_SECONDS = 60
       
 # Initialize database and create table
 def init_db():
@@ -76,30 +90,59 @@ def init_db():
         logger.error(f"Database initialization failed: {e}")
         raise
 
-async def run_all_scrapers():
+# Function to run one site's scraper in the current thread, recording its outcome in `report`
+def run_site(scraper, report, deadline, results):
+    started = time.monotonic()
+    with site_context(report, deadline):
+        try:
+            jobs = asyncio.run(scraper())
+            results[report["site"]] = jobs
+            report["jobs"] = len(jobs)
+            if report["status"] == "pending":
+                report["status"] = "ok"
+        except Exception as e:
+            logger.error(f"{report['site']} scraper failed: {e}")
+            report["errors"] += 1
+            report["status"] = "failed"
+    report["seconds"] = round(time.monotonic() - started, 1)
+
+
+def scrape_all_sites(deadline_seconds=SCRAPE_DEADLINE_SECONDS, scrapers=None):
+    """
+    Run every scraper in `scrapers` (default SCRAPERS) at the same time, each in its own thread and browser,
+    sharing the per-host limits of throttle.py and a deadline `deadline_seconds` from now.
+    Returns (jobs, reports): all scraped jobs and one throttle.new_report() dict per site.
+    Scrapers still running DEADLINE_GRACE_SECONDS after the deadline are reported as "timed out" and left behind.
+    """
+    scrapers = scrapers or SCRAPERS
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+    reports = {site: new_report(site) for site in scrapers}
+    results = {}
+    threads = {
+        site: threading.Thread(target=run_site, args=(scraper, reports[site], deadline, results), name=f"scraper-{site}", daemon=True)
+        for site, scraper in scrapers.items()
+    }
+    started = time.monotonic()
+    for thread in threads.values():
+        thread.start()
+    for site, thread in threads.items():
+        thread.join(None if deadline is None else max(deadline + DEADLINE_GRACE_SECONDS - time.monotonic(), 0))
+        if thread.is_alive():
+            reports[site]["status"] = "timed out"
+            reports[site]["seconds"] = round(time.monotonic() - started, 1)
+    jobs = [job for site in scrapers for job in results.get(site, [])]
+    return jobs, list(reports.values())
+
+
+async def run_all_scrapers(deadline_seconds=SCRAPE_DEADLINE_SECONDS):
     logger.info("Starting all scrapers")
-    jobs = []
-    
-    # Run scrapers sequentially
-    try:
-        jobs.extend(await scrape_jobsearchmalawi())
-        logger.info("Completed jobsearchmalawi.com scraper")
-    except Exception as e:
-        logger.error(f"jobsearchmalawi.com scraper failed: {e}")
-    
-    try:
-        jobs.extend(await scrape_ntchito())
-        logger.info("Completed ntchito.com scraper")
-    except Exception as e:
-        logger.error(f"ntchito.com scraper failed: {e}")
-    
-    try:
-        jobs.extend(await scrape_careersmw())
-        logger.info("Completed careersmw.com scraper")
-    except Exception as e:
-        logger.error(f"careersmw.com scraper failed: {e}")
-    
-    logger.info(f"Total jobs scraped: {len(jobs)}")
+    started = time.monotonic()
+    # The scrapers block on Selenium, so they run in their own threads rather than on this event loop
+    jobs, reports = await asyncio.to_thread(scrape_all_sites, deadline_seconds)
+    for report in reports:
+        logger.info(f"{report['site']}: {report['status']}, {report['pages']} pages, {report['jobs']} jobs, "
+                    f"{report['errors']} errors in {report['seconds']}s")
+    logger.info(f"Total jobs scraped: {len(jobs)} in {time.monotonic() - started:.1f}s")
     return jobs
 
 async def main(run_scheduler=False):
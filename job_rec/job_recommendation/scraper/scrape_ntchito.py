@@ -6,11 +6,9 @@ import re
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
+from job_recommendation.scraper.throttle import DeadlineExceeded, deadline_passed, fetch_page
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -45,15 +43,14 @@ async def scrape_ntchito():
         driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
         for page in range(1, 3):
             url = f"{base_url}page/{page}/" if page > 1 else base_url
+            if deadline_passed():
+                logger.warning(f"Scrape deadline reached, stopping ntchito.com before page {page}")
+                break
             logger.info(f"Scraping ntchito.com page: {url}")
             
             for attempt in range(3):
                 try:
-                    driver.get(url)
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "article.job_listing"))
-                    )
-                    page_source = driver.page_source
+                    page_source = fetch_page(driver, url, "article.job_listing", 15)
                     logger.debug(f"ntchito.com page source (first 500 chars): {page_source[:500]}")
                     
                     soup = BeautifulSoup(page_source, "html.parser")
@@ -79,11 +76,7 @@ async def scrape_ntchito():
                             skills = ""
                             if job_url:
                                 try:
-                                    driver.get(job_url)
-                                    WebDriverWait(driver, 10).until(
-                                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.job-description, div.content, div.entry-content"))
-                                    )
-                                    detail_source = driver.page_source
+                                    detail_source = fetch_page(driver, job_url, "div.job-description, div.content, div.entry-content", 10)
                                     detail_soup = BeautifulSoup(detail_source, "html.parser")
                                     
                                     # Extract description
@@ -104,8 +97,9 @@ async def scrape_ntchito():
                                         else:
                                             skills = "N/A"
                                     logger.info(f"Scraped skills for {job_url}: {skills}")
-                                    
-                                    await asyncio.sleep(2)  # Delay to avoid bot detection
+                                except DeadlineExceeded:
+                                    # Stop here rather than saving this and the remaining listings without details
+                                    raise
                                 except Exception as e:
                                     logger.warning(f"Failed to scrape details for {job_url}: {e}")
                                     description = "N/A"
@@ -133,6 +127,9 @@ async def scrape_ntchito():
                             logger.debug(f"Error job HTML: {job_html}")
                             continue
                     break
+                except DeadlineExceeded:
+                    logger.warning(f"Scrape deadline reached, stopping ntchito.com on page {page}")
+                    break
                 except Exception as e:
                     logger.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
                     if attempt == 2:
@@ -0,0 +1,124 @@
+import time
+import logging
+import threading
+import contextlib
+from urllib.parse import urlparse
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+logger = logging.getLogger(__name__)
+
+# (max concurrent requests, requests started per second) per host; hosts not listed get DEFAULT_HOST_LIMIT
+HOST_LIMITS = {
+    "jobsearchmalawi.com": (1, 0.5),
+    "ntchito.com": (1, 0.5),
+    "careersmw.com": (1, 0.5),
+}
+DEFAULT_HOST_LIMIT = (1, 0.5)
+
+
+class DeadlineExceeded(Exception):
+    """Raised by fetch_page once the scrape run's deadline has passed."""
+
+
+class HostLimiter:
+    """At most `max_concurrent` requests in flight to one host, started at most `requests_per_second` apart, across threads."""
+
+    def __init__(self, max_concurrent=1, requests_per_second=0.5):
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        if not self.slots.acquire(timeout=None if deadline is None else max(deadline - time.monotonic(), 0)):
+            raise DeadlineExceeded("Scrape deadline reached while waiting for a free connection")
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            if deadline is not None and start > deadline:
+                self.slots.release()
+                raise DeadlineExceeded("Scrape deadline reached while waiting for the host's rate limit")
+            self._next_start = start + self.interval
+        time.sleep(start - now)
+
+    def release(self):
+        self.slots.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+# Function to get the process-wide limiter of the host serving `url`
+def limiter_for(url):
+    host = (urlparse(url).hostname or "").removeprefix("www.")
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostLimiter(*HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+        return _limiters[host]
+
+
+# Report and deadline of the site being scraped by the current thread (see site_context)
+_site = threading.local()
+
+
+def new_report(site):
+    """Outcome of one site's scrape: pages fetched, jobs returned, failed fetches and wall-clock seconds."""
+    return {"site": site, "status": "pending", "pages": 0, "jobs": 0, "errors": 0, "seconds": 0.0}
+
+
+@contextlib.contextmanager
+def site_context(report, deadline=None):
+    """Count fetch_page calls in this thread into `report` and stop them at `deadline` (time.monotonic())."""
+    _site.report, _site.deadline = report, deadline
+    try:
+        yield report
+    finally:
+        _site.report = _site.deadline = None
+
+
+def deadline_passed():
+    """Whether the current site's deadline has passed; marks its report "deadline" if so."""
+    deadline = getattr(_site, "deadline", None)
+    if deadline is None or time.monotonic() < deadline:
+        return False
+    mark_deadline()
+    return True
+
+
+def mark_deadline():
+    report = getattr(_site, "report", None)
+    if report is not None:
+        report["status"] = "deadline"
+
+
+def fetch_page(driver, url, selector, timeout):
+    """
+    Load `url` once the host's limiter allows it and wait up to `timeout` seconds for `selector` to appear.
+    Returns the page source. Counts the page, or the error, into the current site's report, and marks it
+    "deadline" when the page is skipped because the deadline passed.
+    """
+    report = getattr(_site, "report", None)
+    if deadline_passed():
+        raise DeadlineExceeded(f"Scrape deadline reached before {url}")
+    limiter = limiter_for(url)
+    try:
+        limiter.acquire(getattr(_site, "deadline", None))
+    except DeadlineExceeded:
+        mark_deadline()
+        raise
+    try:
+        driver.get(url)
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+        page_source = driver.page_source
+    except Exception:
+        if report is not None:
+            report["errors"] += 1
+        raise
+    finally:
+        limiter.release()
+    if report is not None:
+        report["pages"] += 1
+    return page_source
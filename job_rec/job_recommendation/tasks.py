@@ -0,0 +1,127 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from job_recommendation.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+REMATCH_USER = 'rematch_user'
+
+# Running jobs older than this are assumed to belong to a worker that died
+STALE_AFTER = timedelta(minutes=30)
+# Failed jobs are kept this long for inspection; finished ones are deleted right away
+KEEP_FAILED_FOR = timedelta(days=7)
+
+
+# --------------------------------------------
+# Task handlers
+# --------------------------------------------
+def rematch_user(key):
+    from job_recommendation.model2_reccomender.eish import save_matches_to_db
+    save_matches_to_db(int(key), top_n=6)
+
+
+TASK_HANDLERS = {
+    REMATCH_USER: rematch_user,
+}
+
+
+# --------------------------------------------
+# Queue
+# --------------------------------------------
+def enqueue(kind, key):
+    """
+    Queue a `kind` job for `key`. If one is already pending it absorbs this request; a job that is
+    already running does not, so changes made while it runs still get picked up.
+    """
+    BackgroundJob.objects.bulk_create([BackgroundJob(kind=kind, key=str(key))], ignore_conflicts=True)
+
+
+def enqueue_rematch(user_id):
+    enqueue(REMATCH_USER, user_id)
+
+
+def is_pending(kind, key):
+    """True while a `kind` job for `key` is queued or running."""
+    return BackgroundJob.objects.filter(
+        kind=kind, key=str(key), status__in=[BackgroundJob.STATUS_PENDING, BackgroundJob.STATUS_RUNNING]
+    ).exists()
+
+
+def claim_next():
+    """
+    Mark the oldest pending job as running and return it, or None if the queue is empty.
+    SELECT ... FOR UPDATE SKIP LOCKED lets any number of workers poll the table concurrently. A job whose
+    (kind, key) is already running waits for that run to finish, so one key is never worked on twice at once.
+    """
+    running = BackgroundJob.objects.filter(kind=OuterRef('kind'), key=OuterRef('key'), status=BackgroundJob.STATUS_RUNNING)
+    try:
+        with transaction.atomic():
+            job = (BackgroundJob.objects.select_for_update(skip_locked=True)
+                   .filter(status=BackgroundJob.STATUS_PENDING).exclude(Exists(running)).order_by('created_at').first())
+            if job is None:
+                return None
+            job.status = BackgroundJob.STATUS_RUNNING
+            job.started_at = timezone.now()
+            job.attempts += 1
+            job.save(update_fields=['status', 'started_at', 'attempts'])
+    except IntegrityError:
+        # Another worker started the same key since the query ran; leave the job queued
+        return None
+    return job
+
+
+def run_next():
+    """Claim and run one job; it is deleted once done and kept as failed otherwise. Returns False when there was nothing to do."""
+    job = claim_next()
+    if job is None:
+        return False
+    started = time.perf_counter()
+    try:
+        TASK_HANDLERS[job.kind](job.key)
+        job.status = BackgroundJob.STATUS_DONE
+        job.error = ''
+    except Exception as e:
+        logger.error(f"Background job {job.kind}({job.key}) failed: {e}")
+        job.status = BackgroundJob.STATUS_FAILED
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    if job.status == BackgroundJob.STATUS_DONE:
+        job.delete()
+    else:
+        job.save(update_fields=['status', 'error', 'finished_at'])
+    logger.info(f"Background job {job.kind}({job.key}) {job.status} in {time.perf_counter() - started:.2f}s")
+    return True
+
+
+def requeue_stale():
+    """
+    Put jobs left running by a dead worker back in the queue and delete failed jobs older than
+    KEEP_FAILED_FOR. Returns how many were requeued.
+    """
+    pruned, _ = BackgroundJob.objects.filter(
+        status=BackgroundJob.STATUS_FAILED, finished_at__lt=timezone.now() - KEEP_FAILED_FOR
+    ).delete()
+    if pruned:
+        logger.info(f"Deleted {pruned} failed background jobs older than {KEEP_FAILED_FOR.days} days")
+    requeued = 0
+    stale = BackgroundJob.objects.filter(status=BackgroundJob.STATUS_RUNNING, started_at__lt=timezone.now() - STALE_AFTER)
+    for job in stale:
+        try:
+            with transaction.atomic():
+                job.status = BackgroundJob.STATUS_PENDING
+                job.save(update_fields=['status'])
+            requeued += 1
+        except IntegrityError:
+            # A newer request for the same key is already pending and covers this one
+            job.status = BackgroundJob.STATUS_FAILED
+            job.error = 'Worker died; superseded by a newer pending job'
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'finished_at'])
+    return requeued
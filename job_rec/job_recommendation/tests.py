@@ -1,3 +1,423 @@
-from django.test import TestCase
+import tempfile
+import threading
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
 
 # Create your tests here.
+
+
+class TopKBlockedTests(SimpleTestCase):
+    """Blocked top-k matching against a full argsort of the score matrix."""
+
+    def setUp(self):
+        from job_recommendation.model2_reccomender.batch_matching import normalize_rows
+        rng = np.random.default_rng(0)
+        self.users = normalize_rows(rng.standard_normal((50, 16)))
+        self.jobs = normalize_rows(rng.standard_normal((200, 16)))
+
+    def test_matches_full_argsort(self):
+        from job_recommendation.model2_reccomender.batch_matching import top_k_blocked
+        scores = self.users @ self.jobs.T
+        expected = np.argsort(-scores, axis=1)[:, :5]
+        indices, top_scores = top_k_blocked(self.users, self.jobs, 5, block_size=7)
+        np.testing.assert_array_equal(indices, expected)
+        np.testing.assert_allclose(top_scores, np.take_along_axis(scores, expected, axis=1), rtol=1e-5)
+
+    def test_k_larger_than_job_count(self):
+        from job_recommendation.model2_reccomender.batch_matching import top_k_blocked
+        indices, top_scores = top_k_blocked(self.users, self.jobs[:3], 5, block_size=16)
+        self.assertEqual(indices.shape, (50, 3))
+        np.testing.assert_array_equal(indices, np.argsort(-(self.users @ self.jobs[:3].T), axis=1))
+        self.assertTrue((np.diff(top_scores, axis=1) <= 0).all())
+
+
+class IVFFlatIndexTests(SimpleTestCase):
+    """The IVF index against exact search, and its incremental updates."""
+
+    def setUp(self):
+        from job_recommendation.model2_reccomender.ann_index import IVFFlatIndex
+        from job_recommendation.model2_reccomender.batch_matching import normalize_rows
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((10, 16))
+        self.vectors = normalize_rows(centers[rng.integers(0, 10, 500)] + 0.3 * rng.standard_normal((500, 16)))
+        self.ids = np.arange(1000, 1500)
+        self.index = IVFFlatIndex(n_lists=10, n_probe=10, seed=0).build(self.ids, self.vectors)
+
+    def exact(self, queries, k):
+        from job_recommendation.model2_reccomender.batch_matching import top_k_blocked
+        indices, _ = top_k_blocked(queries, self.vectors, k)
+        return self.ids[indices]
+
+    def test_probing_every_list_is_exact(self):
+        found, _ = self.index.query(self.vectors[:20], 5)
+        np.testing.assert_array_equal(found, self.exact(self.vectors[:20], 5))
+
+    def test_recall_with_few_probes(self):
+        found, _ = self.index.query(self.vectors[:50], 5, n_probe=3)
+        exact = self.exact(self.vectors[:50], 5)
+        recall = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(found.tolist(), exact.tolist())])
+        self.assertGreaterEqual(recall, 0.9)
+
+    def test_add_and_remove(self):
+        self.index.remove([1000])
+        found, _ = self.index.query(self.vectors[:1], 5)
+        self.assertNotIn(1000, found[0].tolist())
+        self.assertEqual(len(self.index), 499)
+
+        self.index.add([1001], -self.vectors[:1])
+        found, _ = self.index.query(self.vectors[:1], 500)
+        self.assertEqual(found[0].tolist().count(1001), 1)
+        self.assertEqual(found[0, -2], 1001)  # replaced by the opposite vector, so ranked last (-1 fills the removed slot)
+
+    def test_save_and_load(self):
+        from job_recommendation.model2_reccomender.ann_index import IVFFlatIndex
+        self.index.remove([1000, 1001])
+        self.index.churn = 2
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/index.npz'
+            self.index.save(path)
+            loaded = IVFFlatIndex.load(path)
+        self.assertEqual((len(loaded), loaded.trained_size, loaded.churn), (498, 500, 2))
+        np.testing.assert_array_equal(loaded.query(self.vectors[:20], 5)[0], self.index.query(self.vectors[:20], 5)[0])
+
+
+class MergeTopNTests(SimpleTestCase):
+    def test_new_matches_displace_the_weakest(self):
+        from job_recommendation.model2_reccomender.incremental import merge_top_n
+        merged = merge_top_n([(1, 0.9), (2, 0.5), (3, 0.4)], [(4, 0.6), (5, 0.1)], 3)
+        self.assertEqual(merged, [(1, 0.9), (4, 0.6), (2, 0.5)])
+
+    def test_rescored_job_keeps_its_new_score(self):
+        from job_recommendation.model2_reccomender.incremental import merge_top_n
+        self.assertEqual(merge_top_n([(1, 0.9), (2, 0.5)], [(1, 0.25)], 2), [(2, 0.5), (1, 0.25)])
+
+
+# Function to build an unsaved match row for the match writer tests
+def match_row(user_id, job_id, score):
+    from job_recommendation.models import MatchedJob
+    return MatchedJob(user_id=user_id, user_name='User', user_email='user@example.com', job_id=job_id,
+                      job_title='Job', job_category='Category', similarity_score=score)
+
+
+# Function to read the matched_jobs table as {(user_id, job_id): score}
+def stored_matches():
+    from job_recommendation.models import MatchedJob
+    return {(user_id, job_id): score for user_id, job_id, score in
+            MatchedJob.objects.values_list('user_id', 'job_id', 'similarity_score')}
+
+
+class ReplaceMatchesTests(TestCase):
+    def setUp(self):
+        from job_recommendation.model2_reccomender.match_writer import replace_matches
+        replace_matches([match_row(1, 10, 0.5), match_row(1, 11, 0.25), match_row(2, 10, 0.75)])
+
+    def test_upserts_and_deletes_only_the_given_users(self):
+        from job_recommendation.model2_reccomender.match_writer import replace_matches
+        self.assertEqual(replace_matches([match_row(1, 11, 0.875), match_row(1, 12, 0.5)], user_ids=[1]), 2)
+        self.assertEqual(stored_matches(), {(1, 11): 0.875, (1, 12): 0.5, (2, 10): 0.75})
+
+    def test_no_rows_clears_the_given_users(self):
+        from job_recommendation.model2_reccomender.match_writer import replace_matches
+        replace_matches([], user_ids=[1])
+        self.assertEqual(stored_matches(), {(2, 10): 0.75})
+
+    def test_without_user_ids_replaces_everything(self):
+        from job_recommendation.model2_reccomender.match_writer import replace_matches
+        replace_matches([match_row(3, 10, 0.5)])
+        self.assertEqual(stored_matches(), {(3, 10): 0.5})
+
+
+class BackgroundJobQueueTests(TestCase):
+    def test_enqueue_coalesces_pending_requests(self):
+        from job_recommendation.models import BackgroundJob
+        from job_recommendation.tasks import REMATCH_USER, enqueue_rematch, is_pending
+        enqueue_rematch(1)
+        enqueue_rematch(1)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+        self.assertTrue(is_pending(REMATCH_USER, 1))
+
+    def test_claim_skips_a_key_that_is_running(self):
+        from job_recommendation.tasks import claim_next, enqueue_rematch
+        enqueue_rematch(1)
+        self.assertEqual(claim_next().key, '1')
+        enqueue_rematch(1)
+        self.assertIsNone(claim_next())
+        enqueue_rematch(2)
+        self.assertEqual(claim_next().key, '2')
+
+    def test_done_jobs_are_deleted_and_failed_ones_kept(self):
+        from job_recommendation.models import BackgroundJob
+        from job_recommendation.tasks import REMATCH_USER, TASK_HANDLERS, enqueue_rematch, run_next
+
+        def handler(key):
+            if key == '2':
+                raise RuntimeError('boom')
+
+        enqueue_rematch(1)
+        enqueue_rematch(2)
+        with mock.patch.dict(TASK_HANDLERS, {REMATCH_USER: handler}):
+            self.assertTrue(run_next())
+            self.assertTrue(run_next())
+            self.assertFalse(run_next())
+        self.assertEqual(list(BackgroundJob.objects.values_list('key', 'status')), [('2', BackgroundJob.STATUS_FAILED)])
+
+    def test_requeue_stale_prunes_old_failed_jobs(self):
+        from job_recommendation.models import BackgroundJob
+        from job_recommendation.tasks import KEEP_FAILED_FOR, STALE_AFTER, requeue_stale
+        now = timezone.now()
+        BackgroundJob.objects.create(kind='test', key='old', status=BackgroundJob.STATUS_FAILED,
+                                     finished_at=now - KEEP_FAILED_FOR - timedelta(hours=1))
+        BackgroundJob.objects.create(kind='test', key='recent', status=BackgroundJob.STATUS_FAILED, finished_at=now)
+        BackgroundJob.objects.create(kind='test', key='stale', status=BackgroundJob.STATUS_RUNNING,
+                                     started_at=now - STALE_AFTER - timedelta(minutes=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(dict(BackgroundJob.objects.values_list('key', 'status')),
+                         {'recent': BackgroundJob.STATUS_FAILED, 'stale': BackgroundJob.STATUS_PENDING})
+
+
+class ClaimNextConcurrencyTests(TransactionTestCase):
+    def test_claim_skips_jobs_locked_by_another_worker(self):
+        from job_recommendation.models import BackgroundJob
+        from job_recommendation.tasks import claim_next, enqueue_rematch
+        enqueue_rematch(1)
+        enqueue_rematch(2)
+        claimed = []
+
+        def other_worker():
+            try:
+                claimed.append(claim_next())
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            BackgroundJob.objects.select_for_update().get(key='1')
+            worker = threading.Thread(target=other_worker)
+            worker.start()
+            worker.join(timeout=10)
+        self.assertEqual(claimed[0].key, '2')
+
+
+class OnnxSentenceEncoderTests(SimpleTestCase):
+    """The ONNX sentence encoder against PyTorch; skipped when the encoder is not available locally."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        try:
+            import onnxruntime  # noqa: F401
+            from sentence_transformers import SentenceTransformer
+            from job_recommendation.model_registry import model_path
+            cls.path = str(model_path('sentence_encoder'))
+            cls.reference_model = SentenceTransformer(cls.path, device='cpu', local_files_only=True)
+        except Exception as e:
+            raise unittest.SkipTest(f"Sentence encoder not available locally: {e}")
+        cls.export_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.export_dir.cleanup()
+        super().tearDownClass()
+
+    def test_cosine_scores_match_pytorch(self):
+        from job_recommendation.model2_reccomender.onnx_encoder import (
+            SAMPLE_SENTENCES, OnnxSentenceEncoder, cosine_score_error,
+        )
+        reference = self.reference_model.encode(SAMPLE_SENTENCES, convert_to_tensor=False)
+        encoder = OnnxSentenceEncoder.from_model(self.path, self.export_dir.name, source_version='v1')
+        self.assertLessEqual(cosine_score_error(encoder.encode(SAMPLE_SENTENCES), reference), 0.01)
+
+    def test_reexports_when_source_version_changes(self):
+        from job_recommendation.model2_reccomender.onnx_encoder import OnnxSentenceEncoder, exported_version
+        OnnxSentenceEncoder.from_model(self.path, self.export_dir.name, source_version='v1')
+        self.assertEqual(exported_version(self.export_dir.name), 'v1')
+        OnnxSentenceEncoder.from_model(self.path, self.export_dir.name, source_version='v2')
+        self.assertEqual(exported_version(self.export_dir.name), 'v2')
+
+
+class WriteMatchBlocksTests(TestCase):
+    def test_users_in_no_block_are_deleted(self):
+        from job_recommendation.model2_reccomender.match_writer import replace_matches, write_match_blocks
+        replace_matches([match_row(1, 9, 0.5), match_row(2, 9, 0.5), match_row(3, 9, 0.5)])
+        blocks = iter([([1, 2], [match_row(1, 10, 0.75)]), ([4], [match_row(4, 11, 0.25)])])
+        self.assertEqual(write_match_blocks(blocks), 2)
+        self.assertEqual(stored_matches(), {(1, 10): 0.75, (4, 11): 0.25})
+
+
+class PairBatchesTests(SimpleTestCase):
+    """Pairs assembled from separately tokenized texts against the tokenizer's own pair encoding."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from transformers import BertTokenizer
+        from job_recommendation.model2_reccomender import eeeh
+        cls.tokenizer = BertTokenizer.from_pretrained(eeeh.MODEL_DIR)
+
+    def test_truncation_matches_the_tokenizer(self):
+        from job_recommendation.model2_reccomender.eeeh import enumerate_pairs, pair_batches, tokenize_texts
+        user_texts = ['accountant ' * n for n in (1, 5, 14, 40)]
+        job_texts = ['truck driver with licence ' * n for n in (1, 3, 7, 30)]
+        pairs = [(u, j) for u in range(len(user_texts)) for j in range(len(job_texts))]
+        batches = pair_batches(self.tokenizer, tokenize_texts(self.tokenizer, user_texts),
+                               tokenize_texts(self.tokenizer, job_texts), enumerate_pairs(iter(pairs)),
+                               batch_size=4, max_length=32)
+        positions = []
+        for batch_positions, user_idx, job_idx, input_ids, attention_mask in batches:
+            self.assertEqual(input_ids.shape[1], int(attention_mask.sum(dim=1).max()))
+            for row, (u, j) in enumerate(zip(user_idx.tolist(), job_idx.tolist())):
+                expected = self.tokenizer(user_texts[u], job_texts[j], truncation='longest_first', max_length=32)
+                self.assertEqual(input_ids[row][attention_mask[row].bool()].tolist(), expected['input_ids'])
+            positions.extend(batch_positions.tolist())
+        self.assertEqual(sorted(positions), list(range(len(pairs))))
+
+
+class PairCacheTests(TestCase):
+    def test_lookup_returns_only_the_requested_pairs(self):
+        from job_recommendation.model2_reccomender.pair_cache import lookup, store
+        store({('u1', 'j1'): (1, 0.875), ('u1', 'j2'): (0, 0.25), ('u2', 'j1'): (1, 0.75)}, 'm1')
+        store({('u1', 'j1'): (0, 0.125)}, 'm2')
+        self.assertEqual(lookup({('u1', 'j1'), ('u2', 'j2')}, 'm1'), {('u1', 'j1'): (1, 0.875)})
+        self.assertEqual(lookup({('u1', 'j1'), ('u1', 'j2')}, 'm2'), {('u1', 'j1'): (0, 0.125)})
+        self.assertEqual(lookup(set(), 'm1'), {})
+
+
+JOB_TEXTS = [
+    'senior accountant audit tax', 'truck driver licence logistics', 'primary school teacher mathematics',
+    'registered nurse hospital ward', 'software developer python django', 'sales representative retail customers',
+    'civil engineer roads construction', 'accounts clerk payroll invoices', 'delivery driver motorcycle',
+    'secondary teacher biology chemistry', 'clinical officer health centre', 'data analyst python reporting',
+]
+
+
+class TfidfJobIndexTests(SimpleTestCase):
+    """Sparse top-k and the TF-IDF index against dense scikit-learn cosine similarity."""
+
+    def test_top_k_sparse_matches_dense(self):
+        from scipy import sparse
+        from job_recommendation.model2_reccomender.koma import top_k_sparse
+        scores = sparse.random(30, 40, density=0.2, random_state=0, format='csr')
+        rows, columns, values = top_k_sparse(scores, 3)
+        dense = scores.toarray()
+        for row in range(30):
+            expected = [column for column in np.argsort(-dense[row], kind='stable')[:3] if dense[row, column] > 0]
+            self.assertEqual(columns[rows == row].tolist(), expected)
+            np.testing.assert_array_equal(values[rows == row], dense[row, expected])
+
+    def test_query_matches_sklearn_cosine(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+        from job_recommendation.model2_reccomender.koma import TfidfJobIndex
+        ids = np.arange(100, 100 + len(JOB_TEXTS))
+        queries = ['python developer', 'teacher of mathematics', 'driver']
+        index = TfidfJobIndex().build(ids, JOB_TEXTS)
+        rows, job_ids, scores = index.query(queries, 2)
+
+        vectorizer = TfidfVectorizer(stop_words='english', max_features=index.max_features).fit(JOB_TEXTS)
+        expected = cosine_similarity(vectorizer.transform(queries), vectorizer.transform(JOB_TEXTS))
+        for row in range(len(queries)):
+            best = [i for i in np.argsort(-expected[row], kind='stable')[:2] if expected[row, i] > 0]
+            self.assertEqual(job_ids[rows == row].tolist(), ids[best].tolist())
+            np.testing.assert_allclose(scores[rows == row], expected[row, best])
+
+    def test_refits_once_churn_passes_the_threshold(self):
+        from job_recommendation.model2_reccomender.koma import TfidfJobIndex
+        ids = np.arange(len(JOB_TEXTS))
+        index = TfidfJobIndex().build(ids, JOB_TEXTS)
+        texts = list(JOB_TEXTS)
+        texts[0] = 'blockchain engineer'
+        self.assertTrue(index.sync(ids, texts))
+        self.assertNotIn('blockchain', index.vectorizer.vocabulary_)
+        self.assertEqual(index.churn, 1)
+
+        # Same corpus size, but half the jobs replaced: the vocabulary must follow
+        replaced = np.concatenate([ids[:6], ids[6:] + 100])
+        self.assertTrue(index.sync(replaced, texts[:6] + ['blockchain ' + text for text in texts[6:]]))
+        self.assertIn('blockchain', index.vectorizer.vocabulary_)
+        self.assertEqual((index.churn, index.fitted_size), (0, len(JOB_TEXTS)))
+
+
+class HashingTfidfJobIndexTests(SimpleTestCase):
+    """The streaming index after adds and removals against one built from scratch and against sklearn."""
+
+    def test_incremental_index_matches_a_fresh_build(self):
+        from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+        from job_recommendation.model2_reccomender.koma import HashingTfidfJobIndex
+        ids = np.arange(len(JOB_TEXTS))
+        index = HashingTfidfJobIndex(n_features=2 ** 12).build(ids[:8], JOB_TEXTS[:8])
+        index.add(ids[8:], JOB_TEXTS[8:])
+        index.remove([2, 9])
+        index.add([5], ['warehouse supervisor stock control'])
+
+        texts = dict(zip(ids.tolist(), JOB_TEXTS))
+        del texts[2], texts[9]
+        texts[5] = 'warehouse supervisor stock control'
+        fresh = HashingTfidfJobIndex(n_features=2 ** 12).build(list(texts), list(texts.values()))
+        order = np.argsort(index.ids)
+        np.testing.assert_array_equal(index.ids[order], fresh.ids)
+        np.testing.assert_array_equal(index.document_frequency, fresh.document_frequency)
+        np.testing.assert_allclose(index.job_matrix()[order].toarray(), fresh.job_matrix().toarray())
+
+        counts = HashingVectorizer(n_features=2 ** 12, alternate_sign=False, norm=None, stop_words='english')
+        expected = TfidfTransformer().fit_transform(counts.transform(list(texts.values())))
+        np.testing.assert_allclose(fresh.job_matrix().toarray(), expected.toarray())
+
+
+class ParseDatesTests(SimpleTestCase):
+    def test_relative_and_formatted_strings(self):
+        from job_recommendation.model2_reccomender.koma import parse_dates
+        values = ['today', 'Yesterday', '3 days ago', '2 weeks ago', '1 month ago', '2026-01-05',
+                  '05/02/2026', '12 March 2026', 'Mar 4, 2026', 'not a date', None]
+        parsed = parse_dates(pd.Series(values, dtype=object), today=pd.Timestamp('2026-10-18 15:30'))
+        expected = ['2026-10-18', '2026-10-17', '2026-10-15', '2026-10-04', '2026-09-18', '2026-01-05',
+                    '2026-02-05', '2026-03-12', '2026-03-04', None, None]
+        self.assertEqual(list(parsed), [pd.Timestamp(value) if value else pd.NaT for value in expected])
+
+    def test_dates_and_datetimes(self):
+        from job_recommendation.model2_reccomender.koma import parse_dates
+        parsed = parse_dates(pd.Series([date(2026, 1, 5), datetime(2026, 2, 6, 7, 30), None]))
+        self.assertEqual(list(parsed), [pd.Timestamp('2026-01-05'), pd.Timestamp('2026-02-06 07:30'), pd.NaT])
+
+
+class RecommenderTests(SimpleTestCase):
+    def test_batcher_coalesces_concurrent_requests(self):
+        from job_recommendation.model.recommender import MicroBatcher
+        calls = []
+
+        def predict(texts):
+            calls.append(list(texts))
+            return [text.upper() for text in texts]
+
+        batcher = MicroBatcher(predict, max_batch_size=16, max_wait_ms=200)
+        try:
+            futures = [batcher.submit(text) for text in ['a', 'b', 'a', 'c'] * 3]
+            self.assertEqual([future.result(timeout=5) for future in futures], ['A', 'B', 'A', 'C'] * 3)
+        finally:
+            batcher.close()
+        self.assertEqual(calls, [['a', 'b', 'c']])
+        self.assertEqual((batcher.batches, batcher.batched_requests), (1, 12))
+
+    def test_falls_back_to_direct_prediction_on_timeout(self):
+        from job_recommendation.model.recommender import RecommenderService
+        stalled = threading.Event()
+
+        def predict(texts):
+            if threading.current_thread().name == 'recommender-batcher':
+                stalled.wait()
+            return ['Accounting' for _ in texts]
+
+        service = RecommenderService(max_batch_size=4, max_wait_ms=0, cache_size=10, timeout_ms=50, predict=predict)
+        try:
+            self.assertEqual(service.recommend('Accountant'), 'Accounting')
+            self.assertEqual(service.stats()['timeouts'], 1)
+            self.assertEqual(service.recommend('Accountant'), 'Accounting')  # answered from the cache
+            self.assertEqual(service.stats()['timeouts'], 1)
+        finally:
+            stalled.set()
+            service.close()
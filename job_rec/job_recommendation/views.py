@@ -13,8 +13,8 @@ from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.sessions.backends.db import SessionStore
 from django.core.paginator import Paginator
 from django.db.models import Q
-from job_recommendation.model.recommender import recommend_category
 from django.db import models
+from .tasks import enqueue_rematch, is_pending, REMATCH_USER
 
 
 # Define categories and keywords for grouping
@@ -81,9 +81,8 @@ def create_profile(request):
         form = ProfileForm(request.POST)
         if form.is_valid():
             user = form.save()
-            # Run matching for the new user so matches are available on first login
-            from job_recommendation.model2_reccomender.eish import save_matches_to_db
-            save_matches_to_db(user.id, top_n=6)
+            # Queue matching for the new user; a background worker computes the matches
+            enqueue_rematch(user.id)
             messages.success(request, 'Profile created successfully! Please login.')
             return redirect('login')
     else:
@@ -263,7 +262,8 @@ def profile_view(request):
     return render(request, 'job_recommendation/profile.html', {
         'user': user,
         'jobs': jobs,
-        'category_data': category_data
+        'category_data': category_data,
+        'recommendations_updating': is_pending(REMATCH_USER, user.id)
     })
 
 def logout_view(request):
@@ -275,7 +275,12 @@ def post_job(request):
     if request.method == 'POST':
         form = JobCleanedForm(request.POST)
         if form.is_valid():
-            form.save()
+            job = form.save(commit=False)
+            if not job.category:
+                # Same classifier as the pipeline, loaded once per web process
+                from job_recommendation.model.categorizer import categorize_titles
+                job.category = categorize_titles([job.title])[0]
+            job.save()
             return redirect('job-list')
     else:
         form = JobCleanedForm()
@@ -331,9 +336,8 @@ def update_profile(request):
         form = ProfileUpdateForm(request.POST, instance=user)
         if form.is_valid():
             form.save()
-            # Refresh job recommendations for this user
-            from job_recommendation.model2_reccomender.eish import save_matches_to_db
-            save_matches_to_db(user.id, top_n=6)
+            # Queue a refresh of this user's job recommendations
+            enqueue_rematch(user.id)
             messages.success(request, 'Profile updated successfully!')
             return redirect('profile')
     else:
@@ -341,6 +345,8 @@ def update_profile(request):
     return render(request, 'job_recommendation/update_profile.html', {'form': form})
 
 def recommend_job(request):
+    # Imported here so the classifier is only loaded by processes that serve this page
+    from job_recommendation.model.recommender import recommend_category
     jobs = None
     category = None
     user_input = ''